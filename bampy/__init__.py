@@ -67,6 +67,7 @@ Example 2:
 For more:
     >> help(bampy.bam) for more information on working with BAM formatted data.
     >> help(bampy.bgzf) for more information on working with BGZF compressed data.
+    >> help(bampy.parallel) for more information on scanning whole files with a pool of processes.
     >> help(bampy.reader) for more information on reading HTS alignment data.
     >> help(bampy.writer) for more information on writing HTS alignment data.
     >> help(bampy.sam) for more information on working with SAM formatted.
@@ -80,7 +81,6 @@ from .reference import Reference
 from .writer import Writer
 
 # TODO Document everything
-# TODO CRC in trailer
 # TODO bai, csi
 # TODO multithread
 # TODO tools: view, sort,
@@ -1,7 +1,24 @@
 import ctypes as C
+import functools
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .bam.record import RecordFlags
+from .bam.util import alignment_length, reg2bin, reg2bins
+from .util import open_buffer
 
 MAGIC = b'BAI\1'
 
+PSEUDO_BIN = 37450
+"""int: Bin number used to store the reference start/end offsets and mapped/unmapped read counts."""
+
+INTERVAL_SHIFT = 14
+"""int: Linear index intervals span 2**INTERVAL_SHIFT (16kbp) reference positions."""
+
 
 class Chunk(C.LittleEndianStructure):
     _pack_ = 1
@@ -19,10 +36,17 @@ class PseudoChunk(Chunk):
     ]
 
 
+if np is not None:
+    CHUNK_DTYPE = np.dtype([('begin', '<u8'), ('end', '<u8')])
+    PSEUDOCHUNK_DTYPE = np.dtype([('begin', '<u8'), ('end', '<u8'), ('mapped', '<u8'), ('unmapped', '<u8')])
+
 SIZEOF_CHUNK = C.sizeof(Chunk)
 SIZEOF_PSEUDOCHUNK = C.sizeof(PseudoChunk)
 SIZEOF_UINT64 = C.sizeof(C.c_uint64)
 
+CACHE_SIZE = 64
+"""int: Number of indexes kept loaded by load()."""
+
 
 def read(stream) -> (list, list, int):
     """
@@ -47,23 +71,212 @@ def read(stream) -> (list, list, int):
             while n_bin > 0:
                 bin = int.from_bytes(stream.read(4), byteorder='little', signed=False)  # UINT32
                 n_chunk = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
-                if bin == 37450:  # Detect pseudo-chunks
-                    bins[ref][bin] = PseudoChunk.from_buffer(stream.read(SIZEOF_CHUNK * n_chunk))
-                    n_bin -= 2
+                if bin == PSEUDO_BIN:  # Detect pseudo-chunks
+                    bins[ref][bin] = PseudoChunk.from_buffer_copy(stream.read(SIZEOF_CHUNK * n_chunk))
                 else:
-                    bins[ref][bin] = (Chunk * n_chunk).from_buffer(stream.read(SIZEOF_CHUNK * n_chunk))
-                    n_bin -= 1
+                    bins[ref][bin] = (Chunk * n_chunk).from_buffer_copy(stream.read(SIZEOF_CHUNK * n_chunk))
+                n_bin -= 1
 
             # Read in intervals
             n_intv = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
-            intervals[ref] = (C.c_uint64 * n_intv).from_buffer(stream.read(SIZEOF_UINT64 * n_intv))
+            intervals[ref] = (C.c_uint64 * n_intv).from_buffer_copy(stream.read(SIZEOF_UINT64 * n_intv))
 
-        n_no_coor = int.from_bytes(stream.read(8), byteorder='little', signed=False)  # UINT64
+        n_no_coor = stream.read(8)
+        if len(n_no_coor) == SIZEOF_UINT64:
+            n_no_coor = int.from_bytes(n_no_coor, byteorder='little', signed=False)  # UINT64
+        else:
+            n_no_coor = None
     except EOFError:
         pass
     return bins, intervals, n_no_coor
 
 
+class _MappedBins:
+    """
+    Sequence of per reference bin dicts backed by a memory mapped BAI file.
+    The NumPy views for a reference are created on first access.
+    """
+
+    def __init__(self, buffer, layout: list):
+        """
+        Constructor.
+        :param buffer: Buffer containing BAI formatted data.
+        :param layout: List of (bin, offset, n_chunk) tuples for each reference.
+        """
+        self._buffer = buffer
+        self._layout = layout
+        self._bins = [None] * len(layout)
+
+    def __len__(self):
+        return len(self._layout)
+
+    def __getitem__(self, ref: int) -> dict:
+        bins = self._bins[ref]
+        if bins is None:
+            bins = {}
+            for bin, offset, n_chunk in self._layout[ref]:
+                if bin == PSEUDO_BIN:
+                    bins[bin] = np.frombuffer(self._buffer, PSEUDOCHUNK_DTYPE, 1, offset).view(np.recarray)[0]
+                else:
+                    bins[bin] = np.frombuffer(self._buffer, CHUNK_DTYPE, n_chunk, offset).view(np.recarray)
+            self._bins[ref] = bins
+        return bins
+
+    def __iter__(self):
+        return (self[ref] for ref in range(len(self)))
+
+
+def load(path: str) -> (_MappedBins, list, int):
+    """
+    Memory map a BAI file.
+    Chunks and intervals are zero-copy NumPy views of the file, chunk fields are accessible as attributes like the Chunk
+    structures returned by read(). Loaded indexes are cached by path and modification time, see CACHE_SIZE.
+    :param path: Path to BAI file.
+    :return: 3 element tuple (bins, intervals, n_no_coor) with the same layout as returned by read().
+    """
+    if np is None:
+        raise ImportError("NumPy is required to memory map BAI files.")
+    path = os.path.abspath(path)
+    return _load(path, os.stat(path).st_mtime_ns)
+
+
+def clear_cache() -> None:
+    """
+    Release all indexes cached by load().
+    """
+    _load.cache_clear()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _load(path: str, mtime: int) -> (_MappedBins, list, int):
+    buffer = open_buffer(path, os.O_RDONLY)
+    assert buffer[:4] == MAGIC, "Unknown or corrupt input data."
+    # Every field of a BAI file is 4 byte aligned, walk the file as an array of INT32
+    words = memoryview(buffer)[:len(buffer) & ~3].cast('i')
+    n_ref = words[1]
+    i = 2
+    layout = [None] * n_ref
+    intervals = [None] * n_ref
+    for ref in range(n_ref):
+        n_bin = words[i]
+        i += 1
+        ref_layout = layout[ref] = []
+        for _ in range(n_bin):
+            n_chunk = words[i + 1]
+            ref_layout.append((words[i] & 0xFFFFFFFF, (i + 2) * 4, n_chunk))
+            i += 2 + n_chunk * 4
+        n_intv = words[i]
+        intervals[ref] = np.frombuffer(buffer, '<u8', n_intv, (i + 1) * 4)
+        i += 1 + n_intv * 2
+    offset = i * 4
+    if offset + SIZEOF_UINT64 <= len(buffer):
+        n_no_coor = int.from_bytes(buffer[offset:offset + SIZEOF_UINT64], byteorder='little', signed=False)
+    else:
+        n_no_coor = None
+    return _MappedBins(buffer, layout), intervals, n_no_coor
+
+
+def query(bins: list, intervals: list, reference_id: int, beg: int, end: int) -> list:
+    """
+    Calculate the minimal list of chunks that must be read to find all records overlapping a region.
+    Candidate bins are found with reg2bins() and chunks ending before the linear index offset of beg are discarded.
+    Overlapping and adjacent chunks are merged.
+    :param bins: Bins as returned by read().
+    :param intervals: Intervals as returned by read().
+    :param reference_id: Index of the reference the region is on.
+    :param beg: Zero based start of the region.
+    :param end: Zero based, exclusive, end of the region.
+    :return: List of (begin, end) virtual file offset tuples sorted by begin.
+    """
+    if reference_id >= len(bins) or not bins[reference_id]:
+        return []
+    ref_bins = bins[reference_id]
+    ref_intervals = intervals[reference_id]
+    if len(ref_intervals):
+        min_offset = int(ref_intervals[min(beg >> INTERVAL_SHIFT, len(ref_intervals) - 1)])
+    else:
+        min_offset = 0
+
+    chunks = []
+    for bin in reg2bins(beg, end):
+        if bin in ref_bins:
+            bin_chunks = ref_bins[bin]
+            if hasattr(bin_chunks, 'dtype'):
+                # NumPy view from load()
+                chunks.extend(chunk for chunk in bin_chunks.tolist() if chunk[1] > min_offset)
+            else:
+                chunks.extend((chunk.begin, chunk.end) for chunk in bin_chunks if chunk.end > min_offset)
+    chunks.sort()
+
+    merged = []
+    for begin, end in chunks:
+        if merged and begin >> 16 <= merged[-1][1] >> 16:
+            # Overlapping or sharing a block with the previous chunk
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((begin, end))
+    return merged
+
+
+def partition(bins: list, intervals: list, parts: int, lengths: list = None) -> list:
+    """
+    Split the indexed references into parts holding roughly equal amounts of compressed data.
+    The compressed size of each 16kbp interval is estimated from the linear index, the last interval of a reference
+    extends to the end offset of its pseudo-bin. Parts are split between intervals, an interval is never divided.
+    Records without coordinates are not covered by any part.
+    :param bins: Bins as returned by read() or load().
+    :param intervals: Intervals as returned by read() or load().
+    :param parts: Number of parts.
+    :param lengths: Lengths of the references indexed by reference id, used to end the last region of each reference and
+                    to include references without records. None to end regions at the last indexed interval.
+    :return: List of at most parts lists of (reference id, start, end) regions, zero based and end exclusive, in genome order.
+    """
+    # (reference id, start, end, compressed bytes) for every interval in genome order
+    windows = []
+    for ref in range(len(intervals)):
+        ref_intervals = [int(offset) for offset in intervals[ref]] if intervals[ref] is not None else []
+        length = lengths[ref] if lengths is not None else len(ref_intervals) << INTERVAL_SHIFT
+        if not ref_intervals:
+            if length:
+                windows.append((ref, 0, length, 0))
+            continue
+        pseudo = bins[ref].get(PSEUDO_BIN) if ref < len(bins) else None
+        ref_end = int(pseudo.end) if pseudo is not None else max(ref_intervals)
+        # Intervals preceding the first record may be 0, offsets are otherwise non-decreasing
+        offset = next((offset for offset in ref_intervals if offset), ref_end) >> 16
+        n_intv = len(ref_intervals)
+        for i in range(n_intv):
+            start = i << INTERVAL_SHIFT
+            if lengths is not None and start >= length:
+                break
+            next_offset = max(offset, (ref_intervals[i + 1] if i + 1 < n_intv else ref_end) >> 16)
+            end = min((i + 1) << INTERVAL_SHIFT, length) if i + 1 < n_intv else max(length, start + 1)
+            windows.append((ref, start, end, next_offset - offset))
+            offset = next_offset
+
+    total = sum(window[3] for window in windows)
+    if not total:
+        # Nothing to balance, split on the number of intervals instead
+        windows = [(ref, start, end, 1) for ref, start, end, _ in windows]
+        total = len(windows)
+    result = []
+    part = []
+    size = 0
+    for ref, start, end, window_size in windows:
+        if part and part[-1][0] == ref and part[-1][2] == start:
+            part[-1] = (ref, part[-1][1], end)
+        else:
+            part.append((ref, start, end))
+        size += window_size
+        if size * parts >= total * (len(result) + 1) and len(result) + 1 < parts:
+            result.append(part)
+            part = []
+    if part:
+        result.append(part)
+    return result
+
+
 def write(stream, bins: list, intervals: list, unaligned: int = None) -> None:
     """
     Write out bins, list, and unaligned in BAI format
@@ -77,23 +290,192 @@ def write(stream, bins: list, intervals: list, unaligned: int = None) -> None:
     n_ref = len(bins)
     assert n_ref == len(intervals), "Reference count mismatch between bins and intervals."
     # n_ref
-    stream.write(n_ref.to_bytes(4, 'little', True))
+    stream.write(n_ref.to_bytes(4, 'little', signed=True))
     for ref in range(n_ref):
         # Write bins
         # n_bin
-        stream.write(len(bins[ref]).to_bytes(4, 'little', True))
+        stream.write(len(bins[ref]).to_bytes(4, 'little', signed=True))
         for bin, chunks in bins[ref].items():  # type: (int, Chunk)
             # bin
-            stream.write(bin.to_bytes(4, 'little', False))
+            stream.write(bin.to_bytes(4, 'little', signed=False))
             # n_chunk
-            stream.write(
-                sum(2 if isinstance(chunk, PseudoChunk) else 1 for chunk in chunks).to_bytes(4, 'little', True)
-            )
-            for chunk in chunks:
-                stream.write(chunk)
+            stream.write((2 if isinstance(chunks, PseudoChunk) else len(chunks)).to_bytes(4, 'little', signed=True))
+            stream.write(chunks)
 
         # Write intervals
+        # n_intv
+        stream.write(len(intervals[ref]).to_bytes(4, 'little', signed=True))
         stream.write(intervals[ref])
 
-    if unaligned:
-        stream.write(unaligned.to_bytes(8, 'little', False))
+    if unaligned is not None:
+        stream.write(unaligned.to_bytes(8, 'little', signed=False))
+
+
+class Indexer:
+    """
+    Builds BAI index data from coordinate sorted records as they are read or written.
+    Follows the htslib indexing rules so that the output can be merged or compared with samtools generated indexes.
+    """
+
+    def __init__(self, n_ref: int):
+        """
+        Constructor.
+        :param n_ref: Number of references in the BAM header.
+        """
+        self._shift = INTERVAL_SHIFT
+        self._pseudo_bin = PSEUDO_BIN
+        self._bins = [{} for _ in range(n_ref)]
+        self._intervals = [[] for _ in range(n_ref)]
+        self._meta = [None] * n_ref  # [begin, end, mapped, unmapped] for each reference
+        self.unaligned = 0
+        self._last_reference = None
+        self._last_position = -1
+        self._last_bin = None
+        self._chunk_begin = None
+        self._chunk_end = None
+
+    def add(self, reference_id: int, beg: int, end: int, mapped: bool, begin: int, end_offset: int) -> None:
+        """
+        Add a record to the index.
+        :param reference_id: Reference id of the record, -1 if unplaced.
+        :param beg: Zero based leftmost position of the record.
+        :param end: Zero based, exclusive, rightmost position of the record. Pass beg + 1 for unmapped records.
+        :param mapped: False if the unmapped flag is set.
+        :param begin: Virtual file offset of the first byte of the record.
+        :param end_offset: Virtual file offset of the first byte following the record.
+        :return: None
+        """
+        if reference_id < 0:
+            self._finish_chunk()
+            self.unaligned += 1
+            self._last_reference = reference_id
+            return
+        if end <= beg:
+            end = beg + 1
+        if reference_id != self._last_reference:
+            if self._last_reference is not None and (self._last_reference < 0 or self._meta[reference_id] is not None):
+                raise ValueError("Records are not sorted by reference.")
+            self._finish_chunk()
+            self._last_reference = reference_id
+            self._last_position = -1
+            self._meta[reference_id] = [begin, end_offset, 0, 0]
+        elif beg < self._last_position:
+            raise ValueError("Records are not sorted by position.")
+        self._last_position = beg
+
+        meta = self._meta[reference_id]
+        meta[1] = end_offset
+        if mapped:
+            meta[2] += 1
+            # Linear index records the first offset overlapping each interval
+            intervals = self._intervals[reference_id]
+            last = (end - 1) >> self._shift
+            if len(intervals) <= last:
+                intervals.extend([None] * (last + 1 - len(intervals)))
+            for i in range(beg >> self._shift, last + 1):
+                if intervals[i] is None:
+                    intervals[i] = begin
+        else:
+            meta[3] += 1
+
+        bin = self._reg2bin(beg, end)
+        if bin != self._last_bin:
+            self._finish_chunk()
+            self._last_bin = bin
+            self._chunk_begin = begin
+        self._chunk_end = end_offset
+
+    def add_record(self, record, begin: int, end: int) -> None:
+        """
+        Add a Record instance to the index.
+        :param record: Record instance.
+        :param begin: Virtual file offset of the first byte of the record.
+        :param end: Virtual file offset of the first byte following the record.
+        :return: None
+        """
+        position = record.position
+        mapped = not record.flags & RecordFlags.UNMAPPED
+        self.add(record.reference_id, position, position + (alignment_length(record.cigar) if mapped else 0), mapped, begin, end)
+
+    def update(self, other: 'Indexer') -> None:
+        """
+        Merge in the index data of another Indexer.
+        The other Indexer must have been given the records immediately following those given to this Indexer.
+        :param other: Indexer instance to merge.
+        :return: None
+        """
+        self._finish_chunk()
+        other._finish_chunk()
+        for ref, ref_bins in enumerate(other._bins):
+            for bin, chunks in ref_bins.items():
+                self._bins[ref].setdefault(bin, []).extend(chunks)
+
+            intervals = self._intervals[ref]
+            other_intervals = other._intervals[ref]
+            if len(intervals) < len(other_intervals):
+                intervals.extend([None] * (len(other_intervals) - len(intervals)))
+            for i, value in enumerate(other_intervals):
+                if intervals[i] is None:
+                    intervals[i] = value
+
+            meta, other_meta = self._meta[ref], other._meta[ref]
+            if meta is None:
+                self._meta[ref] = other_meta
+            elif other_meta is not None:
+                meta[1] = other_meta[1]
+                meta[2] += other_meta[2]
+                meta[3] += other_meta[3]
+        self.unaligned += other.unaligned
+        if other._last_reference is not None:
+            self._last_reference = other._last_reference
+            self._last_position = other._last_position
+
+    def _reg2bin(self, beg: int, end: int) -> int:
+        """
+        Calculate the bin of a record covering [beg, end).
+        """
+        return reg2bin(beg, end)
+
+    def _finish_chunk(self) -> None:
+        """
+        Append the chunk currently being accumulated to its bin.
+        """
+        if self._last_bin is None:
+            return
+        self._bins[self._last_reference].setdefault(self._last_bin, []).append((self._chunk_begin, self._chunk_end))
+        self._last_bin = None
+
+    def finalize(self) -> (list, list, int):
+        """
+        Finish the index.
+        :return: Tuple of (bins, intervals, unaligned) matching the output of read() and arguments to write().
+        """
+        self._finish_chunk()
+        bins = [None] * len(self._bins)
+        intervals = [None] * len(self._bins)
+        for ref, ref_bins in enumerate(self._bins):
+            bins[ref] = {}
+            for bin in sorted(ref_bins):
+                # Merge chunks that overlap or share a block
+                merged = []
+                for begin, end in sorted(ref_bins[bin]):
+                    if merged and merged[-1][1] >> 16 >= begin >> 16:
+                        if end > merged[-1][1]:
+                            merged[-1][1] = end
+                    else:
+                        merged.append([begin, end])
+                bins[ref][bin] = (Chunk * len(merged))(*(Chunk(begin, end) for begin, end in merged))
+            meta = self._meta[ref]
+            if meta is not None:
+                bins[ref][self._pseudo_bin] = PseudoChunk(*meta)
+
+            # Fill intervals without records with the preceding offset
+            ref_intervals = self._intervals[ref]
+            offset = meta[0] if meta is not None else 0
+            for i, value in enumerate(ref_intervals):
+                if value is None:
+                    ref_intervals[i] = offset
+                else:
+                    offset = value
+            intervals[ref] = (C.c_uint64 * len(ref_intervals))(*ref_intervals)
+        return bins, intervals, self.unaligned
@@ -12,11 +12,11 @@ and returns respective BAM byte values. This does not include tags.
 import ctypes as C
 from enum import IntFlag
 
-from .packed_cigar import OP_CODES, PackedCIGAR
+from .packed_cigar import PackedCIGAR
 from .packed_sequence import PackedSequence, SEQUENCE_VALUES
 from .tag import Tag
-from .util import BufferUnderflow, _qscore_to_str, _to_bytes, _to_str, alignment_length, reg2bin
-from .. import sam
+from .util import BufferUnderflow, MISSING_QUALITY, QUALITY_FROM_SAM, QUALITY_TO_SAM, _qscore_to_str, _to_bytes, _to_str, alignment_length, \
+    reg2bin
 
 SIZEOF_UINT32 = C.sizeof(C.c_uint32)
 
@@ -77,10 +77,11 @@ class Record:
     Represents and manages record data in memory.
     Record data is not necessarily stored in BAM format in memory.
     """
-    __slots__ = '_header', '_name', '_cigar', '_sequence', '_quality_scores', '_tags', '_reference', '_next_reference', '_buffer', '_tags_offset'
+    __slots__ = '_header', '_name', '_cigar', '_sequence', '_quality_scores', '_tags', '_reference', '_next_reference', '_buffer', '_tags_offset', \
+                '_raw', 'virtual_offset'
 
     def __init__(self, header=RecordHeader(), name=b"*", cigar=[], sequence=bytearray(), quality_scores=bytearray(), tags=bytearray(),
-                 references=None, _buffer=None):
+                 references=None, _buffer=None, _raw=None):
         self._header = header
         # TODO init header to defaults
         self._name = name
@@ -92,8 +93,20 @@ class Record:
         self._reference = None if not references or header.reference_id == -1 else references[header.reference_id]
         self._next_reference = None if not references or header.next_reference_id == -1 else references[header.next_reference_id]
         self._buffer = _buffer
-    
+        self._raw = _raw  # BAM formatted record data the record was read from, None once modified
+        self.virtual_offset = None  # BGZF virtual file offset the record was read from, if any
+
     # --- Property getters and setters ---
+    @property
+    def raw(self):
+        """
+        The BAM formatted data the record was read from.
+        Changes to header fields are made in place and are included. Replacing the name, cigar, sequence, quality scores or
+        tags, or calling unpack(), discards it.
+        :return: Buffer containing the entire record, None if the record was modified or not read from BAM data.
+        """
+        return self._raw
+
     @property
     def name(self):
         if self._name is None:
@@ -102,6 +115,7 @@ class Record:
 
     @name.setter
     def name(self, value):
+        self._raw = None
         self._header.block_size += len(value) - len(self._name)
         self._name = value
         self._header.name_length = len(value) + 1
@@ -114,6 +128,7 @@ class Record:
 
     @cigar.setter
     def cigar(self, value):
+        self._raw = None
         self._header.block_size += len(value) - len(self._value)
         # TODO update template length?
         self._cigar = value
@@ -128,6 +143,7 @@ class Record:
 
     @sequence.setter
     def sequence(self, value):
+        self._raw = None
         self._header.block_size += len(value) - len(self._sequence)
         self._sequence = value
         self._header.sequence_length = len(value)
@@ -140,7 +156,8 @@ class Record:
 
     @quality_scores.setter
     def quality_scores(self, value):
-        self._header.block_size += len(value) - len(self._quality_scores)
+        self._raw = None
+        self._header.block_size += len(value) - len(self.quality_scores)
         self._quality_scores = value
 
     def _unpack_tags(self):
@@ -177,6 +194,7 @@ class Record:
     def set_tag(self, value):
         if self._tags is None:
             self._unpack_tags()
+        self._raw = None
         size = value.size()
         for i, tag in enumerate(self._tags):
             if tag.tag == value.tag:
@@ -190,6 +208,7 @@ class Record:
     def del_tag(self, name):
         if self._tags is None:
             self._unpack_tags()
+        self._raw = None
         for i, tag in enumerate(self._tags):
             if tag.tag == name:
                 self._tags.pop(i)
@@ -198,13 +217,17 @@ class Record:
 
     @property
     def position(self):
-        return self._header.block_size
+        return self._header.position
 
     @position.setter
     def position(self, value):
         self._header.position = value
         self._update_bin()
 
+    @property
+    def reference_id(self):
+        return self._header.reference_id
+
     @property
     def reference(self):
         return self._reference
@@ -296,14 +319,15 @@ class Record:
         quality_scores = quality_scores.from_buffer(buffer, offset)
         offset += header.sequence_length
         # Tags
-        if offset < header.block_size - SIZEOF_RECORDHEADER:
+        if offset < len(buffer):
+            # Buffer is retained until tags are unpacked
             tags = None
             self._tags_offset = offset
             # tags = (C.c_ubyte * (header.block_size + SIZEOF_UINT32 - offset - SIZEOF_RECORDHEADER)).from_buffer(buffer, offset)
         else:
             tags = bytes()
+            self._buffer = None
         self._name, self._cigar, self._sequence, self._quality_scores, self._tags = name, cigar, sequence, quality_scores, tags
-        self._buffer = None
 
     @staticmethod
     def from_buffer(buffer, offset=0, references=[]) -> 'Record':
@@ -317,10 +341,12 @@ class Record:
         buffer = memoryview(buffer)
         try:
             header = RecordHeader.from_buffer(buffer, offset)
-            offset += SIZEOF_RECORDHEADER
-            return Record(header, None, None, None, None, None, references, buffer[offset:])
         except ValueError:
             raise BufferUnderflow()
+        end = offset + header.block_size + SIZEOF_INT32
+        if len(buffer) < end:
+            raise BufferUnderflow()
+        return Record(header, None, None, None, None, None, references, buffer[offset + SIZEOF_RECORDHEADER:end], buffer[offset:end])
 
     def to_buffer(self, buffer, offset) -> 'Record':
         """
@@ -331,13 +357,20 @@ class Record:
         """
         # TODO check if buffer large enough
         buffer = memoryview(buffer)
+        if self._raw is not None:
+            # Unmodified, copy the record as is
+            buffer[offset:offset + len(self._raw)] = self._raw.cast("B")
+            new = Record.from_buffer(buffer, offset)
+            new._reference, new._next_reference = self._reference, self._next_reference
+            return new
         self.pack()
         new = Record.__new__(Record)
+        new.virtual_offset = None
+        new._raw = None
         buffer_ptr = C.addressof(buffer)
         new._header = RecordHeader.from_buffer(buffer, offset)
         C.memmove(buffer_ptr, C.addressof(self._header), SIZEOF_RECORDHEADER)
         buffer_ptr += SIZEOF_RECORDHEADER
-        # TODO reduce to one memmove of entire block if contiguous (how to determine if contiguous?)
         length = len(self.name)
         C.memmove(buffer_ptr, self.name, length)  # Buffer initialised to null so will have terminating null after copy
         buffer_ptr += length
@@ -366,11 +399,13 @@ class Record:
         header = bytearray(SIZEOF_RECORDHEADER)
         if stream.readinto(header) != SIZEOF_RECORDHEADER:
             raise EOFError()
-        header = RecordHeader.from_buffer(header)
-        data_len = header.block_size - SIZEOF_RECORDHEADER + SIZEOF_INT32
-        data = bytearray(data_len)
-        assert stream.readinto(data) == data_len, "Unexpected data length."
-        return Record(header, None, None, None, None, None, references, data)
+        # Read the record into one buffer so that it can be written back out as is
+        data = bytearray(RecordHeader.from_buffer(header).block_size + SIZEOF_INT32)
+        data[:SIZEOF_RECORDHEADER] = header
+        data = memoryview(data)
+        data_len = len(data) - SIZEOF_RECORDHEADER
+        assert stream.readinto(data[SIZEOF_RECORDHEADER:]) == data_len, "Unexpected data length."
+        return Record(RecordHeader.from_buffer(data), None, None, None, None, None, references, data[SIZEOF_RECORDHEADER:], data)
 
     def to_stream(self, stream) -> None:
         """
@@ -390,23 +425,38 @@ class Record:
         """
         self._header.bin = reg2bin(self._header.position, self._header.position + alignment_length(self.cigar))
 
-    def pack(self, update=False) -> [RecordHeader, C.Array, C.Array, bytearray, bytearray, bytearray, bytearray]:
+    def pack(self, update=False, quality_table=None) -> [RecordHeader, C.Array, C.Array, bytearray, bytearray, bytearray, bytearray]:
         """
         Prepares the record to be written as BAM format.
-        Converts sequence and cigar to PackedSequence, PackedCIGAR.
-        Packs all tags into byte array.
+        If the record is unmodified its original data is returned as is, see raw.
+        Otherwise converts sequence and cigar to PackedSequence, PackedCIGAR and packs all tags into byte array.
         :param update: Set to True to call update().
-        :return: List containing in order: record header, name, name null terminator, cigar buffer, sequence buffer, quality scores, tags.
+        :param quality_table: bytes.translate() table applied to the packed quality scores, see util.quality_bins(). The record is not modified.
+        :return: List containing the raw record data, or in order: record header, name, name null terminator, cigar buffer, sequence buffer, quality scores, tags.
+            With quality_table, raw record data is split into the data preceding the quality scores, the quality scores and the tags.
         """
+        if self._raw is not None:
+            if quality_table is None:
+                return [self._raw]
+            header = self._header
+            start = SIZEOF_RECORDHEADER + header.name_length + header.cigar_length * SIZEOF_UINT32 + (header.sequence_length + 1) // 2
+            end = start + header.sequence_length
+            return [self._raw[:start], bytes(self._raw[start:end]).translate(quality_table), self._raw[end:]]
         if not self._name:
             self._data_from_buffer()
         self._sequence = PackedSequence.pack(self._sequence)
         self._cigar = PackedCIGAR.pack(self._cigar)
-        tag_buffer = bytearray()
-        if self._tags:
+        if self._tags is None:
+            # Tags were never unpacked, copy them as is
+            tag_buffer = bytearray(self._buffer[self._tags_offset:])
+        else:
+            tag_buffer = bytearray()
             for tag in self._tags:
                 tag_buffer += tag.pack()
-        return [self._header, self._name, CSTRING_TERMINATOR, self._cigar.buffer, self._sequence.buffer, self._quality_scores, tag_buffer]
+        quality_scores = self._quality_scores
+        if quality_table is not None:
+            quality_scores = bytes(quality_scores).translate(quality_table)
+        return [self._header, self._name, CSTRING_TERMINATOR, self._cigar.buffer, self._sequence.buffer, quality_scores, tag_buffer]
 
     def unpack(self) -> None:
         """
@@ -414,6 +464,7 @@ class Record:
         See PackedCIGAR.unpack() and PackedSequence.unpack().
         :return: None
         """
+        self._raw = None
         self._sequence = self._sequence.unpack()
         self._cigar = self._cigar.unpack()
         # TODO tags?
@@ -433,9 +484,12 @@ class Record:
         mapping_quality = int(mapping_quality)
         next_position = int(next_position) - 1
         template_length = int(template_length)
-        cigar = [(int(count), OP_CODES.index(op)) for count, op in sam.cigar_re.findall(cigar)]
-        sequence = bytearray(SEQUENCE_VALUES.index(c) for c in sequence)
-        quality_scores = bytearray(b - 33 for b in quality_scores)
+        cigar = PackedCIGAR.from_sam(cigar)
+        sequence = PackedSequence.from_sam(sequence)
+        if quality_scores == b"*":
+            quality_scores = bytearray((MISSING_QUALITY,)) * len(sequence)
+        else:
+            quality_scores = bytearray(quality_scores.translate(QUALITY_FROM_SAM))
         tags = {}
         for tag in _tags:
             tag = Tag.from_sam(tag)
@@ -484,7 +538,7 @@ class Record:
         """
         return b"\t".join((
             self.name,
-            str(self.flag).encode('ASCII'),
+            str(int(self.flags)).encode('ASCII'),
             self.reference.name.encode('ASCII'),
             str(self.position).encode('ASCII'),
             str(self.mapping_quality).encode('ASCII'),
@@ -493,16 +547,26 @@ class Record:
             str(self.next_position).encode('ASCII'),
             str(self.template_length).encode('ASCII'),
             bytes(self.sequence),
-            bytes(map(lambda x: x + 33, self.quality_scores)),
+            self._sam_quality_scores(),
             b'\t'.join(bytes(tag) for tag in self.tags.values())
         ))
 
+    def _sam_quality_scores(self) -> bytes:
+        """
+        Convert the quality scores to SAM format.
+        :return: bytes instance containing Phred+33 characters, or '*' if the record has no quality scores.
+        """
+        quality_scores = bytes(self.quality_scores)
+        if not quality_scores or quality_scores[0] == MISSING_QUALITY:
+            return b"*"
+        return quality_scores.translate(QUALITY_TO_SAM)
+
     def __len__(self) -> int:
         """
         Returns the bytes length of the record.
         :return: The byte length of the record in memory
         """
-        return self.block_size + SIZEOF_INT32
+        return self._header.block_size + SIZEOF_INT32
 
     def copy(self) -> 'Record':
         """
@@ -510,16 +574,21 @@ class Record:
         :return: A new instance of Record with the copied data.
         """
         new = Record.__new__(Record)
+        new.virtual_offset = self.virtual_offset
+        new._raw = None
         new._header = RecordHeader.from_buffer_copy(self._header)
         new._name = bytearray(self.name)
         new._cigar = self.cigar.copy() if isinstance(self.cigar, PackedCIGAR) else bytearray(self.cigar)
-        new._sequence = self.sequence.copy() if isinstance(self.sequence) else bytearray(self.sequence)
+        new._sequence = self.sequence.copy() if isinstance(self.sequence, PackedSequence) else bytearray(self.sequence)
         new._quality_scores = bytearray(self.quality_scores)
         tags = self._tags
         if tags:
             new.tags = self._tags[:]
         else:
+            # Tags were never unpacked, copy the record body they are read from
             new._tags = None
+            new._buffer = bytearray(self._buffer) if self._buffer is not None else None
+            new._tags_offset = self._tags_offset
         new._reference = self.reference
         new._next_reference = self.next_reference
         return new
@@ -3,6 +3,8 @@ This subpackage contains all of the code required to work with BAM formatted dat
 
 Classes:
     Record: The core representation of a BAM alignment record.
+    RecordBatch: Columnar NumPy view of the fixed fields of consecutive records.
+    RecordCursor: Reusable read only view of the record at a position in a buffer.
     Tag: Represents a record tag.
     CigarOps: Enum of numeric CIGAR operations.
 
@@ -12,16 +14,21 @@ Constants:
     CONSUMES_QUERY (tuple): Boolean values ordered by op code indicating if op consumes a query sequence position.
     CONSUMES_REFERENCE (tuple): Boolean values ordered by op code indicating if op consumes a reference position.
     CLIPPED (tuple): Boolean values ordered by op code indicating if op is soft or hard clip.
+    ILLUMINA_8_LEVEL (bytes): bytes.translate() table of the Illumina 8 level quality binning scheme.
 
 For more:
     >> help(bampy.bam.record) for more information on the Record object.
+    >> help(bampy.bam.batch) for more information on the RecordBatch object.
+    >> help(bampy.bam.cursor) for more information on the RecordCursor object.
     >> help(bampy.bam.packed_cigar) for more information on the PackedCIGAR object.
     >> help(bampy.bam.packed_sequence) for more information on the PackedSequence object.
     >> help(bampy.bam.tag) for more information on the Tag object.
     >> help(bampy.bam.util) for more information on utility functions including functions to work with BAM header data.
 """
 
+from .batch import RecordBatch
+from .cursor import RecordCursor
 from .record import Record
 from .tag import Tag
-from .util import CLIPPED, CONSUMES_QUERY, CONSUMES_REFERENCE, CigarOps, OP_CODES, SEQUENCE_VALUES, header_from_buffer, header_from_stream, \
-    header_to_buffer, header_to_stream, is_bam, pack_header
+from .util import CLIPPED, CONSUMES_QUERY, CONSUMES_REFERENCE, CigarOps, ILLUMINA_8_LEVEL, OP_CODES, SEQUENCE_VALUES, header_from_buffer, \
+    header_from_stream, header_to_buffer, header_to_stream, is_bam, pack_header, quality_bins
@@ -0,0 +1,105 @@
+"""
+Provides RecordBatch, a columnar view of the fixed fields of consecutive BAM records.
+
+Constructing a Record for every alignment is costly when only the fixed header fields are of interest. A RecordBatch
+decodes the headers of all complete records in a buffer at once into NumPy arrays. Requires NumPy.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .record import Record, SIZEOF_RECORDHEADER
+from .util import record_offsets
+
+if np is not None:
+    RECORD_HEADER_DTYPE = np.dtype([
+        ('block_size', '<i4'),
+        ('reference_id', '<i4'),
+        ('position', '<i4'),
+        ('name_length', 'u1'),
+        ('mapping_quality', 'u1'),
+        ('bin', '<u2'),
+        ('cigar_length', '<u2'),
+        ('flag', '<u2'),
+        ('sequence_length', '<i4'),
+        ('next_reference_id', '<i4'),
+        ('next_position', '<i4'),
+        ('template_length', '<i4'),
+    ])  # Mirrors record.RecordHeader
+    assert RECORD_HEADER_DTYPE.itemsize == SIZEOF_RECORDHEADER
+
+    _HEADER_RANGE = np.arange(SIZEOF_RECORDHEADER, dtype=np.intp)
+
+
+def decode_headers(buffer, offsets) -> 'np.ndarray':
+    """
+    Decode the headers of records in bulk.
+    :param buffer: Buffer containing BAM record data.
+    :param offsets: Offsets into buffer of the records to decode.
+    :return: NumPy array of RECORD_HEADER_DTYPE, one element per offset.
+    """
+    offsets = np.asarray(offsets, dtype=np.intp)
+    data = np.frombuffer(buffer, np.uint8)
+    return data[offsets[:, None] + _HEADER_RANGE].view(RECORD_HEADER_DTYPE).reshape(len(offsets))
+
+
+class RecordBatch:
+    """
+    Fixed fields of consecutive records as NumPy arrays.
+    The header fields are accessible as attributes named like the RecordHeader fields, each an array with one element per record.
+    """
+    __slots__ = 'header', 'offsets', 'virtual_offsets', 'buffer'
+
+    def __init__(self, header, offsets, virtual_offsets=None, buffer=None):
+        """
+        Constructor.
+        :param header: NumPy array of RECORD_HEADER_DTYPE.
+        :param offsets: NumPy array of the offsets of the records into buffer.
+        :param virtual_offsets: NumPy array of the BGZF virtual file offsets of the records, None if not read from BGZF data.
+        :param buffer: Buffer containing the record data, used by record().
+        """
+        self.header = header
+        self.offsets = offsets
+        self.virtual_offsets = virtual_offsets
+        self.buffer = buffer
+
+    @classmethod
+    def from_buffer(cls, buffer, offset: int = 0, to_virtual=None) -> ('RecordBatch', int):
+        """
+        Decode all complete records in a buffer.
+        :param buffer: Buffer containing BAM record data.
+        :param offset: Offset into buffer of the first record.
+        :param to_virtual: Function mapping an array of offsets into buffer to virtual offsets, None to leave virtual_offsets unset.
+        :return: Tuple of (RecordBatch instance, possibly empty, offset into buffer following the last complete record).
+        """
+        if np is None:
+            raise ImportError("NumPy is required to decode record batches.")
+        offsets, carry = record_offsets(buffer, offset)
+        batch = cls(decode_headers(buffer, offsets), offsets, to_virtual(offsets) if to_virtual else None, buffer)
+        return batch, len(buffer) - carry
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getattr__(self, name):
+        if name in self.__slots__:
+            # Slot not yet assigned, avoid recursing through self.header
+            raise AttributeError(name)
+        try:
+            return self.header[name]
+        except (ValueError, KeyError):
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name)) from None
+
+    def record(self, index: int, references=None) -> Record:
+        """
+        Construct the Record of one element of the batch.
+        :param index: Index of the record in the batch.
+        :param references: List of References passed to Record.from_buffer().
+        :return: Record instance.
+        """
+        record = Record.from_buffer(self.buffer, int(self.offsets[index]), references)
+        if self.virtual_offsets is not None:
+            record.virtual_offset = int(self.virtual_offsets[index])
+        return record
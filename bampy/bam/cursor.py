@@ -0,0 +1,109 @@
+"""
+Provides RecordCursor, a reusable view of the record at a position in a buffer.
+
+Iterating Record instances allocates a Record, a RecordHeader and a memoryview for every alignment, and more once the
+record body is accessed. A single RecordCursor can instead be moved from record to record, decoding only the header
+fields that are read. Call detach() to keep a record once the cursor moves on.
+"""
+
+import struct
+
+from .record import Record, RecordFlags, SIZEOF_RECORDHEADER
+
+_INT32 = struct.Struct('<i')
+_UINT8 = struct.Struct('<B')
+_UINT16 = struct.Struct('<H')
+
+
+def _field(fmt: struct.Struct, offset: int, doc: str) -> property:
+    """
+    Build a read only property that decodes a record header field at the cursor position.
+    :param fmt: Struct of the field.
+    :param offset: Offset of the field from the start of the record.
+    :param doc: Property docstring.
+    :return: property instance.
+    """
+    unpack_from = fmt.unpack_from
+
+    def getter(self):
+        return unpack_from(self.buffer, self.offset + offset)[0]
+
+    return property(getter, doc=doc)
+
+
+class RecordCursor:
+    """
+    Read only view of the record at offset in buffer.
+    Header fields are named like the Record properties and are decoded each time they are read.
+    """
+    __slots__ = 'buffer', 'offset', 'references', '_block_reader'
+
+    def __init__(self, buffer=None, offset: int = 0, references=None, _block_reader=None):
+        """
+        Constructor.
+        :param buffer: Buffer containing BAM record data.
+        :param offset: Offset into buffer of the first byte of the record.
+        :param references: List of Reference objects to dereference the record reference ids.
+        :param _block_reader: bgzf.Reader that buffer belongs to, used to resolve virtual_offset.
+        """
+        self.buffer = buffer
+        self.offset = offset
+        self.references = references
+        self._block_reader = _block_reader
+
+    block_size = _field(_INT32, 0, "Length of the record following the block_size field.")
+    reference_id = _field(_INT32, 4, "Reference sequence id, -1 if unmapped.")
+    position = _field(_INT32, 8, "0-based leftmost coordinate.")
+    name_length = _field(_UINT8, 12, "Length of the read name including the null terminator.")
+    mapping_quality = _field(_UINT8, 13, "Mapping quality.")
+    bin = _field(_UINT16, 14, "BAI bin computed from the alignment span.")
+    cigar_length = _field(_UINT16, 16, "Number of CIGAR operations.")
+    flag = _field(_UINT16, 18, "Bitwise flags as an int, see flags for RecordFlags.")
+    sequence_length = _field(_INT32, 20, "Length of the sequence.")
+    next_reference_id = _field(_INT32, 24, "Reference sequence id of the next segment, -1 if unmapped.")
+    next_position = _field(_INT32, 28, "0-based leftmost coordinate of the next segment.")
+    template_length = _field(_INT32, 32, "Template length.")
+
+    @property
+    def flags(self) -> RecordFlags:
+        return RecordFlags(self.flag)
+
+    @property
+    def reference(self):
+        reference_id = self.reference_id
+        return None if not self.references or reference_id == -1 else self.references[reference_id]
+
+    @property
+    def next_reference(self):
+        reference_id = self.next_reference_id
+        return None if not self.references or reference_id == -1 else self.references[reference_id]
+
+    @property
+    def name(self) -> bytes:
+        start = self.offset + SIZEOF_RECORDHEADER
+        return bytes(self.buffer[start:start + self.name_length - 1])
+
+    @property
+    def virtual_offset(self) -> int:
+        """
+        BGZF virtual file offset of the record.
+        :return: Virtual file offset, None if the record was not read from BGZF data.
+        """
+        return self._block_reader.virtual_offset(self.offset) if self._block_reader is not None else None
+
+    def detach(self) -> Record:
+        """
+        Construct a Record of the record at the cursor that remains valid once the cursor moves.
+        The Record references the record data rather than copying it.
+        :return: Record instance.
+        """
+        record = Record.from_buffer(self.buffer, self.offset, self.references)
+        record.virtual_offset = self.virtual_offset
+        return record
+
+    def __len__(self) -> int:
+        """
+        Returns the bytes length of the record.
+        :return: The byte length of the record in memory
+        """
+        return self.block_size + _INT32.size
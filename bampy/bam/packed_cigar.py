@@ -1,6 +1,6 @@
 import ctypes as C
 
-from .util import OP_CODES
+from .util import OP_CODES, cigar_from_sam, cigar_to_sam
 
 
 class PackedCIGAR:
@@ -25,7 +25,7 @@ class PackedCIGAR:
         Converts record to SAM format.
         :return: A bytes object representing cigar data in SAM format
         """
-        return b"".join(str(c[0]).encode('ASCII') + OP_CODES[c[1]] for c in self)
+        return cigar_to_sam(bytes(self.buffer))[0]
 
     def __getitem__(self, i):
         if isinstance(i, slice):
@@ -80,6 +80,16 @@ class PackedCIGAR:
         """
         return list(self)
 
+    @staticmethod
+    def from_sam(cigar: bytes) -> 'PackedCIGAR':
+        """
+        Convert a SAM formatted CIGAR string into BAM format.
+        :param cigar: bytes instance containing the SAM CIGAR string.
+        :return: A new PackedCIGAR.
+        """
+        _, packed, _ = cigar_from_sam(cigar)
+        return PackedCIGAR((C.c_uint32 * (len(packed) // C.sizeof(C.c_uint32))).from_buffer_copy(packed))
+
     def copy(self):
         """
         Duplicate the PackedCIGAR instance and underlying buffer.
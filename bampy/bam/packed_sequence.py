@@ -1,5 +1,43 @@
 from .util import SEQUENCE_VALUES
 
+# BAM packs two 4 bit codes per byte, high nibble first, the same layout as a pair of hex digits.
+# bytes.hex() and bytes.fromhex() therefore convert between packed bytes and one code per byte in C,
+# translating hex digits to or from codes or bases is then a single bytes.translate().
+_HEX_DIGITS = b"0123456789abcdef"
+_BASES = b"".join(SEQUENCE_VALUES)
+_HEX_TO_BASE = bytes.maketrans(_HEX_DIGITS, _BASES)
+_HEX_TO_CODE = bytes.maketrans(_HEX_DIGITS, bytes(range(16)))
+_CODE_TO_HEX = bytes.maketrans(bytes(range(16)), _HEX_DIGITS)
+# Unknown bases are encoded as N
+_BASE_TO_HEX = bytearray(b"f" * 256)
+for _code, _base in enumerate(_BASES):
+    _BASE_TO_HEX[_base] = _BASE_TO_HEX[_base | 0x20] = _HEX_DIGITS[_code]
+_BASE_TO_HEX = bytes(_BASE_TO_HEX)
+# Complement of each code, then of each packed byte with its two codes swapped so that reversing the bytes reverses the sequence
+_COMPLEMENT_CODES = tuple(_BASES.index(base) for base in b"=TGKCYSBAWRDMHVN")
+_REVERSE_COMPLEMENT = bytes(_COMPLEMENT_CODES[b & 0b00001111] << 4 | _COMPLEMENT_CODES[b >> 4] for b in range(256))
+
+
+def _pack_hex(digits: bytes) -> bytes:
+    """
+    Pack a string of hex digits, one per code, into BAM format.
+    :param digits: ASCII hex digits.
+    :return: bytes instance containing (len(digits) + 1) // 2 bytes.
+    """
+    if len(digits) & 1:
+        digits += b"0"
+    return bytes.fromhex(digits.decode('ASCII'))
+
+
+def _shift(data: bytes) -> bytes:
+    """
+    Shift packed codes one code towards the start, dropping the first code and leaving the last code 0.
+    :param data: BAM formatted sequence data.
+    :return: bytes instance the same length as data.
+    """
+    size = len(data)
+    return ((int.from_bytes(data, 'big') << 4) & ((1 << size * 8) - 1)).to_bytes(size, 'big')
+
 
 class PackedSequence:
     """
@@ -15,29 +53,41 @@ class PackedSequence:
 
         self._length = length
 
+    def _hex(self, start: int = 0, stop: int = None) -> bytes:
+        """
+        Expand the packed codes between two sequence positions to one hex digit per code.
+        :param start: First sequence position.
+        :param stop: Sequence position following the last, None for the end of the sequence.
+        :return: bytes instance containing ASCII hex digits.
+        """
+        if stop is None:
+            stop = self._length
+        if start >= stop:
+            return b""
+        digits = memoryview(self.buffer)[start // 2:(stop + 1) // 2].hex().encode('ASCII')
+        first = start & 1
+        return digits[first:first + stop - start]
+
     def __repr__(self):
         """
         Convert the BAM formatted sequence into a ASCII string representation.
         :return: str instance containing the sequence.
         """
-        return "".join(SEQUENCE_VALUES[c].decode('ASCII') for c in self)
+        return bytes(self).decode('ASCII')
 
     def __bytes__(self):
         """
         Convert the BAM formatted sequence into SAM format.
         :return: bytes instance containing the sequence.
         """
-        return b"".join(SEQUENCE_VALUES[c] for c in self)
+        return self._hex().translate(_HEX_TO_BASE)
 
     def __getitem__(self, i) -> int:
         if isinstance(i, slice):
-            start = i.start or 0
-            stop = i.stop or len(self)
-            step = i.step or 1
-            s = bytearray((stop - start) // step)
-            for a in range(start, stop, step):
-                s[a] = self[a]
-            return s
+            start, stop, step = i.indices(self._length)
+            if step == 1:
+                return bytearray(self._hex(start, stop).translate(_HEX_TO_CODE))
+            return bytearray(self.unpack()[i])
 
         if i % 2:
             return self.buffer[i // 2] & 0b00001111
@@ -46,11 +96,17 @@ class PackedSequence:
 
     def __setitem__(self, i, value):
         if isinstance(i, slice):
-            start = i.start or 0
-            stop = i.stop or len(self)
-            step = i.step or 1
-            if hasattr(value, '__iter__') and len(value) == (stop - start) // step:
-                # TODO optimise pairwise packing if step == 1
+            start, stop, step = i.indices(self._length)
+            if hasattr(value, '__iter__') and len(value) == len(range(start, stop, step)):
+                if step == 1 and not start & 1 and stop > start:
+                    # Pack pairwise into whole bytes, preserving the low nibble of a trailing half byte
+                    packed = _pack_hex(bytes(value).translate(_CODE_TO_HEX))
+                    buffer = memoryview(self.buffer).cast('B')
+                    end = start // 2 + len(packed)
+                    if stop & 1 and stop < self._length:
+                        packed = packed[:-1] + bytes((packed[-1] | buffer[end - 1] & 0b00001111,))
+                    buffer[start // 2:end] = packed
+                    return
                 for a, b in zip(range(start, stop, step), value):
                     if a % 2:
                         self.buffer[a // 2] = (self.buffer[a // 2] & 0b11110000) | b
@@ -65,21 +121,10 @@ class PackedSequence:
                 self.buffer[i // 2] = (self.buffer[i // 2] & 0b00001111) | (value << 4)
 
     def __iter__(self):
-        count = 1
-        for b in self.buffer:
-            yield b >> 4
-            if count < self._length:
-                yield b & 0b00001111
-            count += 2
+        return iter(self.unpack())
 
     def __reversed__(self):
-        odd = self._length & 1
-        for b in reversed(self.buffer):
-            if odd:
-                odd = False
-            else:
-                yield b & 0b00001111
-            yield b >> 4
+        return reversed(self.unpack())
 
     def __len__(self):
         return self._length
@@ -100,12 +145,53 @@ class PackedSequence:
 
         return packed
 
+    @staticmethod
+    def from_sam(sequence: bytes) -> 'PackedSequence':
+        """
+        Convert a SAM formatted sequence into BAM format.
+        Lower case bases are accepted, unknown bases are converted to N.
+        :param sequence: bytes like object containing ASCII bases.
+        :return: A new PackedSequence.
+        """
+        return PackedSequence(bytearray(_pack_hex(bytes(sequence).translate(_BASE_TO_HEX))), len(sequence))
+
+    def subsequence(self, start: int = None, stop: int = None) -> 'PackedSequence':
+        """
+        Copy part of the sequence without unpacking it.
+        Slicing with [] returns unpacked codes, this copies the packed bytes, shifting them by one code if start is odd.
+        :param start: First sequence position, negative values count from the end. None for the start of the sequence.
+        :param stop: Sequence position following the last, negative values count from the end. None for the end of the sequence.
+        :return: A new PackedSequence.
+        """
+        start, stop, _ = slice(start, stop).indices(self._length)
+        length = max(stop - start, 0)
+        data = bytes(memoryview(self.buffer)[start // 2:(start + length + 1) // 2])
+        if start & 1:
+            data = _shift(data)
+        data = bytearray(data[:(length + 1) // 2])
+        if length & 1:
+            # Clear the unused low nibble of the last byte
+            data[-1] &= 0b11110000
+        return PackedSequence(data, length)
+
+    def reverse_complement(self) -> 'PackedSequence':
+        """
+        Reverse complement the sequence without unpacking it.
+        IUPAC ambiguity codes are complemented, = and N are their own complement.
+        :return: A new PackedSequence.
+        """
+        data = bytes(memoryview(self.buffer)[:(self._length + 1) // 2])[::-1].translate(_REVERSE_COMPLEMENT)
+        if self._length & 1:
+            # The unused low nibble of the last byte is now the first code
+            data = _shift(data)
+        return PackedSequence(bytearray(data), self._length)
+
     def unpack(self):
         """
         Converts to a bytes sequence code string.
         :return: bytes instance containing sequence
         """
-        return bytes(iter(self))
+        return self._hex().translate(_HEX_TO_CODE)
 
     def copy(self):
         """
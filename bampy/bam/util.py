@@ -1,19 +1,32 @@
+import array
 import ctypes as C
+import functools
+import re
+import struct
 from enum import IntEnum
 from typing import Tuple
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from .. import sam
 from ..reference import Reference
 
 SIZEOF_INT32 = C.sizeof(C.c_int32)
 
+_RECORD_HEADER = struct.Struct('<iiiBBHHHiiii')  # Mirrors record.RecordHeader
+_INT32 = struct.Struct('<i')
+_UINT32 = struct.Struct('<I')
+
 MAGIC = b'BAM\x01'
 """bytes: Magic bytes identifying BAM record"""
 
 OP_CODES = tuple(b"MIDNSHP=X"[i:i + 1] for i in range(9))
 """tuple: ASCII encoded CIGAR operations indexed by their numeric op codes."""
 
-SEQUENCE_VALUES = tuple(b"=ACMGRSVTWYHKDBN"[i:i + 1] for i in range(9))
+SEQUENCE_VALUES = tuple(b"=ACMGRSVTWYHKDBN"[i:i + 1] for i in range(16))
 """tuple: ASCII encoded sequence values indexed by their numeric code."""
 
 
@@ -70,6 +83,38 @@ CLIPPED = (
 )
 """tuple: Boolean values ordered by op code indicating if op is soft or hard clip."""
 
+MISSING_QUALITY = 0xFF
+"""int: Quality score value filling the quality scores of a record that has none, '*' in SAM."""
+
+QUALITY_TO_SAM = bytes(min(q, 93) + 33 for q in range(256))
+"""bytes: bytes.translate() table converting BAM quality scores to SAM Phred+33 characters."""
+
+QUALITY_FROM_SAM = bytes(max(c - 33, 0) for c in range(256))
+"""bytes: bytes.translate() table converting SAM Phred+33 characters to BAM quality scores."""
+
+
+def quality_bins(bins) -> bytes:
+    """
+    Build a bytes.translate() table that bins BAM quality scores.
+    Scores below the first bin and MISSING_QUALITY are left unchanged.
+    :param bins: Iterable of (lowest score, binned score) tuples, each bin covers the scores up to the next.
+    :return: bytes instance of length 256.
+    """
+    table = bytearray(range(256))
+    bins = sorted(bins) + [(MISSING_QUALITY, MISSING_QUALITY)]
+    for (low, value), (high, _) in zip(bins, bins[1:]):
+        table[low:high] = bytes((value,)) * (high - low)
+    return bytes(table)
+
+
+ILLUMINA_8_LEVEL = quality_bins(((2, 6), (10, 15), (20, 22), (25, 27), (30, 33), (35, 37), (40, 40)))
+"""bytes: quality_bins() table of the Illumina 8 level quality binning scheme."""
+
+CIGAR_CACHE_SIZE = 4096
+"""int: Number of distinct CIGARs memoized by cigar_to_sam() and cigar_from_sam()."""
+
+_CIGAR_RE = re.compile(sam.cigar_re.pattern.encode('ASCII'))
+
 
 def is_bam(buffer, offset=0):
     """
@@ -101,7 +146,7 @@ def _qscore_to_str(data):
     :param data:
     :return:
     """
-    return ''.join(map(lambda x: chr(x + 33), data))
+    return bytes(data).translate(QUALITY_TO_SAM).decode('ASCII')
 
 
 def _to_bytes(data):
@@ -125,6 +170,83 @@ def _to_str(data):
         return str(data.value)
 
 
+def record_offsets(buffer, offset=0, end=None) -> tuple:
+    """
+    Find the start of every complete record in a run of consecutive records, reading only the block_size fields.
+    The data may span several inflated blocks placed back to back, such as the data carried over from the previous block
+    followed by the next block.
+    :param buffer: Buffer containing BAM record data.
+    :param offset: Offset into buffer of the first record.
+    :param end: Offset into buffer following the data to walk, None for len(buffer).
+    :return: Tuple of (record offsets as a NumPy int64 array, or array.array('q') if NumPy is not available,
+             number of bytes at the end of the data belonging to a record that continues into the next block).
+    """
+    if end is None:
+        end = len(buffer)
+    offsets = array.array('q')
+    append = offsets.append
+    unpack_from = _INT32.unpack_from
+    min_size = _RECORD_HEADER.size
+    last = end - min_size
+    while offset <= last:
+        size = unpack_from(buffer, offset)[0] + SIZEOF_INT32
+        if size < min_size:
+            raise ValueError("Invalid record size {} at offset {}.".format(size, offset))
+        if offset + size > end:
+            break
+        append(offset)
+        offset += size
+    if np is not None:
+        offsets = np.frombuffer(offsets, np.int64) if offsets else np.empty(0, np.int64)
+    return offsets, end - offset
+
+
+def record_size(buffer, offset, n_ref) -> int:
+    """
+    Check if offset plausibly points to the start of a BAM record.
+    Verifies the record header fields are within range and consistent with the record length.
+    :param buffer: Buffer containing BAM record data.
+    :param offset: Offset into buffer to check.
+    :param n_ref: Number of references in the BAM header.
+    :return: Total size of the record, 0 if the data is not a record, or -1 if the buffer ends before the record header does.
+    """
+    if len(buffer) < offset + _RECORD_HEADER.size:
+        return -1
+    block_size, reference_id, position, name_length, _, _, cigar_length, _, sequence_length, next_reference_id, next_position, _ = \
+        _RECORD_HEADER.unpack_from(buffer, offset)
+    if not (-1 <= reference_id < n_ref and -1 <= next_reference_id < n_ref and position >= -1 and next_position >= -1
+            and name_length > 1 and sequence_length >= 0):
+        return 0
+    if block_size < _RECORD_HEADER.size - SIZEOF_INT32 + name_length + cigar_length * SIZEOF_INT32 + (sequence_length + 1) // 2 + sequence_length:
+        return 0
+    name_end = offset + _RECORD_HEADER.size + name_length - 1
+    if name_end < len(buffer) and buffer[name_end] != 0:
+        return 0
+    return block_size + SIZEOF_INT32
+
+
+def find_record(buffer, offset=0, n_ref=0) -> int:
+    """
+    Find the first record starting at or after offset in a buffer that may begin part way through a record.
+    A candidate is only accepted if every record following it up to the end of the buffer also appears valid.
+    :param buffer: Buffer containing BAM record data.
+    :param offset: Offset into buffer to begin searching from.
+    :param n_ref: Number of references in the BAM header.
+    :return: Offset of the first record or None if no record was found.
+    """
+    buffer_len = len(buffer)
+    for candidate in range(offset, buffer_len):
+        position = candidate
+        while position < buffer_len:
+            size = record_size(buffer, position, n_ref)
+            if size <= 0:
+                break
+            position += size
+        if size != 0 and position != candidate:
+            return candidate
+    return None
+
+
 def header_from_stream(stream, _magic=None) -> Tuple[bytearray, list, int]:
     """
     Read in BAM header data.
@@ -254,12 +376,54 @@ def header_to_buffer(buffer, offset=0, sam_header=b'', references=()) -> int:
     return end + 1
 
 
+@functools.lru_cache(maxsize=CIGAR_CACHE_SIZE)
+def cigar_to_sam(packed: bytes) -> Tuple[bytes, int]:
+    """
+    Convert BAM formatted CIGAR operations to SAM format.
+    Memoized, alignments share relatively few distinct CIGARs.
+    :param packed: bytes instance containing the little endian uint32 operations (op length << 4 | op).
+    :return: Tuple of (SAM CIGAR string, alignment length).
+    """
+    text = []
+    total = 0
+    for op, in _UINT32.iter_unpack(packed):
+        count, op = op >> 4, op & 0b1111
+        text.append(str(count).encode('ASCII') + OP_CODES[op])
+        if CONSUMES_REFERENCE[op]:
+            total += count
+    return b"".join(text) or b"*", total
+
+
+@functools.lru_cache(maxsize=CIGAR_CACHE_SIZE)
+def cigar_from_sam(text: bytes) -> Tuple[tuple, bytes, int]:
+    """
+    Parse a SAM CIGAR string.
+    Memoized, alignments share relatively few distinct CIGARs.
+    :param text: bytes instance containing the SAM CIGAR string.
+    :return: Tuple of (tuple of (op length, op) tuples, BAM formatted operations, alignment length).
+    """
+    cigar = tuple((int(count), OP_CODES.index(op)) for count, op in _CIGAR_RE.findall(text))
+    return cigar, b"".join(_UINT32.pack(count << 4 | op) for count, op in cigar), alignment_length(cigar)
+
+
+def clear_cigar_cache() -> None:
+    """
+    Release all CIGARs memoized by cigar_to_sam() and cigar_from_sam().
+    """
+    cigar_to_sam.cache_clear()
+    cigar_from_sam.cache_clear()
+
+
 def alignment_length(cigar):
     """
     Count number of reference consuming positions that CIGAR represents.
-    :param cigar: Iterable returning tuples of the form (op length, op).
+    :param cigar: PackedCIGAR, or iterable returning tuples of the form (op length, op).
     :return: Total alignment length of CIGAR.
     """
+    buffer = getattr(cigar, 'buffer', None)
+    if buffer is not None:
+        # PackedCIGAR
+        return cigar_to_sam(bytes(buffer))[1]
     total = 0
     for count, op in cigar:
         if CONSUMES_REFERENCE[op]:
@@ -303,3 +467,46 @@ def reg2bins(beg, end):
     for k in range(585 + (beg >> 17), 586 + (end >> 17)): bins.append(k)
     for k in range(4681 + (beg >> 14), 4682 + (end >> 14)): bins.append(k)
     return bins
+
+
+def reg2bin_csi(beg, end, min_shift=14, depth=5):
+    """
+    Calculate bin given an alignment covering [beg,end) (zero-based, half-closed-half-open) for a binning index
+    with configurable minimum interval size and depth.
+    Adapted directly from CSI spec.
+    :param beg:
+    :param end:
+    :param min_shift: Bins on the lowest level span 2**min_shift positions.
+    :param depth: Number of levels below the root bin.
+    :return:
+    """
+    end -= 1
+    s = min_shift
+    t = ((1 << depth * 3) - 1) // 7
+    for l in range(depth, 0, -1):
+        if beg >> s == end >> s: return t + (beg >> s)
+        s += 3
+        t -= 1 << l * 3 - 3
+    return 0
+
+
+def reg2bins_csi(beg, end, min_shift=14, depth=5):
+    """
+    Calculate the list of bins that may overlap with region [beg,end) (zero-based) for a binning index
+    with configurable minimum interval size and depth.
+    Adapted directly from CSI spec.
+    :param beg:
+    :param end:
+    :param min_shift: Bins on the lowest level span 2**min_shift positions.
+    :param depth: Number of levels below the root bin.
+    :return:
+    """
+    end -= 1
+    bins = []
+    s = min_shift + depth * 3
+    t = 0
+    for l in range(depth + 1):
+        bins.extend(range(t + (beg >> s), t + (end >> s) + 1))
+        s -= 3
+        t += 1 << l * 3
+    return bins
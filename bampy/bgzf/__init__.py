@@ -3,7 +3,9 @@ This subpackage contains all the code needed to work with BGZF compressed data.
 
 Classes:
     Block: Represents a BGZF/GZIP block.
+    BlockCache: Thread safe LRU cache of inflated blocks that can be shared between readers.
     Reader: Convenience interface to read in compressed data.
+    Ring: Window of inflated data that readers inflate consecutive blocks into.
     Writer: Convenience interface to write compressed data.
 
 Constants:
@@ -14,11 +16,18 @@ For more:
     >> help(bampy.bgzf.block) for more information on the Block object.
     >> help(bampy.bgzf.reader) for more information on the Reader object.
     >> help(bampy.bgzf.writer) for more information on the Writer object.
+    >> help(bampy.bgzf.codec) for more information on selecting the [de]compression backend.
+    >> help(bampy.bgzf.cache) for more information on the BlockCache object.
+    >> help(bampy.bgzf.ring) for more information on the Ring object and how split records are read without copying.
+    >> help(bampy.bgzf.gzi) for more information on GZI indexes for random access to uncompressed offsets.
     >> help(bampy.bgzf.util) for more information on utility functions including functions to work with BGZF data.
     >> help(bampy.bgzf.zlib) for more information on the zlib wrapper.
 """
 
+from . import codec, gzi
 from .block import Block, MAX_CDATA_SIZE
+from .cache import BlockCache
 from .reader import EmptyBlock, Reader
+from .ring import Ring
 from .util import EMPTY_BLOCK, MAX_BLOCK_SIZE, SIZEOF_EMPTY_BLOCK, is_bgzf
 from .writer import Writer
@@ -0,0 +1,140 @@
+"""
+Provides a cache of inflated block data for readers that repeatedly revisit the same blocks.
+"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 64 * 2 ** 20
+"""int: Default maximum number of inflated bytes held by a BlockCache (64MB, roughly 1000 full blocks)."""
+
+
+class _Pinned:
+    """
+    Cache source of an input that does not support weak references.
+    Compares by the identity of the input and holds a reference to it, so its id can not be reused by another input
+    while any of its blocks are cached.
+    """
+    __slots__ = 'input'
+
+    def __init__(self, input):
+        self.input = input
+
+    def __hash__(self):
+        return id(self.input)
+
+    def __eq__(self, other):
+        return isinstance(other, _Pinned) and other.input is self.input
+
+
+class BlockCache:
+    """
+    Thread safe least recently used cache of inflated block data.
+    Blocks are keyed on (source, compressed block offset) so that a single cache can be shared between readers, see source().
+    The least recently used blocks are evicted once the total size of the cached data exceeds max_size.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Constructor.
+        :param max_size: Maximum number of inflated bytes to hold.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._finalizers = {}  # weakref.finalize instances keyed on the sources of inputs that support weak references
+        self._lock = threading.RLock()  # Reentrant as sources may be collected, and evicted, while it is held
+
+    def source(self, input):
+        """
+        Identify an input, to key its blocks on along with their compressed offsets.
+        Files are identified by device, inode, size and modification time so that blocks cached from a file that has since
+        been replaced or rewritten are not returned. Other inputs are identified by the object. Their blocks are evicted
+        when the object is collected, or if it does not support weak references, the blocks hold a reference to it.
+        :param input: Stream or buffer that blocks are read from.
+        :return: Hashable source key.
+        """
+        try:
+            stat = os.fstat(input.fileno())
+            return 'file', stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+        except (AttributeError, OSError, ValueError):
+            pass
+        source = 'object', id(input)
+        with self._lock:
+            finalizer = self._finalizers.get(source)
+            if finalizer is not None and finalizer.alive:
+                return source
+            try:
+                finalizer = weakref.finalize(input, self._evict, source)
+            except TypeError:
+                return _Pinned(input)
+            finalizer.atexit = False
+            self._finalizers[source] = finalizer
+        return source
+
+    def _evict(self, source) -> None:
+        """
+        Remove all blocks of a source.
+        :param source: Source key returned by source().
+        :return: None
+        """
+        with self._lock:
+            self._finalizers.pop(source, None)
+            for key in [key for key in self._blocks if key[0] == source]:
+                self.size -= len(self._blocks.pop(key))
+
+    def get(self, key) -> bytes or None:
+        """
+        Look up the inflated data of a block.
+        :param key: (source, compressed block offset) tuple.
+        :return: Inflated data or None if the block is not cached.
+        """
+        with self._lock:
+            data = self._blocks.get(key)
+            if data is None:
+                self.misses += 1
+            else:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def put(self, key, data: bytes) -> None:
+        """
+        Add the inflated data of a block, evicting the least recently used blocks as needed.
+        :param key: (source, compressed block offset) tuple.
+        :param data: Inflated data. Must not be modified after being added.
+        :return: None
+        """
+        if len(data) > self.max_size:
+            return
+        with self._lock:
+            previous = self._blocks.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._blocks[key] = data
+            self.size += len(data)
+            while self.size > self.max_size:
+                _, evicted = self._blocks.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        """
+        Remove all blocks and reset the hit and miss counters.
+        :return: None
+        """
+        with self._lock:
+            self._blocks.clear()
+            self.size = self.hits = self.misses = 0
+            for finalizer in self._finalizers.values():
+                finalizer.detach()
+            self._finalizers.clear()
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __contains__(self, key):
+        return key in self._blocks
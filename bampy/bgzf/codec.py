@@ -0,0 +1,238 @@
+"""
+Provides interchangeable raw deflate implementations used to compress and decompress whole BGZF blocks.
+
+Backends:
+    zlib: System zlib through the ctypes wrapper in bampy.bgzf.zlib. Always available.
+    libdeflate: libdeflate loaded through ctypes if found on the system.
+    isal: ISA-L through the isal package if installed.
+
+get() resolves a backend by name, or the fastest available backend if no name is given.
+"""
+
+import ctypes as C
+import threading
+from ctypes import util
+
+from . import zlib
+
+PREFERENCE = ('libdeflate', 'isal', 'zlib')
+"""tuple: Backend names in order of preference when auto-detecting."""
+
+
+class CodecError(ValueError):
+    """Exception used to signal that a block could not be compressed or decompressed."""
+    pass
+
+
+class Codec:
+    """
+    Base class for raw deflate backends.
+    Implementations are thread safe, any per call state is held per thread.
+    """
+    name = None
+
+    def compress(self, src, dest, level=zlib.DEFAULT_COMPRESSION_LEVEL) -> int:
+        """
+        Compress a complete block of data.
+        :param src: Buffer containing the uncompressed data.
+        :param dest: Buffer to write the compressed data to.
+        :param level: zlib compression level from 0-9, mapped onto the backend's own levels.
+        :return: Number of bytes written to dest.
+        """
+        raise NotImplementedError()
+
+    def decompress(self, src, dest) -> int:
+        """
+        Decompress a complete block of data.
+        :param src: Buffer containing the compressed data.
+        :param dest: Buffer to write the uncompressed data to.
+        :return: Number of bytes written to dest.
+        """
+        raise NotImplementedError()
+
+
+class ZlibCodec(Codec):
+    """
+    Implements Codec using the system zlib.
+    """
+    name = 'zlib'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def compress(self, src, dest, level=zlib.DEFAULT_COMPRESSION_LEVEL) -> int:
+        try:
+            deflaters = self._local.deflaters
+        except AttributeError:
+            deflaters = self._local.deflaters = {}
+        deflater = deflaters.get(level)
+        if deflater is None:
+            deflater = deflaters[level] = zlib.Deflater(level)
+        deflater.reset(dest)
+        res, state = deflater(src, zlib.Z_FINISH)
+        if res != zlib.Z_STREAM_END:
+            raise CodecError("Failed to compress block (Code: {}).".format(res))
+        return state.total_out
+
+    def decompress(self, src, dest) -> int:
+        res, state = zlib.inflater()(src, dest)
+        if res not in (zlib.Z_OK, zlib.Z_STREAM_END):
+            raise CodecError("Invalid zlib data (Code: {}).".format(res))
+        return state.total_out
+
+
+class _LibdeflateHandle:
+    """
+    Owns a libdeflate compressor or decompressor and frees it when released.
+    """
+
+    def __init__(self, handle, free):
+        self.handle = handle
+        self._free = free
+
+    def __del__(self):
+        self._free(self.handle)
+
+
+class LibdeflateCodec(Codec):
+    """
+    Implements Codec using libdeflate.
+    """
+    name = 'libdeflate'
+
+    def __init__(self, path=None):
+        """
+        Constructor.
+        :param path: Path to the libdeflate shared library, None to search the system.
+        """
+        path = path or util.find_library('deflate')
+        if not path:
+            raise ImportError("libdeflate not found.")
+        lib = self._lib = C.cdll.LoadLibrary(path)
+        lib.libdeflate_alloc_compressor.restype = C.c_void_p
+        lib.libdeflate_alloc_compressor.argtypes = (C.c_int,)
+        lib.libdeflate_free_compressor.argtypes = (C.c_void_p,)
+        lib.libdeflate_deflate_compress.restype = C.c_size_t
+        lib.libdeflate_deflate_compress.argtypes = (C.c_void_p, C.c_void_p, C.c_size_t, C.c_void_p, C.c_size_t)
+        lib.libdeflate_alloc_decompressor.restype = C.c_void_p
+        lib.libdeflate_alloc_decompressor.argtypes = ()
+        lib.libdeflate_free_decompressor.argtypes = (C.c_void_p,)
+        lib.libdeflate_deflate_decompress.restype = C.c_int
+        lib.libdeflate_deflate_decompress.argtypes = (C.c_void_p, C.c_void_p, C.c_size_t, C.c_void_p, C.c_size_t, C.POINTER(C.c_size_t))
+        self._local = threading.local()
+
+    def compress(self, src, dest, level=zlib.DEFAULT_COMPRESSION_LEVEL) -> int:
+        try:
+            compressors = self._local.compressors
+        except AttributeError:
+            compressors = self._local.compressors = {}
+        compressor = compressors.get(level)
+        if compressor is None:
+            # libdeflate levels 0-9 match zlib, the default zlib level of -1 corresponds to 6
+            compressor = compressors[level] = _LibdeflateHandle(self._lib.libdeflate_alloc_compressor(6 if level < 0 else level),
+                                                                self._lib.libdeflate_free_compressor)
+        size = self._lib.libdeflate_deflate_compress(compressor.handle, src, len(src), dest, len(dest))
+        if not size:
+            raise CodecError("Compressed block exceeds the output buffer.")
+        return size
+
+    def decompress(self, src, dest) -> int:
+        try:
+            decompressor = self._local.decompressor
+        except AttributeError:
+            decompressor = self._local.decompressor = _LibdeflateHandle(self._lib.libdeflate_alloc_decompressor(),
+                                                                        self._lib.libdeflate_free_decompressor)
+        size = C.c_size_t()
+        res = self._lib.libdeflate_deflate_decompress(decompressor.handle, src, len(src), dest, len(dest), C.byref(size))
+        if res:
+            raise CodecError("Invalid deflate data (Code: {}).".format(res))
+        return size.value
+
+
+class IsalCodec(Codec):
+    """
+    Implements Codec using ISA-L through the isal package.
+    """
+    name = 'isal'
+
+    def __init__(self):
+        from isal import isal_zlib
+        self._isal_zlib = isal_zlib
+
+    def compress(self, src, dest, level=zlib.DEFAULT_COMPRESSION_LEVEL) -> int:
+        # ISA-L only provides levels 0-3. Level 0 expands incompressible data beyond MAX_CDATA_SIZE, so it is never used
+        cdata = self._isal_zlib.compress(src, 2 if level < 0 else max(1, (level + 2) // 3), wbits=-zlib.MAX_WBITS)
+        size = len(cdata)
+        if size > len(dest):
+            raise CodecError("Compressed block exceeds the output buffer.")
+        C.memmove(dest, cdata, size)
+        return size
+
+    def decompress(self, src, dest) -> int:
+        try:
+            data = self._isal_zlib.decompress(src, wbits=-zlib.MAX_WBITS, bufsize=len(dest))
+        except self._isal_zlib.error as e:
+            raise CodecError("Invalid deflate data ({}).".format(e))
+        size = len(data)
+        if size > len(dest):
+            raise CodecError("Decompressed block exceeds the output buffer.")
+        C.memmove(dest, data, size)
+        return size
+
+
+BACKENDS = {
+    ZlibCodec.name: ZlibCodec,
+    LibdeflateCodec.name: LibdeflateCodec,
+    IsalCodec.name: IsalCodec,
+}
+"""dict: Codec implementations keyed on name."""
+
+_codecs = {}
+_default = None
+_lock = threading.Lock()
+
+
+def get(codec=None) -> Codec:
+    """
+    Resolve a codec.
+    :param codec: Codec instance, backend name, or None for the fastest available backend.
+    :return: Codec instance. Instances are shared between callers.
+    """
+    global _default
+    if isinstance(codec, Codec):
+        return codec
+    with _lock:
+        if codec is None:
+            if _default is None:
+                for name in PREFERENCE:
+                    try:
+                        _default = _get(name)
+                        break
+                    except ImportError:
+                        continue
+            return _default
+        return _get(codec)
+
+
+def _get(name) -> Codec:
+    instance = _codecs.get(name)
+    if instance is None:
+        if name not in BACKENDS:
+            raise ValueError("Unknown codec: {}".format(name))
+        instance = _codecs[name] = BACKENDS[name]()
+    return instance
+
+
+def available() -> list:
+    """
+    List the backends that can be loaded on this system.
+    :return: List of backend names in order of preference.
+    """
+    names = []
+    for name in PREFERENCE:
+        try:
+            get(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
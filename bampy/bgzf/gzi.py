@@ -0,0 +1,98 @@
+"""
+Provides support for GZI indexes (as produced by bgzip -i) mapping uncompressed data offsets to BGZF blocks.
+"""
+
+import io
+
+from .block import Block
+from .util import block_size
+
+
+def build(input) -> list:
+    """
+    Build GZI index data for BGZF compressed data.
+    Blocks are not inflated, the uncompressed size is taken from each block trailer.
+    :param input: A stream or buffer object containing BGZF compressed data from its first block.
+    :return: List of (compressed offset, uncompressed offset) tuples for the start of each block, see read().
+    """
+    index = [(0, 0)]
+    compressed = uncompressed = 0
+    if isinstance(input, (io.RawIOBase, io.BufferedIOBase)):
+        while True:
+            try:
+                block, _ = Block.from_stream(input)
+            except EOFError:
+                break
+            compressed += len(block)
+            uncompressed += block.uncompressed_size
+            if block.uncompressed_size:
+                index.append((compressed, uncompressed))
+    else:
+        length = len(input)
+        while compressed < length:
+            size = block_size(input, compressed)
+            if not size:
+                raise ValueError("Invalid block found at offset {}.".format(compressed))
+            compressed += size
+            isize = int.from_bytes(input[compressed - 4:compressed], byteorder='little', signed=False)
+            uncompressed += isize
+            if isize:
+                index.append((compressed, uncompressed))
+    if len(index) > 1:
+        # The last entry points past the final block of data
+        index.pop()
+    return index
+
+
+def read(stream) -> list:
+    """
+    Read in GZI index data.
+    :param stream: Readable stream containing GZI formatted data.
+    :return: List of (compressed offset, uncompressed offset) tuples for the start of each block.
+             The first block (0, 0) is implicit in the file format but included in the list.
+    """
+    n = int.from_bytes(stream.read(8), byteorder='little', signed=False)  # UINT64
+    data = stream.read(16 * n)
+    assert len(data) == 16 * n, "Truncated GZI data."
+    index = [(0, 0)]
+    for i in range(0, len(data), 16):
+        index.append((int.from_bytes(data[i:i + 8], byteorder='little', signed=False),
+                      int.from_bytes(data[i + 8:i + 16], byteorder='little', signed=False)))
+    return index
+
+
+def write(stream, index: list) -> None:
+    """
+    Write out index in GZI format.
+    :param stream: Writable output stream.
+    :param index: List of (compressed offset, uncompressed offset) tuples as returned by build() or read().
+    :return: None
+    """
+    entries = [entry for entry in index if entry != (0, 0)]
+    stream.write(len(entries).to_bytes(8, 'little', signed=False))
+    for compressed, uncompressed in entries:
+        stream.write(compressed.to_bytes(8, 'little', signed=False))
+        stream.write(uncompressed.to_bytes(8, 'little', signed=False))
+
+
+def virtual_offset(index: list, offset: int) -> int:
+    """
+    Convert an uncompressed data offset to a BGZF virtual file offset.
+    :param index: List of (compressed offset, uncompressed offset) tuples as returned by build() or read().
+    :param offset: Offset into the uncompressed data.
+    :return: Virtual file offset (compressed block start << 16 | offset into uncompressed block data).
+    """
+    if offset < 0:
+        raise ValueError("Offset {} is before the first block.".format(offset))
+    # Binary search for the last block starting at or before offset
+    low, high = 0, len(index)
+    while low < high:
+        mid = (low + high) // 2
+        if index[mid][1] <= offset:
+            low = mid + 1
+        else:
+            high = mid
+    compressed, uncompressed = index[low - 1]
+    if offset - uncompressed > 0xFFFF:
+        raise ValueError("Offset {} is beyond the end of the indexed data.".format(offset))
+    return compressed << 16 | (offset - uncompressed)
@@ -0,0 +1,65 @@
+"""
+Provides a pool of fixed size buffers recycled between blocks.
+"""
+
+import threading
+import weakref
+
+
+class BufferPool:
+    """
+    Thread safe pool of equally sized bytearrays.
+    acquire() never blocks, a new buffer is allocated if none are free. At most count released buffers are retained,
+    any more are left to the garbage collector. This bounds the memory held by the pool while removing the allocation
+    per block in the steady state.
+    """
+
+    def __init__(self, size: int, count: int):
+        """
+        Constructor.
+        :param size: Size of each buffer in bytes.
+        :param count: Maximum number of free buffers to retain.
+        """
+        self.size = size
+        self.count = count
+        self.allocated = 0
+        self.reused = 0
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        """
+        Take a buffer from the pool. The contents of the buffer are undefined.
+        :return: bytearray of length size.
+        """
+        with self._lock:
+            if self._free:
+                self.reused += 1
+                return self._free.pop()
+            self.allocated += 1
+        return bytearray(self.size)
+
+    def release(self, buffer: bytearray) -> None:
+        """
+        Return a buffer to the pool. The buffer must not be used by the caller afterwards.
+        :param buffer: bytearray previously returned by acquire().
+        :return: None
+        """
+        if len(buffer) != self.size:
+            return
+        with self._lock:
+            if len(self._free) < self.count:
+                self._free.append(buffer)
+
+    def recycle(self, owner, buffer: bytearray) -> None:
+        """
+        Return a buffer to the pool once owner has been garbage collected.
+        Used for buffers handed to consumers that may hold references to them, such as records referencing a block buffer.
+        :param owner: Weak referenceable object that references buffer, typically a ctypes array created from it.
+        :param buffer: bytearray previously returned by acquire().
+        :return: None
+        """
+        weakref.finalize(owner, self.release, buffer)
+
+    def __len__(self):
+        return len(self._free)
@@ -5,8 +5,14 @@ Provides a convenience iterator to read in block data.
 import ctypes as C
 import io
 
-from . import zlib
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import codec as _codec, gzi
 from .block import Block
+from .ring import Ring
 
 
 class EmptyBlock(ValueError):
@@ -18,43 +24,171 @@ class _Reader:
     """
     Base class for buffer and stream readers.
     Provides Iterable interface to read in blocks.
+    Blocks are inflated into a Ring so that data remaining from the previous block is normally followed by the next block
+    without being copied. self.buffer is a view of the ring holding the remaining data followed by the latest block.
     """
 
-    def __init__(self, input):
+    def __init__(self, input, cache=None, codec=None):
         """
         Constructor.
         :param input: Block data source.
+        :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available. See codec.get().
         """
+        self.codec = _codec.get(codec)
+        self.cache = cache
+        self.ring = Ring()
+        self._cache_source = cache.source(input) if cache is not None else None  # Distinguishes inputs sharing a cache
         self.total_in = 0
         self.total_out = 0
         self.remaining = 0
         self._input = input
         self.buffer = None
+        self.offset = 0
+        self.block_offset = 0  # Compressed offset of the most recently inflated block
+        self._block_start = 0  # Offset into buffer where the data of the most recently inflated block begins
+        self._carry_offset = 0  # Virtual offset of buffer[0] if the buffer begins with data carried forward
 
-    def _inflate(self, block, cdata):
-        if self.remaining:
-            # Copy forward any remaining data into the next buffer
-            edata = (C.c_ubyte * (block.uncompressed_size + self.remaining))()
-            C.memmove(edata, C.byref(self.buffer, len(self.buffer) - self.remaining), self.remaining)
-            data = (C.c_ubyte * block.uncompressed_size).from_buffer(edata, self.remaining)
-        else:
-            data = (C.c_ubyte * block.uncompressed_size)()
+    def virtual_offset(self, buffer_offset: int) -> int:
+        """
+        Convert an offset into the current buffer to a BGZF virtual file offset.
+        A position at the end of the inflated data resolves to the start of the following block.
+        :param buffer_offset: Offset into self.buffer.
+        :return: Virtual file offset (compressed block start << 16 | offset into uncompressed block data).
+        """
+        if buffer_offset < self._block_start:
+            # Data carried forward from a previous block
+            return self._carry_offset + buffer_offset
+        buffer_offset -= self._block_start
+        if self.buffer is None or buffer_offset >= len(self.buffer) - self._block_start:
+            return self.offset << 16
+        return self.block_offset << 16 | buffer_offset
 
-        cdata = (C.c_ubyte * len(cdata)).from_buffer(cdata)
-        res, state = zlib.raw_decompress(cdata, data)
-        assert res in (zlib.Z_OK, zlib.Z_STREAM_END), "Invalid zlib data."
+    def virtual_offsets(self, buffer_offsets):
+        """
+        Vectorised virtual_offset() for offsets of data within the current buffer. Requires NumPy.
+        :param buffer_offsets: NumPy array of offsets into self.buffer, each less than len(self.buffer).
+        :return: NumPy array of virtual file offsets.
+        """
+        buffer_offsets = np.asarray(buffer_offsets, dtype=np.int64)
+        return np.where(buffer_offsets < self._block_start, self._carry_offset + buffer_offsets,
+                        (self.block_offset << 16) | (buffer_offsets - self._block_start))
 
-        self.total_in += state.total_in
-        self.total_out += state.total_out
+    def tell(self) -> int:
+        """
+        Virtual file offset of the first unconsumed byte of the inflated data.
+        :return: Virtual file offset.
+        """
+        return self.virtual_offset(len(self.buffer) - self.remaining if self.buffer is not None else 0)
 
-        if self.remaining:
-            self.buffer = edata
-            self.remaining += len(data)
+    def seek(self, virtual_offset: int) -> None:
+        """
+        Move the reader to a virtual file offset.
+        Only the block containing the offset is inflated, any previously buffered data is discarded.
+        :param virtual_offset: Virtual file offset (compressed block start << 16 | offset into uncompressed block data).
+        :return: None
+        """
+        block_offset, data_offset = virtual_offset >> 16, virtual_offset & 0xFFFF
+        self._seek_block(block_offset)
+        self.offset = block_offset
+        self.buffer = (C.c_ubyte * 0)()
+        self.remaining = 0
+        self._block_start = 0
+        if data_offset:
+            # Offset 0 is left to the next call to __next__() so that empty blocks are reported as usual
+            next(self)
+            if data_offset > self.remaining:
+                raise ValueError("Virtual offset {} is beyond the end of its block.".format(virtual_offset))
+            self.remaining -= data_offset
+
+    def seek_uncompressed(self, offset: int, index: list) -> None:
+        """
+        Move the reader to an offset into the uncompressed data.
+        :param offset: Offset into the uncompressed data.
+        :param index: GZI index data, see gzi.build() and gzi.read().
+        :return: None
+        """
+        self.seek(gzi.virtual_offset(index, offset))
+
+    def _seek_block(self, block_offset: int) -> None:
+        """
+        Reposition the input to read the block starting at block_offset next.
+        :param block_offset: Offset of the first byte of the compressed block.
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def _decompress(self, cdata, data, block_offset: int) -> None:
+        """
+        Inflate the compressed data of a block, consulting the cache if one was provided.
+        The reader state is not modified so that this can be called from worker threads.
+        :param cdata: Compressed block data.
+        :param data: Buffer to write the inflated data to.
+        :param block_offset: Offset of the first byte of the compressed block.
+        :return: None
+        """
+        cached = self.cache.get((self._cache_source, block_offset)) if self.cache is not None else None
+        if cached is not None and len(cached) == len(data):
+            C.memmove(data, cached, len(data))
         else:
-            self.buffer = data
-            self.remaining = len(data)
+            self.codec.decompress((C.c_ubyte * len(cdata)).from_buffer(cdata), data)
+            if self.cache is not None:
+                # Cache a copy as consumers are free to modify the buffer
+                self.cache.put((self._cache_source, block_offset), bytes(data))
 
-        return self.buffer
+    def _carry(self, size: int) -> tuple:
+        """
+        Allocate a buffer for the next block outside of the ring, copying forward any remaining data to its start.
+        Used when the remaining data does not fit ahead of the block in the ring.
+        :param size: Uncompressed size of the next block.
+        :return: Tuple of (new buffer, view of the new buffer that the block data belongs in).
+        """
+        if self.remaining:
+            self._carry_offset = self.virtual_offset(len(self.buffer) - self.remaining)
+            edata = (C.c_ubyte * (size + self.remaining))()
+            C.memmove(edata, C.byref(self.buffer, len(self.buffer) - self.remaining), self.remaining)
+            return edata, (C.c_ubyte * size).from_buffer(edata, self.remaining)
+        data = (C.c_ubyte * size)()
+        return data, data
+
+    def _window(self, arena, offset: int, size: int):
+        """
+        Provide the buffer for a block inflated into the ring, preceded by the remaining data of the current buffer.
+        :param arena: Arena returned by Ring.reserve().
+        :param offset: Offset into arena of the block data.
+        :param size: Uncompressed size of the block.
+        :return: The buffer to pass to _load().
+        """
+        if self.remaining:
+            self._carry_offset = self.virtual_offset(len(self.buffer) - self.remaining)
+        buffer = self.ring.window(arena, offset, size, self.buffer, self.remaining)
+        if buffer is None:
+            # Remaining data is larger than the space reserved for it, fall back to a new buffer
+            buffer, data = self._carry(size)
+            C.memmove(data, C.byref(arena, offset), size)
+        return buffer
+
+    def _load(self, buffer, size: int, block_offset: int):
+        """
+        Make a buffer returned by _window() or _carry() the current buffer once the block data is in place.
+        :param buffer: Buffer returned by _window() or _carry().
+        :param size: Uncompressed size of the block.
+        :param block_offset: Offset of the first byte of the compressed block.
+        :return: The new buffer.
+        """
+        self.block_offset = block_offset
+        self._block_start = self.remaining
+        self.buffer = buffer
+        self.remaining += size
+        self.total_out += size
+        return buffer
+
+    def _inflate(self, block, cdata, block_offset=0):
+        size = block.uncompressed_size
+        arena, offset = self.ring.reserve(size)
+        self._decompress(cdata, (C.c_ubyte * size).from_buffer(arena, offset), block_offset)
+        self.total_in += len(cdata)
+        return self._load(self._window(arena, offset, size), size, block_offset)
 
     def __iter__(self):
         return self
@@ -63,19 +197,21 @@ class _Reader:
         raise NotImplementedError()
 
 
-def Reader(input, offset: int = 0, peek=None) -> _Reader:
+def Reader(input, offset: int = 0, peek=None, cache=None, codec=None) -> _Reader:
     """
     Factory to provide a unified reader interface.
     Resolves if input is randomly accessible and provides the appropriate _Reader implementation.
     :param input: A stream or buffer object.
     :param offset: If input is a buffer, the offset into the buffer to begin reading. Ignored otherwise.
     :param peek: Data consumed from stream while peeking. Will be prepended to read data. Ignored if buffer passed as input.
+    :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+    :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available. See codec.get().
     :return: An instance of StreamReader or BufferReader.
     """
     if isinstance(input, (io.RawIOBase, io.BufferedIOBase)):
-        return StreamReader(input, peek)
+        return StreamReader(input, peek, cache, codec)
     else:
-        return BufferReader(input, offset)
+        return BufferReader(input, offset, cache, codec)
 
 
 class StreamReader(_Reader):
@@ -83,22 +219,35 @@ class StreamReader(_Reader):
     Implements _Reader to handle input data that is not accessible through a buffer interface.
     """
 
-    def __init__(self, input, peek=None):
+    def __init__(self, input, peek=None, cache=None, codec=None):
         """
         Constructor.
         :param input: Stream object to read from.
         :param peek: Data consumed from stream while peeking. Will be prepended to read data.
+        :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available.
         """
-        super().__init__(input)
+        super().__init__(input, cache, codec)
         self._peek = peek
+        try:
+            self.offset = input.tell() - (len(peek) if peek else 0)
+        except (AttributeError, OSError):
+            # Unseekable streams are assumed to be read from the beginning
+            self.offset = 0
+
+    def _seek_block(self, block_offset):
+        self._input.seek(block_offset)
+        self._peek = None
 
     def __next__(self):
         try:
             block, cdata = Block.from_stream(self._input, self._peek)
+            self._peek = None
+            block_offset = self.offset
+            self.offset += len(block)
             if not block.uncompressed_size:
                 raise EmptyBlock()
-            self._inflate(block, cdata)
-            self._peek = None
+            self._inflate(block, cdata, block_offset)
             return self.buffer
         except EOFError:
             raise StopIteration()
@@ -109,22 +258,29 @@ class BufferReader(_Reader):
     Implements _Reader to handle input data that is accessible through a buffer interface.
     """
 
-    def __init__(self, input, offset=0):
+    def __init__(self, input, offset=0, cache=None, codec=None):
         """
         Constructor.
         :param input: Buffer object to read from.
         :param offset: The offset into the input buffer to begin reading from.
+        :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available.
         """
-        super().__init__(input)
+        super().__init__(input, cache, codec)
         self._len = len(input)
         self.offset = offset
 
     def __next__(self):
         if self.offset < self._len:
-            block, cdata = Block.from_buffer(self._input, self.offset)
+            block_offset = self.offset
+            block, cdata = Block.from_buffer(self._input, block_offset)
             self.offset += len(block)
             if block.uncompressed_size:
-                return self._inflate(block, cdata)
+                return self._inflate(block, cdata, block_offset)
             else:
                 raise EmptyBlock()
         raise StopIteration()
+
+    def _seek_block(self, block_offset):
+        if block_offset > self._len:
+            raise ValueError("Block offset {} is beyond the end of the buffer.".format(block_offset))
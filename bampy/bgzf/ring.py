@@ -0,0 +1,75 @@
+"""
+Provides the window of inflated data that readers inflate consecutive blocks into.
+"""
+
+import ctypes as C
+
+from .block import MAX_DATA_SIZE
+from .pool import BufferPool
+
+CARRY_SIZE = MAX_DATA_SIZE
+"""int: Space reserved at the start of each arena for data carried forward from the previous arena."""
+
+DEFAULT_BLOCKS = 8
+"""int: Default number of full blocks held by each arena."""
+
+
+class Ring:
+    """
+    Window of inflated data made up of arenas that each hold several consecutive blocks.
+    Blocks are placed one after another, so data left unconsumed at the end of a block is already followed by the next
+    block and a record spanning the two is read in place. Once an arena is full the next block begins a new arena after
+    CARRY_SIZE bytes of free space that the unconsumed data is copied to. That is one copy every few blocks rather
+    than an allocation and copy every block.
+    Space is never handed out twice. An arena returns to the pool once the reader has moved on to another arena and
+    nothing references it, including records read from it.
+    """
+
+    def __init__(self, blocks: int = DEFAULT_BLOCKS, count: int = 2):
+        """
+        Constructor.
+        :param blocks: Number of full blocks each arena holds.
+        :param count: Maximum number of free arenas to retain.
+        """
+        self.arenas = BufferPool(CARRY_SIZE + max(1, blocks) * MAX_DATA_SIZE, count)
+        self.copied = 0  # Number of bytes carried forward into new arenas
+        self._arena = None  # ctypes array over the arena being filled
+        self._position = 0  # Offset into _arena of the next reservation
+
+    def reserve(self, size: int) -> (C.Array, int):
+        """
+        Reserve space for the inflated data of the next block, moving to a new arena if it does not fit.
+        Reservations must be made in file order from a single thread.
+        :param size: Uncompressed size of the block.
+        :return: Tuple of (ctypes array over the arena, offset into the arena of the reserved space).
+        """
+        if self._arena is None or self._position + size > len(self._arena):
+            storage = self.arenas.acquire()
+            self._arena = (C.c_ubyte * len(storage)).from_buffer(storage)
+            self.arenas.recycle(self._arena, storage)
+            self._position = CARRY_SIZE
+        offset = self._position
+        self._position += size
+        return self._arena, offset
+
+    def window(self, arena: C.Array, offset: int, size: int, tail, remaining: int) -> C.Array:
+        """
+        Provide a view of a reserved block preceded by the data remaining from the previous block.
+        The remaining data is copied only if it does not already directly precede the block.
+        :param arena: Arena returned by reserve().
+        :param offset: Offset returned by reserve().
+        :param size: Size of the block data at offset.
+        :param tail: Buffer ending with the remaining data, typically the previous window.
+        :param remaining: Number of bytes at the end of tail to carry forward.
+        :return: ctypes array of remaining + size bytes, None if the remaining data does not fit ahead of the block.
+        """
+        start = offset - remaining
+        if remaining:
+            if start < 0:
+                return None
+            source = C.addressof(tail) + len(tail) - remaining
+            destination = C.addressof(arena) + start
+            if source != destination:
+                C.memmove(destination, source, remaining)
+                self.copied += remaining
+        return (C.c_ubyte * (remaining + size)).from_buffer(arena, start)
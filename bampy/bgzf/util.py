@@ -16,6 +16,10 @@ SIZEOF_EMPTY_BLOCK = len(EMPTY_BLOCK)
 """int: Number of bytes that the empty block occupies."""
 
 
+FIXED_HEADER = b'\x1F\x8B\x08\x04'
+"""bytes: ID1, ID2, CM and FLG values common to all BGZF block headers."""
+
+
 def is_bgzf(buffer, offset=0):
     """
     Helper to determine if passed buffer contains a BGZF block.
@@ -26,6 +30,54 @@ def is_bgzf(buffer, offset=0):
     return buffer[offset:offset + 2] == MAGIC
 
 
+def block_size(buffer, offset=0) -> int:
+    """
+    Read the total size of a block from its header without parsing it into a Block instance.
+    :param buffer: Buffer containing BGZF data.
+    :param offset: Offset into buffer pointing to first block byte.
+    :return: Size of the block in bytes, or 0 if offset does not point to a valid block header.
+    """
+    if buffer[offset:offset + 4] != FIXED_HEADER:
+        return 0
+    extra_length = int.from_bytes(buffer[offset + 10:offset + 12], byteorder='little', signed=False)
+    field = offset + 12
+    end = field + extra_length
+    while field + 4 <= end:
+        field_length = int.from_bytes(buffer[field + 2:field + 4], byteorder='little', signed=False)
+        if buffer[field:field + 2] == b'BC' and field_length == 2:
+            return int.from_bytes(buffer[field + 4:field + 6], byteorder='little', signed=False) + 1
+        field += 4 + field_length
+    return 0
+
+
+def find_block(buffer, offset=0, depth=4) -> int:
+    """
+    Find the first block starting at or after offset.
+    Candidate blocks are only accepted if the following depth blocks, or the end of the buffer, are found where their sizes predict.
+    :param buffer: Buffer containing BGZF data. Must provide find().
+    :param offset: Offset into buffer to begin searching from.
+    :param depth: Number of consecutive blocks to validate.
+    :return: Offset of the first byte of the block, or the length of the buffer if no block was found.
+    """
+    buffer_len = len(buffer)
+    offset = buffer.find(FIXED_HEADER, offset)
+    while offset != -1:
+        candidate = offset
+        for _ in range(depth):
+            size = block_size(buffer, candidate)
+            if not size:
+                break
+            candidate += size
+            if candidate >= buffer_len:
+                break
+        else:
+            return offset
+        if candidate == buffer_len:
+            return offset
+        offset = buffer.find(FIXED_HEADER, offset + 1)
+    return buffer_len
+
+
 class InvalidBGZF(ValueError):
     """
     Exception to indicate invalid or unexpected data was read while trying to parse BGZF data.
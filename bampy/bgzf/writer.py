@@ -2,10 +2,11 @@
 Provides convenience interface to write data to BGZF blocks.
 """
 
+import binascii
 import ctypes as C
 import io
 
-from . import block, zlib
+from . import block, codec as _codec, zlib
 from .block import MAX_CDATA_SIZE, MAX_DATA_SIZE
 from .util import MAX_BLOCK_SIZE
 
@@ -16,122 +17,125 @@ SIZEOF_FIXED_XLEN_HEADER = len(block.FIXED_XLEN_HEADER)
 SIZEOF_UINT16 = C.sizeof(C.c_uint16)
 
 
+def compress_block(data, size: int, output, offset: int, codec, level: int = zlib.DEFAULT_COMPRESSION_LEVEL) -> int:
+    """
+    Compress data into a complete BGZF block.
+    :param data: Buffer containing the uncompressed data, at most MAX_DATA_SIZE bytes.
+    :param size: Number of bytes of data to compress.
+    :param output: Buffer to write the block to.
+    :param offset: Offset into output to write the block at.
+    :param codec: Codec instance used to deflate the data.
+    :param level: zlib compression level.
+    :return: Size of the block written.
+    """
+    output[offset:offset + SIZEOF_FIXED_XLEN_HEADER] = block.FIXED_XLEN_HEADER
+    bsize = C.c_uint16.from_buffer(output, offset + SIZEOF_FIXED_XLEN_HEADER)
+    cdata_offset = offset + SIZEOF_FIXED_XLEN_HEADER + SIZEOF_UINT16
+    cdata = (C.c_ubyte * min(MAX_CDATA_SIZE, len(output) - cdata_offset)).from_buffer(output, cdata_offset)
+    # Data is limited to MAX_DATA_SIZE per block so the compressed data is guaranteed to fit
+    cdata_len = codec.compress((C.c_ubyte * size).from_buffer(data), cdata, level)
+    block_size = SIZEOF_FIXED_XLEN_HEADER + SIZEOF_UINT16 + cdata_len + SIZEOF_TRAILER
+    bsize.value = block_size - 1
+
+    trailer = block.Trailer.from_buffer(output, cdata_offset + cdata_len)
+    trailer.CRC32 = binascii.crc32(memoryview(data)[:size])
+    trailer.uncompressed_size = size
+    return block_size
+
+
 class _Writer:
     """
     Base class for buffer and stream writers.
     Provides Callable interface to compress data into blocks.
+    Data is collected until a block is full, or finish_block() is called, and then compressed as a whole.
     """
 
-    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL):
+    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None):
         """
         Constructor.
         :param output: The buffer to output compressed data.
         :param offset: The offset into buffer to begin writing.
+        :param level: zlib compression level.
+        :param codec: Codec instance or backend name used to deflate blocks, None for the fastest available. See codec.get().
         """
-        self._state = None
-        self._bsize = None
+        self.codec = _codec.get(codec)
+        self._data = bytearray(MAX_DATA_SIZE)  # Uncompressed data of the current block
+        self._data_len = 0
         self.total_in = 0
         self.total_out = 0
         self.offset = offset
+        self.block_offset = offset  # Compressed offset of the current, or next, block
         self._output = output
         self._level = level
 
-    def _deflate(self, data) -> int:
+    def finish_block(self):
         """
-        Manages the deflation state ensuring it does not exceed the block maximum size.
-        :param data: The data to be compressed
-        :return: Offset into data that has been processed
-        """
-        state = self._state
-        if not state:
-            self._data_buffer[self.offset:self.offset + SIZEOF_FIXED_XLEN_HEADER] = block.FIXED_XLEN_HEADER
-            self.offset += SIZEOF_FIXED_XLEN_HEADER
-            self._bsize = C.c_uint16.from_buffer(self._data_buffer, self.offset)
-            self._bsize.value = SIZEOF_FIXED_XLEN_HEADER + SIZEOF_TRAILER + 1
-            self.offset += SIZEOF_UINT16
-
-            self._cdata_len = min(MAX_CDATA_SIZE, len(self._data_buffer) - self.offset)
-            self._cdata = (C.c_ubyte * self._cdata_len).from_buffer(self._data_buffer, self.offset)
-
-        data_len = len(data)
-
-        if data_len > self._cdata_len:
-            # Must split data so fill remainder
-            res, state = zlib.raw_compress(data, mode=zlib.Z_FINISH, state=state, level=self._level)
-            assert res == zlib.Z_STREAM_END
-            self._state = state
-            self.finish_block(False)
-            return data_len - state.avail_in
-        elif state and state.total_out + data_len > self._cdata_len:
-            # Not enough space left in block so finalize
-            self.finish_block()
-            return 0
-        else:
-            res, self._state = zlib.raw_compress(data, None if state else self._cdata, mode=zlib.Z_NO_FLUSH, state=state, level=self._level)
-            assert res == zlib.Z_OK
-            return data_len
-
-    def finish_block(self, flush=True):
-        """
-        Finalises current BGZF block.
-        :param flush: Set to false if Z_FINISH already passed to zlib.raw_compress() for current state.
+        Compresses the data of the current BGZF block and writes out the block.
         :return: None
         """
-        if self._bsize is None: return
-        state = self._state
-        if flush and state:
-            res, state = zlib.raw_compress(zlib.Z_NULL, mode=zlib.Z_FINISH, state=state)
-            assert res == zlib.Z_STREAM_END, "Failed to flush buffer (Code: {}).".format(res)
-        if state:
-            self._bsize.value += state.total_out  # This heavily relies on the random access ability of the provided buffer
-            self.offset += state.total_out
-        trailer = block.Trailer.from_buffer(self._data_buffer, self.offset)
-        trailer.crc32 = state.adler
-        trailer.uncompressed_size = state.total_in
-        self.offset += SIZEOF_TRAILER
-        self._state = None
-        self._bsize = None
+        if not self._data_len: return
+        block_size = compress_block(self._data, self._data_len, self._data_buffer, self.offset, self.codec, self._level)
+        self.offset += block_size
+        self.total_in += self._data_len
+        self.total_out += block_size
+        self.block_offset += block_size
+        self._data_len = 0
 
     def block_remaining(self) -> int:
         """
-        Calculates amount of remaining space in current block after compression.
-        Is only accurate after after setting boundary=True when calling __call__().
+        Calculates amount of uncompressed data that can still be added to the current block.
         :return: Amount of remaining space in bytes.
         """
-        return (MAX_CDATA_SIZE - self._state.total_out - 1) if self._state else 0
+        return MAX_DATA_SIZE - self._data_len
+
+    def tell(self) -> int:
+        """
+        Virtual file offset that the next byte passed to __call__() will be written at.
+        :return: Virtual file offset (compressed block start << 16 | offset into uncompressed block data).
+        """
+        return self.block_offset << 16 | self._data_len
 
     def __call__(self, data):
         """
-        Pass data to the zlib compressor.
-        Setting boundary to True flushes the compression buffer. Doing this often can severely impact compression efficacy.
+        Add data to the current block.
         Passing data larger than the maximum block size will result in the data being split between blocks.
         A new block may be created between calls. To gaurantee that data is compressed into the same block check block_remaining()
         before submitting the data.
         :param data: Data to add to compression stream.
         :return: None
         """
-        data_len = C.sizeof(data) if isinstance(data, C.Array) else len(data)
+        data = memoryview(data).cast('B')
+        data_len = len(data)
         data_offset = 0
         while data_offset < data_len:
-            data_offset = self._deflate((C.c_ubyte * (data_len - data_offset)).from_buffer(data, data_offset))
+            remaining = self.block_remaining()
+            if not remaining:
+                self.finish_block()
+                continue
+            size = min(data_len - data_offset, remaining)
+            self._data[self._data_len:self._data_len + size] = data[data_offset:data_offset + size]
+            self._data_len += size
+            data_offset += size
 
     def __del__(self):
-        if self._state:
-            self.finish_block(True)
+        if self._data_len:
+            self.finish_block()
 
 
-def Writer(output, offset=0) -> _Writer:
+def Writer(output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None) -> _Writer:
     """
     Factory to provide a unified writer interface.
     Resolves if output is randomly accessible and provides the appropriate _Writer implementation.
     :param output: A stream or buffer object.
     :param offset: If output is a buffer, the offset into the buffer to begin writing. Ignored otherwise.
+    :param level: zlib compression level.
+    :param codec: Codec instance or backend name used to deflate blocks, None for the fastest available. See codec.get().
     :return: An instance of StreamWriter or BufferWriter.
     """
     if isinstance(output, (io.RawIOBase, io.BufferedIOBase)):
-        return StreamWriter(output)
+        return StreamWriter(output, level=level, codec=codec)
     else:
-        return BufferWriter(output, offset)
+        return BufferWriter(output, offset, level=level, codec=codec)
 
 
 class BufferWriter(_Writer):
@@ -139,8 +143,8 @@ class BufferWriter(_Writer):
     Implements _Writer to output to a randomly accessible buffer interface.
     """
 
-    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        super().__init__(output, offset, level=level)
+    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None):
+        super().__init__(output, offset, level=level, codec=codec)
         self._data_buffer = output
 
 
@@ -150,12 +154,17 @@ class StreamWriter(_Writer):
     Internally buffers each block until it is finished before writing to the stream.
     """
 
-    def __init__(self, output, level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        super().__init__(output, 0, level=level)
+    def __init__(self, output, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None):
+        super().__init__(output, 0, level=level, codec=codec)
         self._data_buffer = bytearray(MAX_BLOCK_SIZE)
-
-    def finish_block(self, flush=True):
-        if self.offset:
-            super().finish_block(flush)
+        try:
+            self.block_offset = output.tell()
+        except (AttributeError, OSError):
+            # Unseekable streams are assumed to be written from the beginning
+            pass
+
+    def finish_block(self):
+        if self._data_len:
+            super().finish_block()
             self._output.write(self._data_buffer[:self.offset])
             self.offset = 0
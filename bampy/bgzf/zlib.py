@@ -6,11 +6,11 @@ If this is run on a Windows system and ctypes.util.find() can not find zlibwapi.
 code is stored in.
 """
 
-# TODO inflateReset/deflateReset may speed up [de]compression
 # TODO inflateBack avoids a copy during decompression
 
 import ctypes as C
 import platform
+import threading
 from ctypes import util
 
 # Special thanks to Mark Nottingham https://gist.github.com/mnot/242459
@@ -83,11 +83,13 @@ else:
 _zlib.inflateInit2_.restype = C.c_int
 _zlib.inflate.restype = C.c_int
 _zlib.inflateEnd.restype = C.c_int
+_zlib.inflateReset.restype = C.c_int
 _zlib.inflateSetDictionary.restype = C.c_int
 _zlib.deflateInit2_.restype = C.c_int
 _zlib.deflate.restype = C.c_int
 #_zlib.deflateBound.restype = C.c_int16
 _zlib.deflateEnd.restype = C.c_int
+_zlib.deflateReset.restype = C.c_int
 _zlib.deflateSetDictionary.restype = C.c_int
 
 
@@ -230,6 +232,119 @@ def raw_decompress(src=None, dest=None, mode=Z_FINISH, state=None, wbits=MAX_WBI
     return err, state
 
 
+class Inflater:
+    """
+    Persistent inflate state for decompressing many independent raw deflate streams, such as BGZF blocks.
+    The zlib state is initialised once and reset with inflateReset() between streams rather than being
+    re-initialised and torn down for every stream.
+    Instances are not thread safe, see inflater() for an instance shared by the calling thread.
+    """
+
+    def __init__(self, wbits=MAX_WBITS):
+        """
+        Constructor.
+        :param wbits: Compression window bit size. Defaults to MAX_WBITS, do not change unless you REALLY know what you are doing.
+        """
+        self.state = zState()
+        err = _zlib.inflateInit2_(C.byref(self.state), -wbits, ZLIB_VERSION, SIZEOF_ZSTATE)
+        assert err == Z_OK, "Failed to initialise inflate state (Code: {}).".format(err)
+        self._used = False
+
+    def __call__(self, src, dest) -> (int, zState):
+        """
+        Decompress a complete raw deflate stream.
+        :param src: Data buffer to decompress.
+        :param dest: Data buffer for decompressed data to be written to.
+        :return: Tuple containing (Error code, zlib state object). The state remains valid until the next call.
+        """
+        state = self.state
+        if self._used:
+            err = _zlib.inflateReset(C.byref(state))
+            if err != Z_OK:
+                raise ValueError("Failed to reset inflate state (Code: {}).".format(err))
+        self._used = True
+        state.next_in = C.cast(C.pointer(src), C.POINTER(C.c_ubyte))
+        state.avail_in = len(src)
+        state.next_out = C.cast(C.pointer(dest), C.POINTER(C.c_ubyte))
+        state.avail_out = len(dest)
+        return _zlib.inflate(C.byref(state), Z_FINISH), state
+
+    def __del__(self):
+        if _zlib:
+            _zlib.inflateEnd(C.byref(self.state))
+
+
+class Deflater:
+    """
+    Persistent deflate state for compressing many independent raw deflate streams, such as BGZF blocks.
+    The zlib state, including the compression window, is allocated once and reset with deflateReset() between streams.
+    Instances are not thread safe and hold the state of the stream in progress, each writer should own its instance.
+    """
+
+    def __init__(self, level=DEFAULT_COMPRESSION_LEVEL, wbits=MAX_WBITS, memlevel=DEFAULT_MEM_LEVEL):
+        """
+        Constructor.
+        :param level: zlib algorithm compression level from 0-9. Pass -1 for zlib default.
+        :param wbits: Compression window bit size. Defaults to MAX_WBITS, do not change unless you REALLY know what you are doing.
+        :param memlevel: zlib memory usage level. See zlib documentation for more.
+        """
+        self.state = zState()
+        err = _zlib.deflateInit2_(C.byref(self.state), level, Z_DEFLATED, -wbits, memlevel, Z_DEFAULT_STRATEGY, ZLIB_VERSION, SIZEOF_ZSTATE)
+        assert err == Z_OK, "Failed to initialise deflate state (Code: {}).".format(err)
+        self._used = False
+
+    def reset(self, dest) -> zState:
+        """
+        Begin a new stream.
+        :param dest: Data buffer for compressed data to be written to.
+        :return: zlib state object.
+        """
+        state = self.state
+        if self._used:
+            err = _zlib.deflateReset(C.byref(state))
+            if err != Z_OK:
+                raise ValueError("Failed to reset deflate state (Code: {}).".format(err))
+        self._used = True
+        state.next_out = C.cast(C.pointer(dest), C.POINTER(C.c_ubyte))
+        state.avail_out = len(dest)
+        return state
+
+    def __call__(self, src=Z_NULL, mode=Z_NO_FLUSH) -> (int, zState):
+        """
+        Compress data into the current stream.
+        :param src: Data buffer to compress or Z_NULL.
+        :param mode: Compression flush mode. Use Z_NO_FLUSH, Z_PARTIAL_FLUSH, or Z_FINISH. See zlib documentation for full description.
+        :return: Tuple containing (Error code, zlib state object)
+        """
+        state = self.state
+        if src:
+            state.next_in = C.cast(C.pointer(src), C.POINTER(C.c_ubyte))
+            state.avail_in = len(src)
+        else:
+            state.next_in = NULL_PTR
+            state.avail_in = 0
+        return _zlib.deflate(C.byref(state), mode), state
+
+    def __del__(self):
+        if _zlib:
+            _zlib.deflateEnd(C.byref(self.state))
+
+
+_local = threading.local()
+
+
+def inflater() -> Inflater:
+    """
+    Get the Inflater instance of the calling thread.
+    :return: Inflater instance.
+    """
+    try:
+        return _local.inflater
+    except AttributeError:
+        _local.inflater = Inflater()
+        return _local.inflater
+
+
 def bound(state, src_len):
     return _zlib.deflateBound(C.byref(state), src_len)
 
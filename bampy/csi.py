@@ -0,0 +1,211 @@
+from . import bai
+from .bai import Chunk, PseudoChunk, SIZEOF_CHUNK
+from .bam.util import reg2bin_csi, reg2bins_csi
+
+MAGIC = b'CSI\1'
+
+DEFAULT_MIN_SHIFT = 14
+"""int: Default minimum interval size, 2**14 (16kbp) matching BAI."""
+
+DEFAULT_DEPTH = 5
+"""int: Default number of binning levels below the root bin, matching BAI."""
+
+
+def bin_limit(depth: int = DEFAULT_DEPTH) -> int:
+    """
+    Calculate the first bin number following all bins of a binning index.
+    :param depth: Number of levels below the root bin.
+    :return: Bin number. The pseudo-bin is bin_limit(depth) + 1.
+    """
+    return ((1 << (depth + 1) * 3) - 1) // 7
+
+
+def depth_for(length: int, min_shift: int = DEFAULT_MIN_SHIFT) -> int:
+    """
+    Calculate the minimum depth required to index positions up to length.
+    :param length: Length of the longest reference.
+    :param min_shift: Bins on the lowest level span 2**min_shift positions.
+    :return: Depth
+    """
+    depth = 0
+    span = 1 << min_shift
+    while span < length:
+        span <<= 3
+        depth += 1
+    return depth
+
+
+def read(stream) -> (list, list, int, int, int, bytes):
+    """
+    Read in CSI index data.
+    Returned tuple is composed of the following:
+    [0] List of dicts indexed by reference id. Dict elements are keyed on bin number and values are arrays of Chunks.
+    [1] List of dicts indexed by reference id. Dict elements are keyed on bin number and values are the virtual file
+        offset of the first record overlapping the bin.
+    [2] Number of unplaced unmapped reads (RNAME *), None if not present in CSI.
+    [3] min_shift
+    [4] depth
+    [5] Auxiliary data
+    :param stream: Readable stream containing CSI formatted data.
+    :return: 6 element tuple (list, list, int, int, int, bytes)
+    """
+    assert stream.read(4) == MAGIC, "Unknown or corrupt input data."
+    min_shift = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
+    depth = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
+    l_aux = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
+    aux = stream.read(l_aux)
+    n_ref = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
+    pseudo_bin = bin_limit(depth) + 1
+    bins = [None] * n_ref
+    loffsets = [None] * n_ref
+    n_no_coor = None
+    try:
+        for ref in range(n_ref):
+            bins[ref] = {}
+            loffsets[ref] = {}
+            n_bin = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
+            while n_bin > 0:
+                bin = int.from_bytes(stream.read(4), byteorder='little', signed=False)  # UINT32
+                loffsets[ref][bin] = int.from_bytes(stream.read(8), byteorder='little', signed=False)  # UINT64
+                n_chunk = int.from_bytes(stream.read(4), byteorder='little', signed=True)  # INT32
+                if bin == pseudo_bin:  # Detect pseudo-chunks
+                    bins[ref][bin] = PseudoChunk.from_buffer_copy(stream.read(SIZEOF_CHUNK * n_chunk))
+                else:
+                    bins[ref][bin] = (Chunk * n_chunk).from_buffer_copy(stream.read(SIZEOF_CHUNK * n_chunk))
+                n_bin -= 1
+
+        n_no_coor = stream.read(8)
+        if len(n_no_coor) == 8:
+            n_no_coor = int.from_bytes(n_no_coor, byteorder='little', signed=False)  # UINT64
+        else:
+            n_no_coor = None
+    except EOFError:
+        pass
+    return bins, loffsets, n_no_coor, min_shift, depth, aux
+
+
+def query(bins: list, loffsets: list, reference_id: int, beg: int, end: int, min_shift: int = DEFAULT_MIN_SHIFT, depth: int = DEFAULT_DEPTH) -> list:
+    """
+    Calculate the minimal list of chunks that must be read to find all records overlapping a region.
+    Candidate bins are found with reg2bins_csi() and chunks ending before the offset of the nearest indexed bin containing beg are discarded.
+    Overlapping and adjacent chunks are merged.
+    :param bins: Bins as returned by read().
+    :param loffsets: Bin offsets as returned by read().
+    :param reference_id: Index of the reference the region is on.
+    :param beg: Zero based start of the region.
+    :param end: Zero based, exclusive, end of the region.
+    :param min_shift: min_shift as returned by read().
+    :param depth: depth as returned by read().
+    :return: List of (begin, end) virtual file offset tuples sorted by begin.
+    """
+    if reference_id >= len(bins) or not bins[reference_id]:
+        return []
+    ref_bins = bins[reference_id]
+    ref_loffsets = loffsets[reference_id]
+
+    # Walk up from the lowest level bin containing beg to the first bin present in the index
+    min_offset = 0
+    bin = reg2bin_csi(beg, beg + 1, min_shift, depth)
+    while True:
+        if bin in ref_loffsets:
+            min_offset = ref_loffsets[bin]
+            break
+        if bin == 0:
+            break
+        bin = (bin - 1) >> 3
+
+    chunks = []
+    for bin in reg2bins_csi(beg, end, min_shift, depth):
+        if bin in ref_bins:
+            chunks.extend((chunk.begin, chunk.end) for chunk in ref_bins[bin] if chunk.end > min_offset)
+    chunks.sort()
+
+    merged = []
+    for begin, end in chunks:
+        if merged and begin >> 16 <= merged[-1][1] >> 16:
+            # Overlapping or sharing a block with the previous chunk
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((begin, end))
+    return merged
+
+
+def write(stream, bins: list, loffsets: list, unaligned: int = None, min_shift: int = DEFAULT_MIN_SHIFT, depth: int = DEFAULT_DEPTH, aux: bytes = b'') -> None:
+    """
+    Write out bins, bin offsets, and unaligned in CSI format
+    :param stream: Writable output stream
+    :param bins: List of dicts indexed by reference id. Dict elements are keyed on bin number and values are arrays of Chunks.
+    :param loffsets: List of dicts indexed by reference id. Dict elements are keyed on bin number and values are virtual file offsets.
+    :param unaligned: Number of unplaced unmapped reads (RNAME *) or None to omit from output.
+    :param min_shift: Bins on the lowest level span 2**min_shift positions.
+    :param depth: Number of levels below the root bin.
+    :param aux: Auxiliary data.
+    :return: None
+    """
+    stream.write(MAGIC)
+    stream.write(min_shift.to_bytes(4, 'little', signed=True))
+    stream.write(depth.to_bytes(4, 'little', signed=True))
+    stream.write(len(aux).to_bytes(4, 'little', signed=True))
+    stream.write(aux)
+    n_ref = len(bins)
+    assert n_ref == len(loffsets), "Reference count mismatch between bins and offsets."
+    # n_ref
+    stream.write(n_ref.to_bytes(4, 'little', signed=True))
+    for ref in range(n_ref):
+        # n_bin
+        stream.write(len(bins[ref]).to_bytes(4, 'little', signed=True))
+        for bin, chunks in bins[ref].items():  # type: (int, Chunk)
+            # bin
+            stream.write(bin.to_bytes(4, 'little', signed=False))
+            # loffset
+            stream.write(loffsets[ref].get(bin, 0).to_bytes(8, 'little', signed=False))
+            # n_chunk
+            stream.write((2 if isinstance(chunks, PseudoChunk) else len(chunks)).to_bytes(4, 'little', signed=True))
+            stream.write(chunks)
+
+    if unaligned is not None:
+        stream.write(unaligned.to_bytes(8, 'little', signed=False))
+
+
+class Indexer(bai.Indexer):
+    """
+    Builds CSI index data from coordinate sorted records as they are read or written.
+    """
+
+    def __init__(self, n_ref: int, min_shift: int = DEFAULT_MIN_SHIFT, depth: int = DEFAULT_DEPTH):
+        """
+        Constructor.
+        :param n_ref: Number of references in the BAM header.
+        :param min_shift: Bins on the lowest level span 2**min_shift positions.
+        :param depth: Number of levels below the root bin. See depth_for() to calculate from the longest reference.
+        """
+        super().__init__(n_ref)
+        self.min_shift = min_shift
+        self.depth = depth
+        self._shift = min_shift
+        self._pseudo_bin = bin_limit(depth) + 1
+
+    def _reg2bin(self, beg: int, end: int) -> int:
+        return reg2bin_csi(beg, end, self.min_shift, self.depth)
+
+    def finalize(self) -> (list, list, int, int, int, bytes):
+        """
+        Finish the index.
+        :return: Tuple of (bins, loffsets, unaligned, min_shift, depth, aux) matching the output of read() and arguments to write().
+        """
+        bins, intervals, unaligned = super().finalize()
+        loffsets = [None] * len(bins)
+        first = [((1 << level * 3) - 1) // 7 for level in range(self.depth + 1)]
+        for ref, ref_bins in enumerate(bins):
+            loffsets[ref] = {}
+            ref_intervals = intervals[ref]
+            for bin in ref_bins:
+                if bin == self._pseudo_bin:
+                    loffsets[ref][bin] = 0
+                    continue
+                # Offset of the leftmost lowest level interval covered by the bin
+                level = next(level for level in range(self.depth, -1, -1) if bin >= first[level])
+                interval = (bin - first[level]) << (self.depth - level) * 3
+                loffsets[ref][bin] = ref_intervals[interval] if interval < len(ref_intervals) else 0
+        return bins, loffsets, unaligned, self.min_shift, self.depth, b''
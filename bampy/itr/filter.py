@@ -1,3 +1,80 @@
+from .. import bai, csi
+from ..bam.util import alignment_length
 
-def Regions(input, regions):
-    yield None
+
+def _read_index(stream) -> tuple:
+    """
+    Read BAI or CSI index data, detected by its magic number.
+    :param stream: Readable stream containing BAI or CSI formatted data.
+    :return: Tuple as returned by bai.read() or csi.read().
+    """
+    magic = stream.read(4)
+    stream.seek(-len(magic), 1)
+    return csi.read(stream) if magic == csi.MAGIC else bai.read(stream)
+
+
+def _load_index(path: str) -> tuple:
+    """
+    Load BAI or CSI index data from a file. BAI files are memory mapped and cached if NumPy is available, see bai.load().
+    :param path: Path to BAI or CSI file.
+    :return: Tuple as returned by bai.read() or csi.read().
+    """
+    with open(path, 'rb') as stream:
+        if bai.np is None or stream.read(4) != bai.MAGIC:
+            stream.seek(0)
+            return _read_index(stream)
+    return bai.load(path)
+
+
+def Regions(input, regions, index):
+    """
+    Iterate the records overlapping a set of regions.
+    Only the BAI or CSI chunks that can contain records overlapping each region are read.
+    Records overlapping more than one region are emitted once per region.
+    :param input: Seekable reader of coordinate sorted records, see reader.BGZFReader.
+    :param regions: Iterable of (reference, start, end) tuples. Reference may be a name, index or Reference object.
+                    Start and end are zero based, end exclusive. None for start or end selects the start or end of the reference.
+    :param index: Path to BAI or CSI file, a stream containing BAI or CSI data, or the tuple returned by bai.read() or csi.read().
+    :return: Generator emitting Record instances.
+    """
+    if isinstance(index, str):
+        index = _load_index(index)
+    elif not isinstance(index, tuple):
+        index = _read_index(index)
+    if len(index) == 3:
+        bins, intervals, _ = index
+        query = lambda reference_id, beg, end: bai.query(bins, intervals, reference_id, beg, end)
+    else:
+        bins, loffsets, _, min_shift, depth, _ = index
+        query = lambda reference_id, beg, end: csi.query(bins, loffsets, reference_id, beg, end, min_shift, depth)
+    references = input.references
+
+    for reference, beg, end in regions:
+        if isinstance(reference, str):
+            reference = next(ref for ref in references if ref.name == reference)
+        elif isinstance(reference, int):
+            reference = references[reference]
+        beg = beg or 0
+        end = reference.length if end is None else end
+
+        for chunk_begin, chunk_end in query(reference.index, beg, end):
+            input.seek(chunk_begin)
+            past_end = False
+            for record in input:
+                if record.virtual_offset >= chunk_end:
+                    break
+                reference_id = record.reference.index if record.reference else -1
+                if reference_id != reference.index:
+                    if 0 <= reference_id < reference.index:
+                        continue
+                    # Records are sorted, nothing further can overlap
+                    past_end = True
+                    break
+                position = record.position
+                if position >= end:
+                    past_end = True
+                    break
+                if position + (alignment_length(record.cigar) or 1) > beg:
+                    yield record
+            if past_end:
+                break
@@ -1,12 +1,49 @@
-import distutils.util
-import os
+"""
+Multithreaded implementations of the BGZF readers and writers.
+
+Blocks are inflated and deflated by a thread pool while the calling thread handles the record data.
+The codec calls release the GIL so workers run in parallel on stock CPython.
+Blocks are always returned or written in file order and the number of blocks in flight is bounded by max_queued.
+Readers adjust how far they read ahead within that bound, see Prefetch.
+
+Classes:
+    BufferPool: Pool of fixed size buffers recycled between blocks.
+    Prefetch: Adaptive, memory capped, read ahead window of the threaded readers.
 
+Functions:
+    default_pool: The thread pool shared by readers and writers that are not given one.
+
+Constants:
+    DEFAULT_THREADS int: Number of CPUs available to the process.
+    DEFAULT_QUEUE_SIZE int: Default maximum number of blocks in flight per reader or writer.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-CACHE_JIT = distutils.util.strtobool(os.getenv('PYTHON_CACHEJIT', 'False'))
 THREAD_NAME = 'BAMPY_WORKER'
 DEFAULT_THREADS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+DEFAULT_QUEUE_SIZE = DEFAULT_THREADS * 2
 
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_pool() -> ThreadPoolExecutor:
+    """
+    Thread pool shared by readers and writers that are not passed one.
+    Created on first use with DEFAULT_THREADS workers.
+    :return: ThreadPoolExecutor instance.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME)
+        return _pool
+
+
+from ..bgzf.pool import BufferPool
+from .prefetch import Prefetch
 from .reader import Reader
 from .writer import Writer
-
-# TODO Better use of numbas parallelization features
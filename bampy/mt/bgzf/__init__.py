@@ -1 +1,2 @@
 from .reader import Reader
+from .writer import Writer
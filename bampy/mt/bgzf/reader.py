@@ -1,57 +1,156 @@
+"""
+Provides block readers that inflate blocks ahead of the consumer using a thread pool.
+"""
+
+import ctypes as C
 import io
+import time
 from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 
-import numba
-
-from bampy.mt import CACHE_JIT, THREAD_NAME, DEFAULT_THREADS
-from . import zlib
-from ...bgzf import Block
-from ...bgzf.reader import BufferReader, EmptyBlock, StreamReader, _Reader as __Reader
-
-
-@numba.jit(nopython=True, nogil=True, cache=CACHE_JIT)
-def inflate(data, buffer, offset=0):
-    zlib.raw_decompress(data, buffer[offset:])
-    return buffer, offset
+from .. import DEFAULT_QUEUE_SIZE, default_pool
+from ..prefetch import Prefetch
+from ...bgzf.block import Block, MAX_DATA_SIZE
+from ...bgzf.reader import EmptyBlock, _Reader as __Reader
+from ...bgzf.ring import DEFAULT_BLOCKS, Ring
 
 
 class _Reader(__Reader):
     """
     Base class for buffer and stream readers.
     Provides Iterable interface to read in blocks.
+    Blocks are read ahead and submitted to the thread pool. The number of blocks in flight is adjusted by a Prefetch
+    controller between one and max_queued blocks, see depth.
+    Space for each block is reserved in the Ring when it is submitted, so workers inflate blocks directly into place
+    behind the blocks ahead of them.
     """
 
-    def __init__(self, input, threadpool: ThreadPoolExecutor):
+    def __init__(self, input, cache=None, codec=None, threadpool: ThreadPoolExecutor = None, max_queued: int = DEFAULT_QUEUE_SIZE,
+                 ring: Ring = None, prefetch: Prefetch = None):
         """
         Constructor.
         :param input: Block data source.
+        :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available. See codec.get().
+        :param threadpool: Thread pool to inflate blocks with, None for the shared default pool.
+        :param max_queued: Maximum number of blocks read ahead of the consumer.
+        :param ring: Ring to inflate blocks into, None to create one with enough free arenas for max_queued blocks.
+        :param prefetch: Prefetch instance controlling the read ahead window, None for the defaults limited to max_queued blocks.
         """
-        super().__init__(input)
-        self.pool = threadpool
-        self.blockqueue = deque()
-        self.max_queued = 0
-
-    def __iter__(self):
-        return self
+        super().__init__(input, cache, codec)
+        self.pool = threadpool or default_pool()
+        self.max_queued = max(1, max_queued)
+        if ring is None:
+            ring = Ring(DEFAULT_BLOCKS, self.max_queued // DEFAULT_BLOCKS + 2)
+        self.ring = ring
+        self.prefetch = prefetch if prefetch is not None else Prefetch(self.max_queued)
+        self.queued_bytes = 0  # Inflated size of the blocks in blockqueue
+        self.blockqueue = deque()  # (block offset, next block offset, uncompressed size, arena, offset into arena, future or None if empty) in file order
+        self._read_offset = 0  # Offset of the next block to read from input
+        self._eof = False
+
+    @property
+    def depth(self) -> int:
+        """
+        Current size of the read ahead window.
+        :return: Maximum number of blocks that will be put in flight.
+        """
+        return self.prefetch.depth
 
-    def __next__(self):
+    def _read_block(self) -> (Block, memoryview):
+        """
+        Read the block at _read_offset from the input.
+        :return: Tuple containing: (Block instance, memoryview containing compressed block data). Raises EOFError at the end of input.
+        """
         raise NotImplementedError()
 
+    def _inflate_block(self, cdata, data, block_offset: int) -> None:
+        """
+        Worker task to inflate a block into the space reserved for it in the ring.
+        :param cdata: Compressed block data.
+        :param data: View of the reserved space.
+        :param block_offset: Offset of the first byte of the compressed block.
+        :return: None
+        """
+        self._decompress(cdata, data, block_offset)
 
-def Reader(input, offset: int = 0, peek=None, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME)) -> _Reader:
+    def _fill(self) -> None:
+        """
+        Read blocks and submit them to the thread pool until the read ahead window is full.
+        :return: None
+        """
+        # The size of a block is not known until it is read, assume a full block
+        while not self._eof and self.prefetch.allow(len(self.blockqueue), self.queued_bytes, MAX_DATA_SIZE):
+            block_offset = self._read_offset
+            try:
+                block, cdata = self._read_block()
+            except EOFError:
+                self._eof = True
+                break
+            self._read_offset += len(block)
+            size = block.uncompressed_size
+            if size:
+                self.total_in += len(cdata)
+                arena, offset = self.ring.reserve(size)
+                future = self.pool.submit(self._inflate_block, cdata, (C.c_ubyte * size).from_buffer(arena, offset), block_offset)
+            else:
+                arena, offset, future = None, 0, None
+            self.blockqueue.append((block_offset, self._read_offset, size, arena, offset, future))
+            self.queued_bytes += block.uncompressed_size
+
+    def _seek_block(self, block_offset: int) -> None:
+        for queued in self.blockqueue:
+            if queued[-1] is not None:
+                # Reserved space is abandoned, a block already being inflated finishes writing to it undisturbed
+                queued[-1].cancel()
+        self.blockqueue.clear()
+        self.queued_bytes = 0
+        self._read_offset = block_offset
+        self._eof = False
+
+    def __next__(self):
+        self._fill()
+        if not self.blockqueue:
+            raise StopIteration()
+        block_offset, self.offset, size, arena, offset, future = self.blockqueue.popleft()
+        self.queued_bytes -= size
+        if future is None:
+            raise EmptyBlock()
+        if future.done():
+            wait = 0
+        else:
+            start = time.perf_counter()
+            future.exception()
+            wait = time.perf_counter() - start
+        following = next((queued[-1] for queued in self.blockqueue if queued[-1] is not None), None)
+        self.prefetch.update(wait, following is None or following.done())
+        future.result()
+        buffer = self._window(arena, offset, size)
+        # Top up the queue so that the workers stay busy while the consumer handles this block
+        self._fill()
+        return self._load(buffer, size, block_offset)
+
+
+def Reader(input, offset: int = 0, peek=None, cache=None, codec=None, threadpool: ThreadPoolExecutor = None, max_queued: int = DEFAULT_QUEUE_SIZE,
+           ring: Ring = None, prefetch: Prefetch = None) -> _Reader:
     """
     Factory to provide a unified reader interface.
     Resolves if input is randomly accessible and provides the appropriate _Reader implementation.
     :param input: A stream or buffer object.
     :param offset: If input is a buffer, the offset into the buffer to begin reading. Ignored otherwise.
     :param peek: Data consumed from stream while peeking. Will be prepended to read data. Ignored if buffer passed as input.
+    :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+    :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available. See codec.get().
+    :param threadpool: Thread pool to inflate blocks with, None for the shared default pool.
+    :param max_queued: Maximum number of blocks read ahead of the consumer.
+    :param ring: Ring to inflate blocks into, None to create one with enough free arenas for max_queued blocks.
+    :param prefetch: Prefetch instance controlling the read ahead window, None for the defaults limited to max_queued blocks.
     :return: An instance of StreamReader or BufferReader.
     """
     if isinstance(input, (io.RawIOBase, io.BufferedIOBase)):
-        return StreamReader(input, peek, threadpool)
+        return StreamReader(input, peek, cache, codec, threadpool, max_queued, ring, prefetch)
     else:
-        return BufferReader(input, offset, threadpool)
+        return BufferReader(input, offset, cache, codec, threadpool, max_queued, ring, prefetch)
 
 
 class StreamReader(_Reader):
@@ -59,34 +158,37 @@ class StreamReader(_Reader):
     Implements _Reader to handle input data that is not accessible through a buffer interface.
     """
 
-    def __init__(self, input, peek=None, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME)):
+    def __init__(self, input, peek=None, cache=None, codec=None, threadpool: ThreadPoolExecutor = None, max_queued: int = DEFAULT_QUEUE_SIZE,
+                 ring: Ring = None, prefetch: Prefetch = None):
         """
         Constructor.
         :param input: Stream object to read from.
         :param peek: Data consumed from stream while peeking. Will be prepended to read data.
+        :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available.
+        :param threadpool: Thread pool to inflate blocks with, None for the shared default pool.
+        :param max_queued: Maximum number of blocks read ahead of the consumer.
+        :param ring: Ring to inflate blocks into, None to create one with enough free arenas for max_queued blocks.
+        :param prefetch: Prefetch instance controlling the read ahead window, None for the defaults limited to max_queued blocks.
         """
-        super().__init__(input, threadpool)
+        super().__init__(input, cache, codec, threadpool, max_queued, ring, prefetch)
         self._peek = peek
-
-    def __next__(self):
-        if not self.max_queued or not self.blockqueue[0].done(): self.max_queued += 1
         try:
-            while len(self.blockqueue) < self.max_queued:
-                block, cdata = Block.from_stream(self._input, self._peek)
-                self._peek = None
-                self.total_in += len(block)
-                self.total_out += block.uncompressed_size
-                if block.uncompressed_size:
-                    self.blockqueue.append(self.pool.submit(inflate, cdata, memoryview(bytearray(block.uncompressed_size))))  # TODO reuse buffers
-                else:
-                    raise EmptyBlock()
-        except EOFError:
-            pass
-        if not len(self.blockqueue):
-            raise StopIteration()
-        self.buffer = self.blockqueue.popleft().result()
-        self.remaining = len(self.buffer)
-        return self.buffer
+            self.offset = input.tell() - (len(peek) if peek else 0)
+        except (AttributeError, OSError):
+            # Unseekable streams are assumed to be read from the beginning
+            self.offset = 0
+        self._read_offset = self.offset
+
+    def _read_block(self):
+        block, cdata = Block.from_stream(self._input, self._peek)
+        self._peek = None
+        return block, cdata
+
+    def _seek_block(self, block_offset):
+        self._input.seek(block_offset)
+        self._peek = None
+        super()._seek_block(block_offset)
 
 
 class BufferReader(_Reader):
@@ -94,30 +196,29 @@ class BufferReader(_Reader):
     Implements _Reader to handle input data that is accessible through a buffer interface.
     """
 
-    def __init__(self, input, offset=0, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME)):
+    def __init__(self, input, offset=0, cache=None, codec=None, threadpool: ThreadPoolExecutor = None, max_queued: int = DEFAULT_QUEUE_SIZE,
+                 ring: Ring = None, prefetch: Prefetch = None):
         """
         Constructor.
         :param input: Buffer object to read from.
         :param offset: The offset into the input buffer to begin reading from.
+        :param cache: BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: Codec instance or backend name used to inflate blocks, None for the fastest available.
+        :param threadpool: Thread pool to inflate blocks with, None for the shared default pool.
+        :param max_queued: Maximum number of blocks read ahead of the consumer.
+        :param ring: Ring to inflate blocks into, None to create one with enough free arenas for max_queued blocks.
+        :param prefetch: Prefetch instance controlling the read ahead window, None for the defaults limited to max_queued blocks.
         """
-        super().__init__(input, threadpool)
+        super().__init__(input, cache, codec, threadpool, max_queued, ring, prefetch)
         self._len = len(input)
-        self.offset = offset
+        self.offset = self._read_offset = offset
 
-    def __next__(self):
-        if not self.max_queued or not self.blockqueue[0].done(): self.max_queued += 1
-        while self.offset < self._len and len(self.blockqueue) < self.max_queued:
-            block, cdata = Block.from_buffer(self._input, self.offset)
-            block_len = len(block)
-            self.offset += block_len
-            self.total_in += block_len
-            self.total_out += block.uncompressed_size
-            if block.uncompressed_size:
-                self.blockqueue.append(self.pool.submit(inflate, cdata, memoryview(bytearray(block.uncompressed_size))))  # TODO reuse buffers
-            else:
-                raise EmptyBlock()
-        if not len(self.blockqueue):
-            raise StopIteration()
-        self.buffer = self.blockqueue.popleft().result()
-        self.remaining = len(self.buffer)
-        return self.buffer
+    def _read_block(self):
+        if self._read_offset >= self._len:
+            raise EOFError()
+        return Block.from_buffer(self._input, self._read_offset)
+
+    def _seek_block(self, block_offset):
+        if block_offset > self._len:
+            raise ValueError("Block offset {} is beyond the end of the buffer.".format(block_offset))
+        super()._seek_block(block_offset)
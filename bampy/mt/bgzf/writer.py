@@ -1,106 +1,211 @@
-import ctypes as C
+"""
+Provides block writers that deflate blocks using a thread pool.
+"""
+
 import io
 from collections import deque
-from concurrent.futures import ThreadPoolExecutor
-
-import numba
+from concurrent.futures import Future, ThreadPoolExecutor
 
-from bampy.bgzf.block import FIXED_XLEN_HEADER, Trailer
-from bampy.bgzf.writer import MAX_BLOCK_SIZE, MAX_DATA_SIZE, SIZEOF_FIXED_XLEN_HEADER, SIZEOF_TRAILER, SIZEOF_UINT16
-from bampy.mt import CACHE_JIT, THREAD_NAME, DEFAULT_THREADS
-from . import zlib
+from .. import DEFAULT_QUEUE_SIZE, default_pool
+from ...bgzf.pool import BufferPool
+from ...bgzf import zlib
+from ...bgzf.util import MAX_BLOCK_SIZE
+from ...bgzf.writer import _Writer as __Writer, compress_block
 
 
-@numba.jit(nopython=True, nogil=True, cache=CACHE_JIT)
-def deflate(data, buffer, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL):
-    buffer[offset:offset + SIZEOF_FIXED_XLEN_HEADER] = FIXED_XLEN_HEADER
-    offset += SIZEOF_FIXED_XLEN_HEADER
-    bsize = C.c_uint16.from_buffer(buffer, offset)
-    bsize.value = SIZEOF_FIXED_XLEN_HEADER + SIZEOF_TRAILER + 1
-    offset += SIZEOF_UINT16
-    state = None
+class _Writer(__Writer):
+    """
+    Base class for buffer and stream writers.
+    Provides Callable interface to compress data into blocks.
+    Finished blocks are submitted to the thread pool and written out in order as they complete.
+    Up to max_queued blocks are in flight at once, finishing a block waits on the oldest block once the limit is reached.
+    Both the uncompressed and compressed data of each block are held in MAX_BLOCK_SIZE buffers recycled through a BufferPool.
+
+    The compressed offset of a block is not known until it is written so tell() returns provisional virtual offsets
+    (block number << 16 | offset into uncompressed block data). Records passed to index_record() are added to indexer with the
+    true virtual file offsets once their blocks are written.
+    """
 
-    i = iter(data)
-    curr = next(i)
-    nxt = next(i)
-    while True:
-        try:
-            res, state = zlib.raw_compress(curr, None if state else buffer, mode=zlib.Z_NO_FLUSH, state=state, level=level)
-            assert res == zlib.Z_OK
-            curr = nxt
-            nxt = next(i)
-        except StopIteration:
-            res, state = zlib.raw_compress(curr, mode=zlib.Z_FINISH, state=state)
-            assert res == zlib.Z_STREAM_END, "Failed to flush buffer (Code: {}).".format(res)
-            bsize.value += state.total_out
-            offset += state.total_out
-            trailer = Trailer.from_buffer(buffer, offset)
-            offset += SIZEOF_TRAILER
-            trailer.crc32 = state.adler
-            trailer.uncompressed_size = state.total_in
-            return buffer, offset
-
-
-class _Writer:
-    def __init__(self, output, thread_pool: ThreadPoolExecutor, _thread_func=deflate, level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        self.pool = thread_pool
-        self._thread_func = _thread_func
-        self.output = output
-        self.queue = deque()
-        self.queue_size = 0
-        self.results = deque()
-        self._level = level
-
-    def __call__(self, data):
-        size = len(data)
-        if self.queue_size + size >= MAX_DATA_SIZE:
-            self.finish_block()
-        self.queue.append(data)
-        self.queue_size += size
+    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None, threadpool: ThreadPoolExecutor = None,
+                 max_queued: int = DEFAULT_QUEUE_SIZE, buffers: BufferPool = None):
+        """
+        Constructor.
+        :param output: The buffer to output compressed data.
+        :param offset: The offset into buffer to begin writing.
+        :param level: zlib compression level.
+        :param codec: Codec instance or backend name used to deflate blocks, None for the fastest available. See codec.get().
+        :param threadpool: Thread pool to deflate blocks with, None for the shared default pool.
+        :param max_queued: Maximum number of finished blocks waiting to be written.
+        :param buffers: BufferPool of MAX_BLOCK_SIZE buffers, None to create one sized to max_queued.
+        """
+        super().__init__(output, offset, level, codec)
+        self.pool = threadpool or default_pool()
+        self.max_queued = max(1, max_queued)
+        # Each queued block holds a data buffer until compressed and a block buffer until written
+        self.buffers = buffers if buffers is not None else BufferPool(MAX_BLOCK_SIZE, 2 * self.max_queued + 1)
+        self._data = self.buffers.acquire()
+        self.results = deque()  # (block number, uncompressed size, future of compressed block) in output order
+        self.block_number = 0  # Number of the current block, counted from the first block written by this writer
+        self.indexer = None  # bai.Indexer to add records to as their blocks are written
+        self._pending = deque()  # (record, provisional begin, provisional end) awaiting their blocks
+        self._block_offsets = {}  # Compressed offsets of written blocks keyed on block number
+
+    def _deflate_block(self, data, size: int):
+        """
+        Worker task to compress a block into a pooled buffer.
+        The data buffer is returned to the pool.
+        :param data: Buffer from the pool containing the uncompressed data.
+        :param size: Number of bytes of data to compress.
+        :return: Tuple of (buffer from the pool containing the block, size of the block).
+        """
+        buffer = self.buffers.acquire()
+        block_size = compress_block(data, size, buffer, 0, self.codec, self._level)
+        self.buffers.release(data)
+        return buffer, block_size
 
     def finish_block(self):
-        if self.queue_size:
-            self.results.append(self.pool.submit(self._thread_func, self.queue, bytearray(MAX_BLOCK_SIZE)), self._level)  # TODO reuse buffers
-            self.queue = deque()  # TODO reuse queues
-            self.queue_size = 0
-            self.flush()
-
-    def flush(self, wait=False):
+        """
+        Submit the data of the current block to the thread pool and start a new block.
+        :return: None
+        """
+        if not self._data_len: return
+        if self._pending and self._pending[-1][2] == self.tell():
+            # The last record ends the block, its end is the start of the next block as a reader resolves it
+            record, begin, _ = self._pending[-1]
+            self._pending[-1] = (record, begin, (self.block_number + 1) << 16)
+        while len(self.results) >= self.max_queued:
+            self._write_next()
+        try:
+            future = self.pool.submit(self._deflate_block, self._data, self._data_len)
+        except RuntimeError:
+            # The pool has been shut down, as happens when the writer is collected during interpreter exit
+            future = Future()
+            future.set_result(self._deflate_block(self._data, self._data_len))
+        self.results.append((self.block_number, self._data_len, future))
+        self._data = self.buffers.acquire()
+        self._data_len = 0
+        self.block_number += 1
+        self.flush()
+
+    def tell(self) -> int:
+        """
+        Provisional virtual offset that the next byte passed to __call__() will be written at.
+        :return: Provisional virtual offset (block number << 16 | offset into uncompressed block data).
+        """
+        return self.block_number << 16 | self._data_len
+
+    def index_record(self, record, begin: int, end: int) -> None:
+        """
+        Add a record to indexer once the blocks it was written to are written out.
+        :param record: Record instance.
+        :param begin: Provisional virtual offset of the first byte of the record, see tell().
+        :param end: Provisional virtual offset following the last byte of the record, see tell().
+        :return: None
+        """
+        self._pending.append((record, begin, end))
+
+    def flush(self, wait=False) -> None:
+        """
+        Write out finished blocks in order.
+        :param wait: If True, wait for all queued blocks to finish and write them. Otherwise stop at the first unfinished block.
+        :return: None
+        """
+        while self.results and (wait or self.results[0][2].done()):
+            self._write_next()
+
+    def _write_next(self) -> None:
+        """
+        Write out the oldest queued block, waiting for it to finish if necessary.
+        :return: None
+        """
+        block_number, data_len, future = self.results.popleft()
+        buffer, block_size = future.result()
+        self._block_offsets[block_number] = self.block_offset
+        self._write(buffer, block_size)
+        self.buffers.release(buffer)
+        self.total_in += data_len
+        self.total_out += block_size
+        self.block_offset += block_size
+        # The next block starts where this one ends, resolving offsets at its start such as the end of the last record
+        self._block_offsets[block_number + 1] = self.block_offset
+        self._resolve()
+
+    def _write(self, buffer, size: int) -> None:
+        """
+        Copy a compressed block to the output.
+        :param buffer: Buffer containing the block.
+        :param size: Size of the block.
+        :return: None
+        """
         raise NotImplementedError()
 
+    def _resolve(self) -> None:
+        """
+        Index pending records whose blocks have all been written.
+        :return: None
+        """
+        offsets = self._block_offsets
+        while self._pending and self._pending[0][2] >> 16 in offsets:
+            record, begin, end = self._pending.popleft()
+            if self.indexer is not None:
+                self.indexer.add_record(record, offsets[begin >> 16] << 16 | begin & 0xFFFF, offsets[end >> 16] << 16 | end & 0xFFFF)
+        # Forget blocks that can no longer be referenced
+        first = self._pending[0][1] >> 16 if self._pending else self.block_number
+        for block_number in [block_number for block_number in offsets if block_number < first]:
+            del offsets[block_number]
+
     def __del__(self):
         self.finish_block()
         self.flush(True)
 
 
 class BufferWriter(_Writer):
-    def __init__(self, output, offset=0, thread_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME), level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        self.offset = offset
-        super().__init__(output, thread_pool, level=level)
+    """
+    Implements _Writer to output to a randomly accessible buffer interface.
+    """
 
-    def flush(self, wait=False):
-        while self.results[0].done() or wait:
-            buffer, offset = self.results.popleft().result()
-            self.output[self.offset:self.offset + offset] = buffer[:offset]
-            self.offset += offset
+    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None, threadpool: ThreadPoolExecutor = None,
+                 max_queued: int = DEFAULT_QUEUE_SIZE, buffers: BufferPool = None):
+        super().__init__(output, offset, level, codec, threadpool, max_queued, buffers)
+
+    def _write(self, buffer, size):
+        self._output[self.offset:self.offset + size] = memoryview(buffer)[:size]
+        self.offset += size
 
 
 class StreamWriter(_Writer):
-    def flush(self, wait=False):
-        while self.results[0].done() or wait:
-            buffer, offset = self.results.popleft().result()
-            self.output.write(buffer[:offset])
+    """
+    Implements _Writer to output to a stream.
+    """
+
+    def __init__(self, output, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None, threadpool: ThreadPoolExecutor = None,
+                 max_queued: int = DEFAULT_QUEUE_SIZE, buffers: BufferPool = None):
+        super().__init__(output, 0, level, codec, threadpool, max_queued, buffers)
+        try:
+            self.block_offset = output.tell()
+        except (AttributeError, OSError):
+            # Unseekable streams are assumed to be written from the beginning
+            pass
+
+    def _write(self, buffer, size):
+        self._output.write(memoryview(buffer)[:size])
 
 
-def Writer(output, offset=0, thread_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME), level=zlib.DEFAULT_COMPRESSION_LEVEL) -> _Writer:
+def Writer(output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, codec=None, threadpool: ThreadPoolExecutor = None,
+           max_queued: int = DEFAULT_QUEUE_SIZE, buffers: BufferPool = None) -> _Writer:
     """
     Factory to provide a unified writer interface.
     Resolves if output is randomly accessible and provides the appropriate _Writer implementation.
     :param output: A stream or buffer object.
     :param offset: If output is a buffer, the offset into the buffer to begin writing. Ignored otherwise.
+    :param level: zlib compression level.
+    :param codec: Codec instance or backend name used to deflate blocks, None for the fastest available. See codec.get().
+    :param threadpool: Thread pool to deflate blocks with, None for the shared default pool.
+    :param max_queued: Maximum number of finished blocks waiting to be written.
+    :param buffers: BufferPool of MAX_BLOCK_SIZE buffers, None to create one sized to max_queued.
     :return: An instance of StreamWriter or BufferWriter.
     """
     if isinstance(output, (io.RawIOBase, io.BufferedIOBase)):
-        return StreamWriter(output, thread_pool, level=level)
+        return StreamWriter(output, level, codec, threadpool, max_queued, buffers)
     else:
-        return BufferWriter(output, offset, thread_pool, level=level)
+        return BufferWriter(output, offset, level, codec, threadpool, max_queued, buffers)
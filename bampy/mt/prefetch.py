@@ -0,0 +1,68 @@
+"""
+Provides the controller that sizes the read ahead window of the threaded readers.
+"""
+
+DEFAULT_MAX_BYTES = 32 * 2 ** 20
+"""int: Default ceiling on the inflated data queued ahead of the consumer (32MB, roughly 500 full blocks)."""
+
+DEFAULT_TARGET_LATENCY = 0.0005
+"""float: Default time in seconds the consumer may wait on a block before the window is grown."""
+
+
+class Prefetch:
+    """
+    Adaptive read ahead window.
+    The reader reports how long the consumer waited on each block. If the wait exceeds target_latency the workers are
+    falling behind and the window is doubled. Once the following block has also been ready for a full window of blocks
+    the consumer is the bottleneck and the window shrinks by one block. The window never exceeds max_depth blocks or
+    max_bytes of inflated data.
+    """
+
+    def __init__(self, max_depth: int, max_bytes: int = DEFAULT_MAX_BYTES, target_latency: float = DEFAULT_TARGET_LATENCY, min_depth: int = 1):
+        """
+        Constructor.
+        :param max_depth: Maximum number of blocks in flight.
+        :param max_bytes: Maximum number of inflated bytes in flight. At least one block is always allowed.
+        :param target_latency: Time in seconds the consumer may wait on a block before the window is grown.
+        :param min_depth: Minimum number of blocks in flight.
+        """
+        self.max_depth = max(1, max_depth)
+        self.min_depth = max(1, min(min_depth, self.max_depth))
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.depth = self.min_depth  # Current window size in blocks
+        self.stalls = 0  # Number of blocks the consumer waited longer than target_latency for
+        self.wait_time = 0.0  # Total time in seconds the consumer spent waiting on blocks
+        self._idle = 0  # Consecutive blocks where the workers were ahead of the consumer
+
+    def allow(self, queued: int, queued_bytes: int, size: int) -> bool:
+        """
+        Check if another block may be put in flight.
+        :param queued: Number of blocks in flight.
+        :param queued_bytes: Inflated size of the blocks in flight.
+        :param size: Inflated size of the next block.
+        :return: True if the block may be submitted.
+        """
+        if not queued:
+            return True
+        return queued < self.depth and queued_bytes + size <= self.max_bytes
+
+    def update(self, wait: float, ahead: bool) -> None:
+        """
+        Report the time the consumer waited on the block at the head of the queue and resize the window.
+        :param wait: Time in seconds, 0 if the block was ready.
+        :param ahead: True if the block following it was also ready.
+        :return: None
+        """
+        self.wait_time += wait
+        if wait > self.target_latency:
+            self.stalls += 1
+            self._idle = 0
+            self.depth = min(self.depth * 2, self.max_depth)
+        elif ahead:
+            self._idle += 1
+            if self._idle >= self.depth:
+                self._idle = 0
+                self.depth = max(self.depth - 1, self.min_depth)
+        else:
+            self._idle = 0
@@ -1,64 +1,62 @@
-import ctypes as C
+"""
+Provides convenience interface for reading HTS alignment data with BGZF blocks inflated by a thread pool.
+"""
+
 import io
-import warnings
-from collections import namedtuple
 from concurrent.futures import ThreadPoolExecutor
 
-from bampy.mt import THREAD_NAME, DEFAULT_THREADS
-from .bgzf import Reader as bgzf_Reader
+from . import DEFAULT_QUEUE_SIZE, bgzf as mt_bgzf
+from .prefetch import Prefetch
 from .. import bam, bgzf
-from ..reader import BAMBufferReader, BAMStreamReader, BGZFReader as _BGZFReader, SAMBufferReader, SAMStreamReader, TruncatedFileWarning
-
-_Last = namedtuple('_Last', ('buffer', 'offset', 'remaining'))
+from ..reader import BAMBufferReader, BAMStreamReader, BGZFReader as _BGZFReader, SAMBufferReader, SAMStreamReader
 
 
 class BGZFReader(_BGZFReader):
-    def __init__(self, input, offset=0, peek=None, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME)):
-        super().__init__(input, offset, peek)
-        self._last = _Last(self._bgzfReader.buffer, self._bgzfOffset, self._bgzfReader.remaining)
-        # Re-init with multithreaded reader
-        self._bgzfReader = bgzf_Reader(self._input, self._bgzfReader.offset if hasattr(self._bgzfReader, 'offset') else 0, None, threadpool)
-        next(self._bgzfReader)
+    """
+    Reads from BGZF stream or buffer and provides Iterable interface that emits Record instances.
+    Blocks are inflated ahead of the records being read by a thread pool.
+    """
+
+    def __init__(self, source, offset=0, peek=None, cache=None, codec=None, threadpool: ThreadPoolExecutor = None, max_queued: int = DEFAULT_QUEUE_SIZE,
+                 prefetch: Prefetch = None):
+        """
+        Constructor.
+        :param source: Stream or buffer containing BGZF compressed BAM data.
+        :param offset: If source is a buffer, offset into buffer to begin reading from.
+        :param peek: Data consumed from stream while peeking. Ignored if source is a buffer.
+        :param cache: bgzf.BlockCache instance consulted before inflating a block, None to always inflate.
+        :param codec: bgzf.codec.Codec instance or backend name used to inflate blocks, None for the fastest available.
+        :param threadpool: Thread pool to inflate blocks with, None for the shared default pool.
+        :param max_queued: Maximum number of blocks read ahead of the consumer.
+        :param prefetch: Prefetch instance controlling the read ahead window, None for the defaults limited to max_queued blocks.
+        """
+        self._threadpool = threadpool
+        self._max_queued = max_queued
+        self._prefetch = prefetch
+        super().__init__(source, offset, peek, cache, codec)
+
+    def _open(self, source, offset, peek, cache, codec):
+        return mt_bgzf.Reader(source, offset, peek, cache, codec, self._threadpool, self._max_queued, prefetch=self._prefetch)
 
-    def __next__(self):
-        empty = False
-        while True:
-            if self._last.remaining and not empty:
-                # Move record into contiguous memory
-                record_len = C.c_uint32.from_buffer(self._last.buffer, self._last.offset).value
-                offset = record_len - self._last.remaining
-                buffer = (C.c_ubyte * record_len)()
-                C.memmove(buffer, C.byref(self._last.buffer, self._last.offset), self._last.remaining)
-                C.memmove(buffer, C.byref(self._bgzfReader.buffer), offset)
-                self._bgzfOffset = offset
-                self._bgzfReader.remaining -= offset
-                yield bam.Record.from_buffer(buffer, 0, self.references)
-            try:
-                while True:
-                    record = bam.Record.from_buffer(self._bgzfReader.buffer, self._bgzfOffset, self.references)
-                    record_len = len(record)
-                    self._bgzfOffset += record_len
-                    self._bgzfReader.remaining -= record_len
-                    yield record
-            except bam.util.BufferUnderflow:
-                try:
-                    self._last = _Last(self._bgzfReader.buffer, self._bgzfOffset, self._bgzfReader.remaining)
-                    next(self._bgzfReader)
-                    empty = False
-                except bgzf.EmptyBlock:
-                    empty = True
-                except StopIteration:
-                    if empty:
-                        warnings.warn("Missing EOF marker, data is possibly truncated.", TruncatedFileWarning)
-                    raise
-                self._bgzfOffset = 0
+    @property
+    def depth(self) -> int:
+        """
+        Current size of the BGZF read ahead window.
+        :return: Maximum number of blocks that will be put in flight.
+        """
+        return self._bgzfReader.depth
 
 
-def Reader(input, offset=0, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME)):
+def Reader(input, offset=0, cache=None, codec=None, threadpool: ThreadPoolExecutor = None, max_queued: int = DEFAULT_QUEUE_SIZE, prefetch: Prefetch = None):
     """
     Convenience interface for reading alignment records from BGZF/BAM/SAM files.
     :param input: Stream or buffer containing alignment data.
     :param offset: If input is a buffer, offset into buffer to begin reading from.
+    :param cache: bgzf.BlockCache instance shared by BGZF readers to avoid inflating blocks more than once. Ignored for BAM and SAM.
+    :param codec: bgzf.codec.Codec instance or backend name used to inflate BGZF blocks, None for the fastest available.
+    :param threadpool: Thread pool to inflate BGZF blocks with, None for the shared default pool.
+    :param max_queued: Maximum number of BGZF blocks read ahead of the consumer.
+    :param prefetch: Prefetch instance controlling the BGZF read ahead window, None for the defaults limited to max_queued blocks.
     :return: Iterable that emits Record instances.
     """
     if isinstance(input, (io.RawIOBase, io.BufferedIOBase)):
@@ -66,7 +64,7 @@ def Reader(input, offset=0, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(
         peek = bytearray(4)
         input.readinto(peek)
         if bgzf.is_bgzf(peek):
-            return BGZFReader(input, offset, peek, threadpool)
+            return BGZFReader(input, offset, peek, cache, codec, threadpool, max_queued, prefetch)
         elif bam.is_bam(peek):
             return BAMStreamReader(input, peek)
         else:
@@ -74,7 +72,7 @@ def Reader(input, offset=0, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(
             return SAMStreamReader(input, peek)
     else:
         if bgzf.is_bgzf(input, offset):
-            return BGZFReader(input, offset, threadpool=threadpool)
+            return BGZFReader(input, offset, cache=cache, codec=codec, threadpool=threadpool, max_queued=max_queued, prefetch=prefetch)
         elif bam.is_bam(input, offset):
             return BAMBufferReader(input, offset)
         else:
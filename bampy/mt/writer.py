@@ -1,51 +1,67 @@
-import io
-from concurrent.futures import ThreadPoolExecutor
-from queue import deque
+"""
+Provides convenience interface for writing HTS alignment data with BGZF blocks deflated by a thread pool.
+"""
 
-import numba
+from concurrent.futures import ThreadPoolExecutor
 
-from bampy.mt import CACHE_JIT, THREAD_NAME, DEFAULT_THREADS
-from . import bgzf
-from .bgzf import zlib
-from .bgzf.writer import deflate
-from .. import bam
+from . import DEFAULT_QUEUE_SIZE, bgzf as mt_bgzf
+from .. import bai, bam
+from ..bgzf import zlib
 from ..writer import BGZFWriter as _BGZFWriter, Writer as _Writer
 
 
-@numba.jit(nopython=True, nogil=True, cache=CACHE_JIT)
-def compile(queue, buffer, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL):
-    data_queue = deque()
-    for record in queue:
-        data = record.pack()
-        data_queue.extend(data)
-    return deflate(data_queue, buffer, offset)
-
-
 class BGZFWriter(_BGZFWriter):
-    def __init__(self, output, offset=0, threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME), level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        super().__init__(bgzf.Writer(output, offset, threadpool, compile, level=level))
+    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, index=None, n_ref=0, codec=None, threadpool: ThreadPoolExecutor = None,
+                 max_queued: int = DEFAULT_QUEUE_SIZE, quality_table=None):
+        """
+        Constructor.
+        :param output: The buffer or stream to output to.
+        :param offset: If a buffer, the offset into the buffer to start at.
+        :param level: zlib compression level.
+        :param index: Writable stream to write a BAI index of the output to on finalize(), or None. Records must be coordinate sorted.
+        :param n_ref: Number of references in the header. Required if index is provided.
+        :param codec: bgzf.codec.Codec instance or backend name used to deflate blocks, None for the fastest available.
+        :param threadpool: Thread pool to deflate blocks with, None for the shared default pool.
+        :param max_queued: Maximum number of finished blocks waiting to be written.
+        :param quality_table: bytes.translate() table applied to the quality scores of written records, None to write them as is.
+        """
+        _Writer.__init__(self, mt_bgzf.Writer(output, offset, level, codec, threadpool, max_queued))
+        self._index = index
+        self._indexer = bai.Indexer(n_ref) if index is not None else None
+        self._last = None
+        self.quality_table = quality_table
+        # Records are indexed as their blocks are written out
+        self._output.indexer = self._indexer
 
-    def __call__(self, record):
-        self._output(record)
+    def _add_to_index(self, record, begin, end):
+        self._output.index_record(record, begin, end)
 
     def finalize(self):
         if self._output:
             self._output.finish_block()
             self._output.flush(True)
-            offset = self._output.offset
-            output = self._output._output
-            if isinstance(output, (io.RawIOBase, io.BufferedIOBase)):
-                output.write(bgzf.EMPTY_BLOCK)
-            else:
-                output[offset:offset + bgzf.SIZEOF_EMPTY_BLOCK] = bgzf.EMPTY_BLOCK
-            self._offset = offset + bgzf.SIZEOF_EMPTY_BLOCK
-            self._output = None
+        super().finalize()
 
 
 class Writer(_Writer):
     @staticmethod
-    def bgzf(output, offset=0, sam_header=b'', references=(), threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=DEFAULT_THREADS, thread_name_prefix=THREAD_NAME), level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        writer = BGZFWriter(output, offset, threadpool, level=level)
+    def bgzf(output, offset=0, sam_header=b'', references=(), threadpool: ThreadPoolExecutor = None, level=zlib.DEFAULT_COMPRESSION_LEVEL,
+             index=None, codec=None, max_queued: int = DEFAULT_QUEUE_SIZE, quality_table=None):
+        """
+        Multithreaded equivalent of bampy.writer.Writer.bgzf().
+        :param output: The buffer or stream to output to.
+        :param offset: If a buffer, the offset into the buffer to start at.
+        :param sam_header: Bytes like object containing the SAM formatted header to write to the output.
+        :param references: List of Reference objects to use in record references.
+        :param threadpool: Thread pool to deflate blocks with, None for the shared default pool.
+        :param level: zlib compression level.
+        :param index: Writable stream to write a BAI index of the output to on finalize(), or None. Records must be coordinate sorted.
+        :param codec: bgzf.codec.Codec instance or backend name used to deflate blocks, None for the fastest available.
+        :param max_queued: Maximum number of finished blocks waiting to be written.
+        :param quality_table: bytes.translate() table applied to the quality scores of written records, for example bam.ILLUMINA_8_LEVEL.
+        :return: BGZFWriter instance.
+        """
+        writer = BGZFWriter(output, offset, level, index, len(references), codec, threadpool, max_queued, quality_table)
         writer._output(bam.pack_header(sam_header, references))
         writer._output.finish_block()
         return writer
@@ -0,0 +1,134 @@
+"""
+Provides process parallel scanning of whole BAM files.
+
+Record decoding holds the GIL so per record work does not scale with threads. Instead the memory mapped file is split at
+BGZF block boundaries and each part is read by a separate process. Each process resyncs to the first record starting
+in its part and stops at the first record starting in the next part. Parts are verified against each other in file order
+so that a resync that lands on data that only looks like a record is detected and the part is read again.
+
+Functions:
+    scan: Map a function over all records of a BAM file and reduce the results.
+    partition: Split BGZF data into parts at block boundaries.
+    resync: Find the first record starting in a range of blocks.
+"""
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import bam, bgzf
+from .mt import DEFAULT_THREADS
+from .reader import BGZFReader
+from .util import open_buffer
+
+DEFAULT_PROCESSES = DEFAULT_THREADS
+"""int: Default number of worker processes, one per CPU available to the process."""
+
+
+def partition(buffer, parts: int) -> list:
+    """
+    Split BGZF data into parts at block boundaries.
+    Fewer parts are returned if the data contains too few blocks.
+    :param buffer: Buffer containing BGZF compressed data.
+    :param parts: Number of parts to split into.
+    :return: List of block offsets, starting with 0 and ending with len(buffer). Part i spans offsets[i] to offsets[i + 1].
+        The EOF marker block is never the start of a part.
+    """
+    buffer_len = len(buffer)
+    data_end = buffer_len - bgzf.SIZEOF_EMPTY_BLOCK if buffer[buffer_len - bgzf.SIZEOF_EMPTY_BLOCK:] == bgzf.EMPTY_BLOCK else buffer_len
+    offsets = sorted({bgzf.util.find_block(buffer, buffer_len * i // parts) for i in range(max(parts, 1))})
+    offsets = [offset for offset in offsets if offset < data_end] + [buffer_len]
+    offsets[0] = 0
+    return offsets
+
+
+def resync(buffer, start: int, end: int, n_ref: int) -> int:
+    """
+    Find the first record starting in the blocks between start and end.
+    Records are recognised with bam.util.find_record() and may be wrong if a record contains data that resembles a record.
+    :param buffer: Buffer containing BGZF compressed BAM data.
+    :param start: Offset of the first block to search.
+    :param end: Offset of the first block following the blocks to search.
+    :param n_ref: Number of references in the BAM header.
+    :return: Virtual offset of the record, end << 16 if no record starts in the blocks.
+    """
+    block_reader = bgzf.Reader(buffer, start)
+    while block_reader.offset < end:
+        block_offset = block_reader.offset
+        try:
+            data = next(block_reader)
+        except bgzf.EmptyBlock:
+            continue
+        offset = bam.util.find_record(data, 0, n_ref)
+        if offset is not None:
+            return block_offset << 16 | offset
+        block_reader.remaining = 0
+    return end << 16
+
+
+def scan_part(path: str, fn, reduce, start: int, end: int, first: int = None) -> (bool, object, int, int):
+    """
+    Map fn over the records starting in the blocks between start and end and reduce the results.
+    :param path: Path to the BAM file.
+    :param fn: Function called with each Record.
+    :param reduce: Function combining two results of fn, or of reduce, into one.
+    :param start: Offset of the first block of the part.
+    :param end: Offset of the first block following the part.
+    :param first: Virtual offset of the first record of the part if known, otherwise the first record is searched for.
+    :return: Tuple of (True if any records were read, reduced result, virtual offset of the first record read,
+             virtual offset of the first record of the next part or None if the end of the file was reached).
+    """
+    buffer = open_buffer(path, os.O_RDONLY)
+    reader = BGZFReader(buffer)
+    if first is None:
+        first = resync(buffer, start, end, len(reader.references))
+    if first >> 16 >= end:
+        # No record starts in the part, the next part starts with the same record or the file has ended
+        return False, None, first, first if end < len(buffer) else None
+    reader.seek(first)
+    found, result = False, None
+    for record in reader:
+        if record.virtual_offset >> 16 >= end:
+            return found, result, first, record.virtual_offset
+        value = fn(record)
+        result = reduce(result, value) if found else value
+        found = True
+    return found, result, first, None
+
+
+def scan(path: str, fn, reduce, workers: int = DEFAULT_PROCESSES, initial=None):
+    """
+    Map a function over all records of a BAM file using a pool of processes and reduce the results.
+    Each process reduces the results of a contiguous part of the file and the parts are then reduced in file order.
+    reduce must therefore be associative, but need not be commutative.
+    fn, reduce, and the results must be picklable, lambdas and nested functions can not be used.
+    :param path: Path to a BGZF compressed BAM file.
+    :param fn: Function called with each Record.
+    :param reduce: Function combining two results of fn, or of reduce, into one.
+    :param workers: Number of processes.
+    :param initial: Value to start the reduction with, None to start with the result of the first record.
+    :return: Reduced result, initial if the file contains no records.
+    """
+    buffer = open_buffer(path, os.O_RDONLY)
+    reader = BGZFReader(buffer)
+    first = reader.tell()
+    offsets = partition(buffer, workers)
+    del reader, buffer
+
+    results = [] if initial is None else [initial]
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = [pool.submit(scan_part, path, fn, reduce, start, end, None if i else first) for i, (start, end) in enumerate(zip(offsets, offsets[1:]))]
+        next_first = first
+        for (start, end), future in zip(zip(offsets, offsets[1:]), futures):
+            if next_first is None:
+                # Previous part read to the end of the file
+                future.cancel()
+                continue
+            found, result, part_first, part_next = future.result()
+            if part_first != next_first:
+                # Resync did not land where the previous part ended, read the part again from there
+                found, result, part_first, part_next = scan_part(path, fn, reduce, start, end, next_first)
+            if found:
+                results.append(result)
+            next_first = part_next
+    return functools.reduce(reduce, results) if results else initial
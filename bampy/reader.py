@@ -3,10 +3,13 @@ Provides convenience interface for reading HTS alignment data.
 """
 
 import io
+import struct
 import warnings
 
 from . import bam, bgzf, sam
 
+_BLOCK_SIZE = struct.Struct('<i')
+
 
 class TruncatedFileWarning(UserWarning):
     """
@@ -41,11 +44,13 @@ def discover_stream(stream):
         return SAMHeader(sam.header_from_stream(stream, peek))
 
 
-def Reader(input, offset=0):
+def Reader(input, offset=0, cache=None, codec=None):
     """
     Convenience interface for reading alignment records from BGZF/BAM/SAM files.
     :param input: Stream or buffer containing alignment data.
     :param offset: If input is a buffer, offset into buffer to begin reading from.
+    :param cache: bgzf.BlockCache instance shared by BGZF readers to avoid inflating blocks more than once. Ignored for BAM and SAM.
+    :param codec: bgzf.codec.Codec instance or backend name used to inflate BGZF blocks, None for the fastest available.
     :return: Iterable that emits Record instances.
     """
     if isinstance(input, (io.RawIOBase, io.BufferedIOBase)):
@@ -53,7 +58,7 @@ def Reader(input, offset=0):
         peek = bytearray(4)
         input.readinto(peek)
         if bgzf.is_bgzf(peek):
-            return BGZFReader(input, offset, peek)
+            return BGZFReader(input, offset, peek, cache, codec)
         elif bam.is_bam(peek):
             return BAMStreamReader(input, peek)
         else:
@@ -61,7 +66,7 @@ def Reader(input, offset=0):
             return SAMStreamReader(input, peek)
     else:
         if bgzf.is_bgzf(input, offset):
-            return BGZFReader(input, offset)
+            return BGZFReader(input, offset, cache=cache, codec=codec)
         elif bam.is_bam(input, offset):
             return BAMBufferReader(input, offset)
         else:
@@ -113,12 +118,12 @@ class BGZFReader(_Reader):
     Reads from BGZF stream or buffer and provides Iterable interface that emits Record instances.
     """
 
-    def __init__(self, source, offset=0, peek=None):
+    def __init__(self, source, offset=0, peek=None, cache=None, codec=None):
         if not isinstance(source, (io.RawIOBase, io.BufferedIOBase)) and source[-bgzf.SIZEOF_EMPTY_BLOCK:] != bgzf.EMPTY_BLOCK:
             warnings.warn("Missing EOF marker, data is possibly truncated.", TruncatedFileWarning)
         super().__init__(source)
         self.offset = offset
-        self._bgzfReader = bgzf.Reader(source, offset, peek)
+        self._bgzfReader = self._open(source, offset, peek, cache, codec)
         while True:
             try:
                 self.header, self.references, offset = bam.header_from_buffer(next(self._bgzfReader))
@@ -127,27 +132,127 @@ class BGZFReader(_Reader):
             self._bgzfOffset = offset
             self._bgzfReader.remaining -= offset
             break
-
-    def __next__(self):
+        self._scan()
+
+    def _open(self, source, offset, peek, cache, codec):
+        """
+        Create the block reader for source.
+        :return: bgzf.reader._Reader instance.
+        """
+        return bgzf.Reader(source, offset, peek, cache, codec)
+
+    def tell(self) -> int:
+        """
+        Virtual file offset of the next record to be read.
+        :return: BGZF virtual file offset (compressed block start << 16 | offset into uncompressed block data).
+        """
+        return self._bgzfReader.virtual_offset(self._bgzfOffset)
+
+    def seek(self, virtual_offset: int) -> None:
+        """
+        Move the reader to a virtual file offset that points at the first byte of a record.
+        Only the block containing the offset is inflated, reading continues from there.
+        :param virtual_offset: BGZF virtual file offset, see tell() or the bai module.
+        :return: None
+        """
+        self._bgzfReader.seek(virtual_offset)
+        self._bgzfOffset = len(self._bgzfReader.buffer) - self._bgzfReader.remaining
+        self._scan()
+
+    def _scan(self) -> None:
+        """
+        Find the complete records in the current block data following _bgzfOffset, see bam.util.record_offsets().
+        Sets _bgzfRecords to their offsets and _bgzfEnd to the offset following the last of them.
+        :return: None
+        """
+        buffer = self._bgzfReader.buffer
+        self._bgzfRecords, carry = bam.util.record_offsets(buffer, self._bgzfOffset)
+        self._bgzfEnd = len(buffer) - carry
+
+    def _next_block(self) -> None:
+        """
+        Read blocks until the block data contains a complete record.
+        Raises StopIteration at the end of the input.
+        :return: None
+        """
         empty = False
         while True:
             try:
-                record = bam.Record.from_buffer(self._bgzfReader.buffer, self._bgzfOffset, self.references)
-                record_len = len(record)
-                self._bgzfOffset += record_len
-                self._bgzfReader.remaining -= record_len
-                return record
-            except bam.util.BufferUnderflow:
-                try:
-                    next(self._bgzfReader)
-                    empty = False
-                except bgzf.EmptyBlock:
-                    empty = True
-                except StopIteration:
-                    if empty:
-                        warnings.warn("Missing EOF marker, data is possibly truncated.", TruncatedFileWarning)
-                    raise
+                next(self._bgzfReader)
                 self._bgzfOffset = 0
+                self._scan()
+                if self._bgzfEnd:
+                    return
+                empty = False
+            except bgzf.EmptyBlock:
+                empty = True
+            except StopIteration:
+                if not empty:
+                    warnings.warn("Missing EOF marker, data is possibly truncated.", TruncatedFileWarning)
+                raise
+
+    def batches(self):
+        """
+        Read the remaining records as RecordBatch instances rather than Record instances. Requires NumPy.
+        A batch is emitted for the complete records in each inflated block, a record spanning blocks is included in the
+        batch of the block it ends in. Batches reference the inflated data and may be used after the reader advances.
+        Iteration may be freely mixed with reading records through next().
+        :return: Generator of bam.RecordBatch instances with virtual_offsets set.
+        """
+        if bam.batch.np is None:
+            raise ImportError("NumPy is required to decode record batches.")
+        while True:
+            block_reader = self._bgzfReader
+            offsets = self._bgzfRecords
+            if self._bgzfOffset:
+                # Records already read through next()
+                offsets = offsets[offsets >= self._bgzfOffset]
+            if len(offsets):
+                batch = bam.RecordBatch(bam.batch.decode_headers(block_reader.buffer, offsets), offsets, block_reader.virtual_offsets(offsets),
+                                        block_reader.buffer)
+                block_reader.remaining -= self._bgzfEnd - self._bgzfOffset
+                self._bgzfOffset = self._bgzfEnd
+                yield batch
+            try:
+                self._next_block()
+            except StopIteration:
+                return
+
+    def cursors(self):
+        """
+        Read the remaining records through a single reusable bam.RecordCursor rather than Record instances.
+        The cursor is moved to the next record each iteration, call RecordCursor.detach() to keep a record.
+        The reader is kept positioned after the record at the cursor, reading may continue through next() once iteration stops.
+        :return: Generator yielding the same RecordCursor instance positioned at each record.
+        """
+        block_reader = self._bgzfReader
+        cursor = bam.RecordCursor(references=self.references, _block_reader=block_reader)
+        while True:
+            cursor.buffer = block_reader.buffer
+            offsets = self._bgzfRecords.tolist()
+            end = self._bgzfEnd
+            for offset, next_offset in zip(offsets, offsets[1:] + [end]):
+                if offset < self._bgzfOffset:
+                    # Record already read through next()
+                    continue
+                cursor.offset = offset
+                block_reader.remaining -= next_offset - offset
+                self._bgzfOffset = next_offset
+                yield cursor
+            try:
+                self._next_block()
+            except StopIteration:
+                return
+
+    def __next__(self):
+        if self._bgzfOffset >= self._bgzfEnd:
+            self._next_block()
+        record = bam.Record.from_buffer(self._bgzfReader.buffer, self._bgzfOffset, self.references)
+        record.virtual_offset = self._bgzfReader.virtual_offset(self._bgzfOffset)
+        record_len = len(record)
+        self._bgzfOffset += record_len
+        self._bgzfReader.remaining -= record_len
+        return record
 
 
 class BAMStreamReader(StreamReader):
@@ -182,11 +287,29 @@ class BAMBufferReader(BufferReader):
     def __next__(self):
         try:
             record = bam.Record.from_buffer(self._input, self.offset, self.references)
-            self.offset = len(record)
+            self.offset += len(record)
             return record
         except bam.util.BufferUnderflow:
             raise StopIteration()
 
+    def cursors(self):
+        """
+        Read the remaining records through a single reusable bam.RecordCursor rather than Record instances.
+        The cursor is moved to the next record each iteration, call RecordCursor.detach() to keep a record.
+        :return: Generator yielding the same RecordCursor instance positioned at each record.
+        """
+        cursor = bam.RecordCursor(self._input, references=self.references)
+        unpack_from = _BLOCK_SIZE.unpack_from
+        last = self._buffer_len - bam.record.SIZEOF_RECORDHEADER
+        while self.offset <= last:
+            offset = self.offset
+            end = offset + unpack_from(self._input, offset)[0] + _BLOCK_SIZE.size
+            if end > self._buffer_len:
+                return
+            cursor.offset = offset
+            self.offset = end
+            yield cursor
+
 
 class SAMBufferReader(BufferReader):
     def __init__(self, input, offset=0):
@@ -18,7 +18,7 @@ def open_buffer(path, mode=os.O_RDWR | os.O_CREAT, size=0) -> mmap:
     """
     fh = os.open(path, mode)
     stat_result = os.stat(fh)
-    if not stat.S_ISFIFO(stat_result.st_mode):
+    if stat.S_ISFIFO(stat_result.st_mode):
         raise FileNotFoundError("Can not open pipe as buffer.")
     if size:
         os.truncate(fh, size)
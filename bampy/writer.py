@@ -1,6 +1,6 @@
 import io
 
-from . import bam, bgzf, sam
+from . import bai, bam, bgzf, sam
 from .bgzf import zlib
 
 
@@ -45,16 +45,20 @@ class Writer:
             return BAMBufferWriter(output, bam.header_to_buffer(output, offset, sam_header, references))
 
     @staticmethod
-    def bgzf(output, offset=0, sam_header=b'', references=(), level=zlib.DEFAULT_COMPRESSION_LEVEL):
+    def bgzf(output, offset=0, sam_header=b'', references=(), level=zlib.DEFAULT_COMPRESSION_LEVEL, index=None, codec=None, quality_table=None):
         """
         TODO
         :param output:
         :param offset:
         :param sam_header:
         :param references:
+        :param level: zlib compression level.
+        :param index: Writable stream to write a BAI index of the output to on finalize(), or None. Records must be coordinate sorted.
+        :param codec: bgzf.codec.Codec instance or backend name used to deflate blocks, None for the fastest available.
+        :param quality_table: bytes.translate() table applied to the quality scores of written records, for example bam.ILLUMINA_8_LEVEL.
         :return:
         """
-        writer = BGZFWriter(output, offset, level=level)
+        writer = BGZFWriter(output, offset, level=level, index=index, n_ref=len(references), codec=codec, quality_table=quality_table)
         writer._output(bam.pack_header(sam_header, references))
         writer._output.finish_block()
         return writer
@@ -99,16 +103,69 @@ class BAMBufferWriter(BufferWriter):
 
 
 class BGZFWriter(Writer):
-    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL):
-        super().__init__(bgzf.Writer(output, offset, level=level))
+    def __init__(self, output, offset=0, level=zlib.DEFAULT_COMPRESSION_LEVEL, index=None, n_ref=0, codec=None, quality_table=None):
+        """
+        Constructor.
+        :param output: The buffer or stream to output to.
+        :param offset: If a buffer, the offset into the buffer to start at.
+        :param level: zlib compression level.
+        :param index: Writable stream to write a BAI index of the output to on finalize(), or None. Records must be coordinate sorted.
+        :param n_ref: Number of references in the header. Required if index is provided.
+        :param codec: bgzf.codec.Codec instance or backend name used to deflate blocks, None for the fastest available.
+        :param quality_table: bytes.translate() table applied to the quality scores of written records, None to write them as is.
+            Binning quality scores, see bam.util.quality_bins(), makes them considerably more compressible.
+        """
+        super().__init__(bgzf.Writer(output, offset, level=level, codec=codec))
+        self._index = index
+        self._indexer = bai.Indexer(n_ref) if index is not None else None
+        self._last = None  # (record, begin, end) of the last record written, indexed once its end offset is final
+        self.quality_table = quality_table
 
     def __call__(self, record):
-        data = record.pack()
+        data = record.pack(quality_table=self.quality_table)
         record_len = len(record)
-        if record_len < bgzf.MAX_CDATA_SIZE and self._output.block_remaining() < record_len:
-            self._output.finish_block()
+        remaining = self._output.block_remaining()
+        if not remaining or record_len < bgzf.MAX_CDATA_SIZE and remaining < record_len:
+            self._finish_block()
+        begin = self._output.tell()
         for datum in data:
             self._output(datum)
+        if self._indexer:
+            self._add_to_index(record, begin, self._output.tell())
+
+    def _finish_block(self) -> None:
+        """
+        Finish the current block.
+        A record ending at the end of the block is given the start of the next block as its end offset, as a reader
+        resolves that position to. Chunks either side of the block boundary can then be merged by the index.
+        :return: None
+        """
+        end = self._output.tell()
+        self._output.finish_block()
+        if self._last is not None and self._last[2] == end:
+            self._last = self._last[:2] + (self._output.tell(),)
+
+    def _add_to_index(self, record, begin: int, end: int) -> None:
+        """
+        Add a written record to the index.
+        The record is held until the next record is written or the writer is finalized, as its end offset changes if it
+        ends its block. See _finish_block().
+        :param record: Record instance.
+        :param begin: Virtual file offset of the first byte of the record.
+        :param end: Virtual file offset following the last byte of the record.
+        :return: None
+        """
+        self._index_last()
+        self._last = (record, begin, end)
+
+    def _index_last(self) -> None:
+        """
+        Add the held record to the index.
+        :return: None
+        """
+        if self._last is not None:
+            self._indexer.add_record(*self._last)
+            self._last = None
 
     @property
     def offset(self):
@@ -119,7 +176,8 @@ class BGZFWriter(Writer):
 
     def finalize(self):
         if self._output:
-            self._output.finish_block()
+            self._finish_block()
+            self._index_last()
             offset = self._output.offset
             output = self._output._output
             if isinstance(output, (io.RawIOBase, io.BufferedIOBase)):
@@ -128,6 +186,9 @@ class BGZFWriter(Writer):
                 output[offset:offset + bgzf.SIZEOF_EMPTY_BLOCK] = bgzf.EMPTY_BLOCK
             self._offset = offset + bgzf.SIZEOF_EMPTY_BLOCK
             self._output = None
+            if self._indexer:
+                bai.write(self._index, *self._indexer.finalize())
+                self._indexer = None
 
     def __del__(self):
         self.finalize()
@@ -1,2 +1,13 @@
+import struct
+
 EMPTY_RECORD = b''
-VALID_RECORD = b'"\x01\x00\x00\x00\x00\x00\x00\x91\xfe%\x00&<\xe0\x12\x01\x00\xa3\x00\x83\x00\x00\x00\x00\x00\x00\x00\xa1\xfe%\x00\x93\x00\x00\x00TTTTGAAACCATCTATATGTGCGACTTTAATT:R497\x000\x08\x00\x00\x14B"$B\x84""\x14B!D\x82"\x11""\x18("\x18D\x18B\x12"\x84!DD\x12B(\x84\x14H!B("D""$\x82!"\x82\x84\x82\x82\x12((!(\x88H!"B!D\x84D \'"\'$$##\'#""$\'$ &$$\'\'&&$!!%%%\'#\'## \'\'$&\'" %#$"""#"$\' &%%"$ &\'  #\'!!%%& \'" \'""\'%#&\'  &% $\' \'"%"& \'#!!%&$ %%#&!!   \'!%!& &" & !"%\'"$%&NMC\x00MDZ131\x00ASC\x83XSC\x00'
\ No newline at end of file
+VALID_RECORD = b'"\x01\x00\x00\x00\x00\x00\x00\x91\xfe%\x00&<\xe0\x12\x01\x00\xa3\x00\x83\x00\x00\x00\x00\x00\x00\x00\xa1\xfe%\x00\x93\x00\x00\x00TTTTGAAACCATCTATATGTGCGACTTTAATT:R497\x000\x08\x00\x00\x14B"$B\x84""\x14B!D\x82"\x11""\x18("\x18D\x18B\x12"\x84!DD\x12B(\x84\x14H!B("D""$\x82!"\x82\x84\x82\x82\x12((!(\x88H!"B!D\x84D \'"\'$$##\'#""$\'$ &$$\'\'&&$!!%%%\'#\'## \'\'$&\'" %#$"""#"$\' &%%"$ &\'  #\'!!%%& \'" \'""\'%#&\'  &% $\' \'"%"& \'#!!%&$ %%#&!!   \'!%!& &" & !"%\'"$%&NMC\x00MDZ131\x00ASC\x83XSC\x00'
+
+
+def pack_record(i, position, reference_id=0, mapping_quality=60, flag=0, template_length=0):
+    """
+    Build the BAM data of a record named read<i> with no CIGAR, sequence or tags.
+    """
+    name = b'read%d\x00' % i
+    body = struct.pack('<iiBBHHHiiii', reference_id, position, len(name), mapping_quality, 4680, 0, flag, 0, -1, -1, template_length) + name
+    return struct.pack('<i', len(body)) + body
@@ -0,0 +1,57 @@
+from unittest import TestCase, skipIf
+import io
+
+from bampy import bam, bgzf
+from bampy.bam import batch
+from bampy.reader import BGZFReader
+from bampy.reference import Reference
+from .data import pack_record
+
+
+def record(i, position):
+    return pack_record(i, position, i % 2, i % 61, i & 0xFFF, -i)
+
+
+@skipIf(batch.np is None, "NumPy not available")
+class TestRecordBatch(TestCase):
+    def setUp(self):
+        self.positions = [i * 3 for i in range(5000)]
+        self.data = bytearray()
+        for i, position in enumerate(self.positions):
+            self.data += record(i, position)
+
+    def test_from_buffer(self):
+        size = len(record(0, 0))
+        # Second record is truncated
+        b, end = bam.RecordBatch.from_buffer(self.data[:size * 2 + 10])
+        self.assertEqual(end, size * 2, "Incorrect end")
+        b, end = bam.RecordBatch.from_buffer(self.data[:size * 3 - 1], size)
+        self.assertEqual((len(b), end), (1, size * 2), "Incorrect record count")
+        b, end = bam.RecordBatch.from_buffer(self.data)
+        self.assertEqual(end, len(self.data), "Incorrect end")
+        self.assertEqual(list(b.position), self.positions, "Incorrect positions")
+        self.assertEqual(list(b.template_length), [-i for i in range(len(b))], "Incorrect template lengths")
+        self.assertIsNone(b.virtual_offsets, "Unexpected virtual offsets")
+        self.assertEqual(bytes(b.record(11).name), b'read11', "Incorrect record")
+        with self.assertRaises(AttributeError):
+            b.missing
+
+    def test_reader(self):
+        stream = io.BytesIO()
+        writer = bgzf.Writer(stream, level=1)
+        writer(bam.pack_header(b'', [Reference('chr1', 1 << 20, 0), Reference('chr2', 1 << 20, 1)]))
+        for i in range(len(self.positions)):
+            writer(record(i, self.positions[i]))
+        writer.finish_block()
+        stream.write(bgzf.EMPTY_BLOCK)
+        buffer = bytearray(stream.getvalue())
+
+        records = list(BGZFReader(buffer))
+        reader = BGZFReader(buffer)
+        first = next(reader)
+        batches = list(reader.batches())
+        self.assertGreater(len(batches), 1, "Records not split into batches")
+        self.assertEqual([first.position] + [int(p) for b in batches for p in b.position], self.positions, "Incorrect positions")
+        self.assertEqual([int(o) for b in batches for o in b.virtual_offsets], [r.virtual_offset for r in records[1:]], "Incorrect virtual offsets")
+        self.assertEqual([int(q) for b in batches for q in b.mapping_quality], [r.mapping_quality for r in records[1:]], "Incorrect mapping qualities")
+        self.assertEqual([int(f) for b in batches for f in b.flag], [r.flags for r in records[1:]], "Incorrect flags")
@@ -0,0 +1,39 @@
+from unittest import TestCase
+import io
+
+from bampy import bam
+from bampy.bam import Record, RecordCursor
+from bampy.reader import BAMBufferReader
+from bampy.reference import Reference
+from .data import VALID_RECORD
+
+FIELDS = ('reference_id', 'position', 'mapping_quality', 'bin', 'sequence_length', 'next_reference_id', 'next_position', 'template_length')
+
+
+class TestRecordCursor(TestCase):
+    def test_fields(self):
+        buffer = bytearray(VALID_RECORD * 2)
+        record = Record.from_buffer(bytearray(VALID_RECORD))
+        cursor = RecordCursor(buffer, len(VALID_RECORD))
+        for field in FIELDS:
+            self.assertEqual(getattr(cursor, field), getattr(record._header, field), "Incorrect {}".format(field))
+        self.assertEqual(cursor.flags, record.flags, "Incorrect flags")
+        self.assertEqual(cursor.name, bytes(record.name), "Incorrect name")
+        self.assertEqual(len(cursor), len(VALID_RECORD), "Incorrect length")
+        self.assertIsNone(cursor.virtual_offset, "Unexpected virtual offset")
+        detached = cursor.detach()
+        cursor.offset = 0
+        buffer[len(VALID_RECORD) + 8] ^= 1
+        self.assertEqual(bytes(detached.raw), bytes(buffer[len(VALID_RECORD):]), "Detached record does not reference the record data")
+
+    def test_reader(self):
+        references = [Reference('ref{}'.format(i), 1000, i) for i in range(2)]
+        stream = io.BytesIO()
+        bam.header_to_stream(stream, b'', references)
+        stream.write(VALID_RECORD * 5)
+        reader = BAMBufferReader(bytearray(stream.getvalue()))
+        cursors = reader.cursors()
+        positions = [next(cursors).position for _ in range(2)]
+        cursors.close()
+        self.assertEqual(len(list(reader)), 3, "Reader not positioned after the cursor")
+        self.assertEqual(positions, [Record.from_buffer(bytearray(VALID_RECORD)).position] * 2, "Incorrect positions")
@@ -1,5 +1,7 @@
 import unittest
 
+from bampy.bam.packed_cigar import PackedCIGAR
+
 
 class TestPackedCIGAR(unittest.TestCase):
     def test_pack(self):
@@ -10,3 +12,9 @@ class TestPackedCIGAR(unittest.TestCase):
 
     def test_copy(self):
         self.fail()
+
+    def test_bytes(self):
+        cigar = PackedCIGAR.from_sam(b"5S10M2D3I20M")
+        self.assertEqual(cigar.unpack(), [(5, 4), (10, 0), (2, 2), (3, 1), (20, 0)], "Incorrect operations")
+        self.assertEqual(bytes(cigar), b"5S10M2D3I20M", "Incorrect SAM CIGAR")
+        self.assertEqual(bytes(PackedCIGAR.from_sam(b"*")), b"*", "Incorrect empty CIGAR")
@@ -1,5 +1,7 @@
 import unittest
 
+from bampy.bam.packed_sequence import PackedSequence
+
 
 class TestPackedSequence(unittest.TestCase):
     def test_pack(self):
@@ -10,3 +12,42 @@ class TestPackedSequence(unittest.TestCase):
 
     def test_copy(self):
         self.fail()
+
+    def test_bytes(self):
+        sequence = PackedSequence(bytearray(b'\x12\x48\xf0'), 5)
+        self.assertEqual(bytes(sequence), b'ACGTN', "Incorrect SAM sequence")
+        self.assertEqual(repr(sequence), 'ACGTN', "Incorrect string")
+        self.assertEqual(list(sequence), [1, 2, 4, 8, 15], "Incorrect codes")
+        self.assertEqual(list(reversed(sequence)), [15, 8, 4, 2, 1], "Incorrect reversed codes")
+
+    def test_from_sam(self):
+        sequence = PackedSequence.from_sam(b'ACgtX')
+        self.assertEqual(bytes(sequence.buffer), b'\x12\x48\xf0', "Incorrect packed sequence")
+        self.assertEqual(len(sequence), 5, "Incorrect length")
+        self.assertEqual(len(PackedSequence.from_sam(b'').buffer), 0, "Unexpected data")
+
+    def test_slice(self):
+        codes = bytes(i % 16 for i in range(11))
+        sequence = PackedSequence.pack(bytearray(codes))
+        for start in range(len(codes)):
+            for stop in range(start, len(codes) + 1):
+                self.assertEqual(sequence[start:stop], codes[start:stop], "Incorrect slice {}:{}".format(start, stop))
+                changed = sequence.copy()
+                changed[start:stop] = bytes(15 - c for c in codes[start:stop])
+                self.assertEqual(changed.unpack(), codes[:start] + bytes(15 - c for c in codes[start:stop]) + codes[stop:],
+                                 "Incorrect assignment {}:{}".format(start, stop))
+        self.assertEqual(sequence[::-3], codes[::-3], "Incorrect stepped slice")
+
+    def test_reverse_complement(self):
+        for sequence, expected in ((b'ACGTN', b'NACGT'), (b'AACCG', b'CGGTT'), (b'RYKM=', b'=KMRY'), (b'', b'')):
+            reverse_complement = PackedSequence.from_sam(sequence).reverse_complement()
+            self.assertEqual(bytes(reverse_complement), expected, "Incorrect reverse complement of {}".format(sequence))
+            self.assertEqual(reverse_complement.buffer, PackedSequence.from_sam(expected).buffer, "Unused nibble not cleared")
+
+    def test_subsequence(self):
+        sequence = PackedSequence.from_sam(b'ACGTNACGTTGCA')
+        for start, stop in ((0, 13), (1, 12), (2, 7), (3, 8), (5, 5), (-4, None), (None, -3), (7, 2)):
+            subsequence = sequence.subsequence(start, stop)
+            expected = b'ACGTNACGTTGCA'[start:stop]
+            self.assertEqual(bytes(subsequence), expected, "Incorrect subsequence {}:{}".format(start, stop))
+            self.assertEqual(subsequence.buffer, PackedSequence.from_sam(expected).buffer, "Unused nibble not cleared")
@@ -1,5 +1,10 @@
+import io
 import unittest
 
+from bampy.bam import ILLUMINA_8_LEVEL, Record
+from bampy.reference import Reference
+from .data import VALID_RECORD
+
 
 class TestRecord(unittest.TestCase):
     def test__data_from_buffer(self):
@@ -27,4 +32,44 @@ class TestRecord(unittest.TestCase):
         self.fail()
 
     def test_copy(self):
-        self.fail()
+        buffer = bytearray(VALID_RECORD)
+        copy = Record.from_buffer(buffer).copy()
+        buffer[:] = bytes(len(buffer))
+        self.assertIsNone(copy.raw, "Copy has raw data")
+        self.assertEqual(b"".join(bytes(datum) for datum in copy.pack()), VALID_RECORD, "Incorrect copy")
+        stream = io.BytesIO()
+        copy.to_stream(stream)
+        self.assertEqual(stream.getvalue(), VALID_RECORD, "Incorrect copy written")
+
+    def test_raw(self):
+        buffer = bytearray(VALID_RECORD)
+        record = Record.from_buffer(buffer)
+        self.assertEqual(bytes(record.raw), VALID_RECORD, "Incorrect raw data")
+        record.mapping_quality = 7
+        self.assertEqual(record.pack(), [record.raw], "Unmodified record repacked")
+        self.assertEqual(record.raw[13], 7, "Header change not reflected in raw data")
+        stream = io.BytesIO()
+        record.to_stream(stream)
+        self.assertEqual(Record.from_stream(io.BytesIO(stream.getvalue())).raw, stream.getvalue(), "Raw data not read from stream")
+        record.quality_scores = bytearray(record.quality_scores)
+        self.assertIsNone(record.raw, "Raw data retained after modification")
+        self.assertEqual(len(record.pack()), 7, "Modified record not repacked")
+
+    def test_quality_scores(self):
+        references = [Reference("chr1", 1000), Reference("chr2", 1000)]
+        record = Record.from_buffer(bytearray(VALID_RECORD), 0, references)
+        qualities = record._sam_quality_scores()
+        self.assertEqual(qualities, bytes(q + 33 for q in record.quality_scores), "Incorrect SAM quality scores")
+        missing = Record.from_buffer(bytearray(VALID_RECORD), 0, references)
+        missing.quality_scores = bytearray(b"\xff") * len(record.quality_scores)
+        self.assertEqual(missing._sam_quality_scores(), b"*", "Missing quality scores not converted to *")
+
+        binned = b"".join(bytes(datum) for datum in record.pack(quality_table=ILLUMINA_8_LEVEL))
+        self.assertEqual(record.raw, VALID_RECORD, "Record modified by quality table")
+        self.assertEqual(len(binned), len(VALID_RECORD), "Incorrect binned record length")
+        binned = Record.from_buffer(bytearray(binned))
+        self.assertEqual(bytes(binned.quality_scores), bytes(record.quality_scores).translate(ILLUMINA_8_LEVEL), "Quality scores not binned")
+        self.assertEqual(bytes(binned.sequence), bytes(record.sequence), "Sequence changed by binning")
+        record.quality_scores = bytearray(record.quality_scores)
+        repacked = b"".join(bytes(datum) for datum in record.pack(quality_table=ILLUMINA_8_LEVEL))
+        self.assertEqual(repacked, bytes(binned.raw), "Binning differs between raw and repacked records")
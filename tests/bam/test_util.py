@@ -1,5 +1,9 @@
+import struct
 import unittest
 
+from bampy.bam import util
+from bampy.bam.packed_cigar import PackedCIGAR
+
 
 class TestUtil(unittest.TestCase):
     def test_header_from_stream(self):
@@ -17,6 +21,38 @@ class TestUtil(unittest.TestCase):
     def test_header_to_buffer(self):
         self.fail()
 
+    def test_record_offsets(self):
+        data = bytearray()
+        offsets = []
+        for i in range(10):
+            offsets.append(len(data))
+            body = bytes(32) + b'read%d\x00' % i
+            data += struct.pack('<i', len(body)) + body
+        self.assertEqual(list(util.record_offsets(data)[0]), offsets, "Incorrect offsets")
+        self.assertEqual(util.record_offsets(data)[1], 0, "Unexpected carry over")
+        found, carry = util.record_offsets(data[:offsets[7] + 20], offsets[2])
+        self.assertEqual(list(found), offsets[2:7], "Incorrect offsets of truncated data")
+        self.assertEqual(carry, 20, "Incorrect carry over")
+        self.assertEqual(util.record_offsets(data, 0, offsets[3] + 3)[1], 3, "End not applied")
+        self.assertEqual(len(util.record_offsets(data[:10])[0]), 0, "Unexpected record")
+        with self.assertRaises(ValueError):
+            util.record_offsets(struct.pack('<i', -8) + bytes(40))
+
+    def test_quality_bins(self):
+        table = util.quality_bins(((10, 15), (2, 6), (20, 22)))
+        self.assertEqual(list(table[:25:3]), [0, 6, 6, 6, 15, 15, 15, 22, 22], "Incorrect bins")
+        self.assertEqual(table[util.MISSING_QUALITY], util.MISSING_QUALITY, "Missing quality binned")
+        self.assertEqual(bytes(range(94)).translate(util.QUALITY_TO_SAM).translate(util.QUALITY_FROM_SAM), bytes(range(94)), "Quality scores not preserved")
+        self.assertEqual(bytes((0, 9, 19, 24, 29, 34, 39, 41)).translate(util.ILLUMINA_8_LEVEL), bytes((0, 6, 15, 22, 27, 33, 37, 40)),
+                         "Incorrect Illumina binning")
+
+    def test_alignment_length(self):
+        cigar = PackedCIGAR.from_sam(b"5S10M2D3I20M1N")
+        self.assertEqual(util.alignment_length(cigar), 33, "Incorrect packed alignment length")
+        self.assertEqual(util.alignment_length(cigar.unpack()), 33, "Incorrect alignment length")
+        self.assertEqual(util.cigar_to_sam(bytes(cigar.buffer)), (b"5S10M2D3I20M1N", 33), "Incorrect SAM CIGAR")
+        self.assertIs(util.cigar_from_sam(b"5S10M2D3I20M1N"), util.cigar_from_sam(b"5S10M2D3I20M1N"), "CIGAR not memoized")
+
 
 if __name__ == '__main__':
     unittest.main()
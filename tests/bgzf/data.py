@@ -1,4 +1,4 @@
-BLOCK_VALID = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"\x00+I-.142\x06\x00\x00\x00\x00\x00\x07\x00\x00\x00'
+BLOCK_VALID = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00"\x00+I-.142\x06\x00\xbb\xa2T\xf0\x07\x00\x00\x00'
 BLOCK_TOO_LONG = b''
 BLOCK_INVALID_MAGIC = b''
 BLOCK_MISSING_BC = b''
@@ -19,3 +19,30 @@ class TestBufferReader(TestCase):
             data = next(reader)
             self.assertEqual(bytes(data), b'', "VALID: Extra data found")
 
+    def test_virtual_offset(self):
+        reader = Reader(bytearray(BLOCK_VALID + BLOCK_VALID))
+        self.assertEqual(reader.tell(), 0, "Incorrect offset before first block")
+        next(reader)
+        self.assertEqual(reader.virtual_offset(3), 3, "Incorrect offset into first block")
+        reader.remaining = 2
+        next(reader)
+        self.assertEqual(reader.virtual_offset(1), 6, "Incorrect offset into carried data")
+        self.assertEqual(reader.virtual_offset(3), len(BLOCK_VALID) << 16 | 1, "Incorrect offset into second block")
+        reader.remaining = 0
+        self.assertEqual(reader.tell(), len(BLOCK_VALID) * 2 << 16, "End of data should resolve to next block")
+
+    def test_seek(self):
+        reader = Reader(bytearray(BLOCK_VALID + BLOCK_VALID + EMPTY_BLOCK))
+        reader.seek(len(BLOCK_VALID) << 16 | 4)
+        self.assertEqual(bytes(reader.buffer[len(reader.buffer) - reader.remaining:]), b'123', "Incorrect data after seek")
+        self.assertEqual(reader.tell(), len(BLOCK_VALID) << 16 | 4, "Incorrect offset after seek")
+        with self.assertRaises(ValueError):
+            reader.seek(8)
+
+    def test_find_block(self):
+        from bampy.bgzf.util import block_size, find_block
+        buffer = bytearray(BLOCK_VALID + BLOCK_VALID + EMPTY_BLOCK)
+        self.assertEqual(block_size(buffer, 0), len(BLOCK_VALID), "Incorrect block size")
+        self.assertEqual(find_block(buffer, 0), 0, "First block not found")
+        self.assertEqual(find_block(buffer, 1), len(BLOCK_VALID), "Second block not found")
+        self.assertEqual(find_block(buffer, len(BLOCK_VALID) * 2 + 1), len(buffer), "End of buffer expected")
@@ -15,7 +15,7 @@ class TestBufferWriter(TestCase):
 
     def test_simple_data(self):
         buffer = bytearray(MAX_BLOCK_SIZE)
-        writer = Writer(buffer)
+        writer = Writer(buffer, codec='zlib')
         writer(bytearray(b'test123'))
         writer.finish_block()
         self.assertEqual(buffer[:writer.offset], BLOCK_VALID, "Invalid block written to buffer")
@@ -0,0 +1,69 @@
+from unittest import TestCase
+import gc
+import io
+import os
+import tempfile
+
+from bampy.bgzf import BlockCache, Reader, Writer, EMPTY_BLOCK
+
+from .data import BLOCK_VALID
+
+
+def compress(data):
+    output = io.BytesIO()
+    writer = Writer(output)
+    writer(data)
+    writer.finish_block()
+    return output.getvalue() + EMPTY_BLOCK
+
+
+def first_block(reader):
+    return bytes(next(reader))
+
+
+class TestBlockCache(TestCase):
+    def test_eviction(self):
+        cache = BlockCache(10)
+        cache.put(('a', 0), b'1234')
+        cache.put(('a', 1), b'5678')
+        self.assertEqual(cache.get(('a', 0)), b'1234', "Cached block not found")
+        cache.put(('a', 2), b'90')
+        cache.put(('a', 3), b'ab')
+        self.assertNotIn(('a', 1), cache, "Least recently used block not evicted")
+        self.assertIn(('a', 0), cache, "Recently used block evicted")
+        self.assertEqual(cache.size, 8, "Incorrect cache size")
+        self.assertIsNone(cache.get(('a', 1)), "Evicted block returned")
+        self.assertEqual((cache.hits, cache.misses), (1, 1), "Incorrect counters")
+        cache.put(('a', 4), b'too large for the cache')
+        self.assertNotIn(('a', 4), cache, "Oversized block cached")
+
+    def test_reader(self):
+        cache = BlockCache()
+        data = bytearray(BLOCK_VALID + BLOCK_VALID + EMPTY_BLOCK)
+        reader = Reader(data, cache=cache)
+        for _ in range(3):
+            reader.seek(len(BLOCK_VALID) << 16 | 4)
+            self.assertEqual(bytes(reader.buffer[len(reader.buffer) - reader.remaining:]), b'123', "Incorrect data after seek")
+            reader.buffer[4] = 0  # Modifying the buffer must not affect the cache
+        self.assertEqual((cache.hits, cache.misses), (2, 1), "Block inflated more than once")
+
+    def test_sources(self):
+        cache = BlockCache()
+        # Short lived inputs must not be matched by inputs later allocated at the same address
+        for input_type in (bytearray, io.BytesIO):
+            for i in range(20):
+                data = b'record %d' % i
+                self.assertEqual(first_block(Reader(input_type(compress(data)), cache=cache)), data, "Block of a previous input returned")
+        gc.collect()
+        self.assertEqual(len(cache), 20, "Blocks of collected inputs not evicted")
+
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'test.gz')
+            for data in (b'first', b'other'):
+                with open(path + '.tmp', 'wb') as output:
+                    output.write(compress(data))
+                os.replace(path + '.tmp', path)
+                for _ in range(2):
+                    with open(path, 'rb') as input:
+                        self.assertEqual(first_block(Reader(input, cache=cache)), data, "Block of a replaced file returned")
+        self.assertEqual(cache.hits, 2, "File blocks not shared between streams")
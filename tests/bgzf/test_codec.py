@@ -0,0 +1,49 @@
+from unittest import TestCase
+import random
+
+from bampy.bgzf import Reader, Writer, EMPTY_BLOCK, MAX_BLOCK_SIZE, codec
+
+
+class TestCodec(TestCase):
+    def test_get(self):
+        self.assertIn(codec.get().name, codec.available(), "Default codec not available")
+        self.assertIs(codec.get('zlib'), codec.get('zlib'), "Codec instances not shared")
+        self.assertIn('zlib', codec.available(), "zlib fallback not available")
+        with self.assertRaises(ValueError):
+            codec.get('unknown')
+
+    def test_round_trip(self):
+        data = bytearray(b'ACGT' * 20000 + b'test123')
+        for compress in codec.available():
+            buffer = bytearray(MAX_BLOCK_SIZE * 4)
+            writer = Writer(buffer, codec=compress)
+            writer(data)
+            writer.finish_block()
+            buffer[writer.offset:writer.offset + len(EMPTY_BLOCK)] = EMPTY_BLOCK
+            for decompress in codec.available():
+                reader = Reader(buffer, codec=decompress)
+                inflated = bytearray()
+                for block in reader:
+                    inflated += bytes(block)
+                    reader.remaining = 0
+                    if len(inflated) == len(data):
+                        break
+                self.assertEqual(inflated, data, "Round trip mismatch between {} and {}".format(compress, decompress))
+
+    def test_incompressible(self):
+        data = bytearray(random.Random(0).randbytes(MAX_BLOCK_SIZE * 2))
+        for name in codec.available():
+            for level in range(-1, 10):
+                buffer = bytearray(MAX_BLOCK_SIZE * 4)
+                writer = Writer(buffer, level=level, codec=name)
+                writer(data)
+                writer.finish_block()
+                buffer[writer.offset:writer.offset + len(EMPTY_BLOCK)] = EMPTY_BLOCK
+                reader = Reader(buffer, codec=name)
+                inflated = bytearray()
+                for block in reader:
+                    inflated += bytes(block)
+                    reader.remaining = 0
+                    if len(inflated) == len(data):
+                        break
+                self.assertEqual(inflated, data, "Round trip mismatch with {} at level {}".format(name, level))
@@ -0,0 +1,32 @@
+from unittest import TestCase
+import io
+
+from bampy.bgzf import Reader, EMPTY_BLOCK, gzi
+
+from .data import BLOCK_VALID
+
+
+class TestGZI(TestCase):
+    def setUp(self):
+        self.data = bytearray(BLOCK_VALID * 3 + EMPTY_BLOCK)
+        self.index = [(0, 0), (len(BLOCK_VALID), 7), (len(BLOCK_VALID) * 2, 14)]
+
+    def test_build(self):
+        self.assertEqual(gzi.build(self.data), self.index, "Incorrect index from buffer")
+        self.assertEqual(gzi.build(io.BytesIO(self.data)), self.index, "Incorrect index from stream")
+
+    def test_read_write(self):
+        stream = io.BytesIO()
+        gzi.write(stream, self.index)
+        self.assertEqual(len(stream.getvalue()), 8 + 16 * 2, "First block should not be written")
+        stream.seek(0)
+        self.assertEqual(gzi.read(stream), self.index, "Incorrect index after round trip")
+
+    def test_seek_uncompressed(self):
+        self.assertEqual(gzi.virtual_offset(self.index, 3), 3, "Incorrect offset in first block")
+        self.assertEqual(gzi.virtual_offset(self.index, 7), len(BLOCK_VALID) << 16, "Incorrect offset at block boundary")
+        with self.assertRaises(ValueError):
+            gzi.virtual_offset(self.index, 1 << 20)
+        reader = Reader(self.data)
+        reader.seek_uncompressed(18, self.index)
+        self.assertEqual(bytes(reader.buffer[len(reader.buffer) - reader.remaining:]), b'123', "Incorrect data after seek")
@@ -0,0 +1,49 @@
+from unittest import TestCase
+import ctypes as C
+import threading
+
+from bampy.bgzf import zlib
+
+
+def to_array(data):
+    data = bytearray(data)
+    return (C.c_ubyte * len(data)).from_buffer(data)
+
+
+class TestZlib(TestCase):
+    def test_reuse(self):
+        deflater = zlib.Deflater(zlib.Z_BEST_COMPRESSION)
+        inflater = zlib.Inflater()
+        for data in (b'test123', b'ACGT' * 1000, b'x'):
+            cdata = (C.c_ubyte * 1024)()
+            deflater.reset(cdata)
+            res, state = deflater(to_array(data), zlib.Z_FINISH)
+            self.assertEqual(res, zlib.Z_STREAM_END, "Failed to deflate")
+            self.assertEqual(state.total_in, len(data), "State not reset between streams")
+            out = (C.c_ubyte * len(data))()
+            res, state = inflater((C.c_ubyte * state.total_out).from_buffer(cdata), out)
+            self.assertEqual(res, zlib.Z_STREAM_END, "Failed to inflate")
+            self.assertEqual(bytes(out), data, "Round trip mismatch")
+
+    def test_inflater_per_thread(self):
+        inflaters = []
+        thread = threading.Thread(target=lambda: inflaters.append(zlib.inflater()))
+        thread.start()
+        thread.join()
+        self.assertIs(zlib.inflater(), zlib.inflater(), "Inflater not reused within thread")
+        self.assertIsNot(inflaters[0], zlib.inflater(), "Inflater shared between threads")
+
+    def test_reset_error(self):
+        inflater = zlib.Inflater()
+        deflater = zlib.Deflater()
+        for stream, reset in ((inflater, lambda: inflater(to_array(b'\x03\x00'), (C.c_ubyte * 1)())),
+                              (deflater, lambda: deflater.reset((C.c_ubyte * 16)()))):
+            reset()
+            internal = stream.state.state
+            stream.state.state = None  # zlib rejects a stream without internal state
+            try:
+                with self.assertRaises(ValueError, msg="Reset failure ignored"):
+                    reset()
+            finally:
+                stream.state.state = internal
+            reset()
@@ -0,0 +1,119 @@
+from unittest import TestCase, skipIf
+import ctypes as C
+import io
+import os
+import tempfile
+
+from bampy import Writer, bai, bam, mt
+from bampy.reference import Reference
+from tools.index import index
+from .bam.data import pack_record
+
+
+def chunks(*offsets):
+    return (bai.Chunk * len(offsets))(*(bai.Chunk(*o) for o in offsets))
+
+
+class TestBAI(TestCase):
+    def setUp(self):
+        self.bins = [{
+            4681: chunks((1 << 16, 1 << 16 | 500), (3 << 16, 3 << 16 | 10)),
+            4682: chunks((1 << 16 | 500, 2 << 16 | 20)),
+            585: chunks((5 << 16, 5 << 16 | 100)),
+            bai.PSEUDO_BIN: bai.PseudoChunk(1 << 16, 5 << 16 | 100, 4, 0),
+        }]
+        self.intervals = [(C.c_uint64 * 2)(1 << 16, 1 << 16 | 500)]
+
+    def test_read(self):
+        stream = io.BytesIO()
+        stream.write(bai.MAGIC + (1).to_bytes(4, 'little') + (2).to_bytes(4, 'little'))
+        stream.write((4681).to_bytes(4, 'little') + (1).to_bytes(4, 'little') + bytes(self.bins[0][4681][0]))
+        stream.write(bai.PSEUDO_BIN.to_bytes(4, 'little') + (2).to_bytes(4, 'little') + bytes(self.bins[0][bai.PSEUDO_BIN]))
+        stream.write((2).to_bytes(4, 'little') + bytes(self.intervals[0]))
+        stream.write((7).to_bytes(8, 'little'))
+        stream.seek(0)
+        bins, intervals, unplaced = bai.read(stream)
+        self.assertEqual(bins[0][4681][0].end, 1 << 16 | 500, "Incorrect chunk")
+        self.assertEqual(bins[0][bai.PSEUDO_BIN].mapped, 4, "Incorrect mapped count")
+        self.assertEqual(list(intervals[0]), list(self.intervals[0]), "Incorrect intervals")
+        self.assertEqual(unplaced, 7, "Incorrect unplaced count")
+
+    def test_query(self):
+        self.assertEqual(bai.query(self.bins, self.intervals, 0, 0, 100), [(1 << 16, 1 << 16 | 500), (3 << 16, 3 << 16 | 10), (5 << 16, 5 << 16 | 100)])
+        # Linear index excludes the first chunk, adjacent chunks merged
+        self.assertEqual(bai.query(self.bins, self.intervals, 0, 1 << 14, (1 << 14) + 1), [(1 << 16 | 500, 2 << 16 | 20), (5 << 16, 5 << 16 | 100)])
+        self.assertEqual(bai.query(self.bins, self.intervals, 1, 0, 100), [])
+
+    def test_indexer(self):
+        indexer = bai.Indexer(2)
+        indexer.add(0, 100, 200, True, 1 << 16, 1 << 16 | 50)
+        indexer.add(0, 150, 250, True, 1 << 16 | 50, 1 << 16 | 100)
+        indexer.add(0, 1 << 14, (1 << 14) + 100, True, 1 << 16 | 100, 2 << 16)
+        indexer.add(0, 1 << 14, (1 << 14) + 1, False, 2 << 16, 2 << 16 | 40)
+        indexer.add(-1, -1, 0, False, 2 << 16 | 40, 2 << 16 | 80)
+        bins, intervals, unaligned = indexer.finalize()
+        self.assertEqual([(c.begin, c.end) for c in bins[0][4681]], [(1 << 16, 1 << 16 | 100)], "Incorrect chunks")
+        self.assertEqual([(c.begin, c.end) for c in bins[0][4682]], [(1 << 16 | 100, 2 << 16 | 40)], "Incorrect chunks")
+        pseudo = bins[0][bai.PSEUDO_BIN]
+        self.assertEqual((pseudo.begin, pseudo.end, pseudo.mapped, pseudo.unmapped), (1 << 16, 2 << 16 | 40, 3, 1), "Incorrect pseudo-bin")
+        self.assertEqual(list(intervals[0]), [1 << 16, 1 << 16 | 100], "Incorrect intervals")
+        self.assertEqual(bins[1], {}, "Unexpected bins")
+        self.assertEqual(unaligned, 1, "Incorrect unaligned count")
+
+        # Round trip
+        stream = io.BytesIO()
+        bai.write(stream, bins, intervals, unaligned)
+        stream.seek(0)
+        bins, intervals, unaligned = bai.read(stream)
+        self.assertEqual(bins[0][bai.PSEUDO_BIN].unmapped, 1, "Incorrect pseudo-bin after round trip")
+        self.assertEqual(unaligned, 1, "Incorrect unaligned count after round trip")
+
+        with self.assertRaises(ValueError):
+            indexer = bai.Indexer(1)
+            indexer.add(0, 100, 200, True, 0, 10)
+            indexer.add(0, 50, 200, True, 10, 20)
+
+    def test_partition(self):
+        bins = [{bai.PSEUDO_BIN: bai.PseudoChunk(1 << 16, 9 << 16, 4, 0)}, {}, {bai.PSEUDO_BIN: bai.PseudoChunk(9 << 16, 12 << 16, 1, 0)}]
+        intervals = [(C.c_uint64 * 4)(0, 1 << 16, 5 << 16, 7 << 16), None, (C.c_uint64 * 1)(9 << 16)]
+        # Intervals of reference 0 hold 0, 4, 2 and 2 blocks, reference 2 holds 3 blocks
+        self.assertEqual(bai.partition(bins, intervals, 1), [[(0, 0, 4 << 14), (2, 0, 1 << 14)]], "Incorrect single part")
+        self.assertEqual(bai.partition(bins, intervals, 2), [[(0, 0, 3 << 14)], [(0, 3 << 14, 4 << 14), (2, 0, 1 << 14)]], "Incorrect parts")
+        self.assertEqual(bai.partition(bins, intervals, 2, [70000, 100, 200]), [[(0, 0, 3 << 14)], [(0, 3 << 14, 70000), (1, 0, 100), (2, 0, 200)]], "Lengths not applied")
+        parts = bai.partition(bins, intervals, 100)
+        self.assertEqual(len(parts), 4, "Empty intervals not merged")
+        self.assertEqual(bai.partition([{}], [None], 2), [], "Unexpected parts for empty index")
+
+    @skipIf(bai.np is None, "NumPy not available")
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'test.bai')
+            with open(path, 'wb') as stream:
+                bai.write(stream, self.bins, self.intervals, 7)
+            bins, intervals, unplaced = bai.load(path)
+            self.assertIs(bai.load(path)[0], bins, "Index not cached")
+            self.assertEqual(list(bins[0]), list(self.bins[0]), "Incorrect bins")
+            self.assertEqual(bins[0][4681][1].begin, 3 << 16, "Incorrect chunk")
+            self.assertEqual(bins[0][bai.PSEUDO_BIN].mapped, 4, "Incorrect mapped count")
+            self.assertEqual(list(intervals[0]), list(self.intervals[0]), "Incorrect intervals")
+            self.assertEqual(unplaced, 7, "Incorrect unplaced count")
+            for beg, end in ((0, 100), (1 << 14, (1 << 14) + 1)):
+                self.assertEqual(bai.query(bins, intervals, 0, beg, end), bai.query(self.bins, self.intervals, 0, beg, end), "Query mismatch")
+            del bins, intervals
+            bai.clear_cache()
+
+    def test_writer_index(self):
+        references = [Reference('chr1', 1 << 20, 0), Reference('chr2', 1 << 20, 1)]
+        records = [bam.Record.from_buffer(bytearray(pack_record(i, i % 15000 * 7, i // 15000)), 0, references) for i in range(20000)]
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'test.bam')
+            for factory in (Writer.bgzf, mt.Writer.bgzf):
+                written = io.BytesIO()
+                with open(path, 'wb') as output:
+                    writer = factory(output, 0, b'', references, level=1, index=written)
+                    for record in records:
+                        writer(record)
+                    writer.finalize()
+                built = io.BytesIO()
+                bai.write(built, *index(path, 1))
+                self.assertEqual(written.getvalue(), built.getvalue(), "Index of {} differs from tools/index.py".format(factory.__qualname__))
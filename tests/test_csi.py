@@ -0,0 +1,38 @@
+from unittest import TestCase
+import io
+
+from bampy import bai, csi
+from bampy.bam.util import reg2bin, reg2bins, reg2bin_csi, reg2bins_csi
+
+
+class TestCSI(TestCase):
+    def test_reg2bin(self):
+        for beg, end in ((0, 1), (100, 20000), (1 << 14, (1 << 14) + 1), (12345, 1 << 26), (0, 1 << 29)):
+            self.assertEqual(reg2bin_csi(beg, end), reg2bin(beg, end), "Default binning should match BAI")
+            self.assertEqual(sorted(reg2bins_csi(beg, end)), sorted(reg2bins(beg, end)), "Default binning should match BAI")
+        self.assertEqual(reg2bin_csi(1 << 33, (1 << 33) + 1, 14, 7), csi.bin_limit(6) + ((1 << 33) >> 14), "Incorrect bin beyond BAI limit")
+        self.assertEqual(csi.bin_limit(), bai.PSEUDO_BIN - 1, "Incorrect bin limit")
+        self.assertEqual(csi.depth_for(1 << 29), 5, "Incorrect depth")
+        self.assertEqual(csi.depth_for((1 << 29) + 1), 6, "Incorrect depth")
+
+    def test_indexer(self):
+        min_shift, depth = 12, 7
+        indexer = csi.Indexer(1, min_shift, depth)
+        indexer.add(0, 100, 200, True, 1 << 16, 1 << 16 | 50)
+        indexer.add(0, 1 << 32, (1 << 32) + 100, True, 1 << 16 | 50, 2 << 16)
+        indexer.add(0, 1 << 32, (1 << 32) + 1, False, 2 << 16, 2 << 16 | 40)
+        stream = io.BytesIO()
+        csi.write(stream, *indexer.finalize())
+        stream.seek(0)
+        index = csi.read(stream)
+        bins, loffsets, unaligned = index[:3]
+        self.assertEqual(index[3:], (min_shift, depth, b''), "Incorrect header after round trip")
+        far_bin = reg2bin_csi(1 << 32, (1 << 32) + 100, min_shift, depth)
+        self.assertEqual([(c.begin, c.end) for c in bins[0][far_bin]], [(1 << 16 | 50, 2 << 16 | 40)], "Incorrect chunks")
+        self.assertEqual(loffsets[0][far_bin], 1 << 16 | 50, "Incorrect bin offset")
+        self.assertEqual(bins[0][csi.bin_limit(depth) + 1].unmapped, 1, "Incorrect pseudo-bin")
+        self.assertEqual(unaligned, 0, "Incorrect unaligned count")
+
+        self.assertEqual(csi.query(bins, loffsets, 0, 0, 1000, min_shift, depth), [(1 << 16, 1 << 16 | 50)])
+        self.assertEqual(csi.query(bins, loffsets, 0, 1 << 32, (1 << 32) + 10, min_shift, depth), [(1 << 16 | 50, 2 << 16 | 40)])
+        self.assertEqual(csi.query(bins, loffsets, 0, 1 << 20, 1 << 21, min_shift, depth), [])
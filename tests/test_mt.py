@@ -0,0 +1,143 @@
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+import io
+import random
+
+from bampy import bgzf
+from bampy.mt import BufferPool, Prefetch, bgzf as mt_bgzf
+
+
+class TestMT(TestCase):
+    def setUp(self):
+        rand = random.Random(0)
+        self.data = bytes(rand.choices(b'ACGT', k=5 * bgzf.block.MAX_DATA_SIZE + 123))
+        self.pool = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def compress(self, data):
+        output = io.BytesIO()
+        writer = bgzf.Writer(output, codec='zlib')
+        writer(data)
+        writer.finish_block()
+        return output.getvalue() + bgzf.EMPTY_BLOCK
+
+    def test_writer(self):
+        expected = self.compress(self.data)
+        for max_queued in (1, 2, 16):
+            output = io.BytesIO()
+            writer = mt_bgzf.Writer(output, codec='zlib', threadpool=self.pool, max_queued=max_queued)
+            for i in range(0, len(self.data), 1000):
+                writer(self.data[i:i + 1000])
+            writer.finish_block()
+            self.assertLessEqual(len(writer.results), max_queued, "Queue exceeded max_queued")
+            writer.flush(True)
+            self.assertEqual(output.getvalue() + bgzf.EMPTY_BLOCK, expected, "Output differs from serial writer")
+
+    def test_reader(self):
+        compressed = self.compress(self.data)
+        for input in (bytearray(compressed), io.BytesIO(compressed)):
+            reader = mt_bgzf.Reader(input, threadpool=self.pool, max_queued=3)
+            data = bytearray()
+            while True:
+                try:
+                    data += bytes(next(reader))
+                    reader.remaining = 0
+                except bgzf.EmptyBlock:
+                    continue
+                except StopIteration:
+                    break
+                self.assertLessEqual(len(reader.blockqueue), 3, "Queue exceeded max_queued")
+            self.assertEqual(data, self.data, "Blocks returned out of order")
+
+    def test_seek(self):
+        compressed = bytearray(self.compress(self.data))
+        serial = bgzf.Reader(compressed)
+        next(serial)
+        next(serial)
+        virtual_offset = serial.block_offset << 16 | 10
+        reader = mt_bgzf.Reader(compressed, threadpool=self.pool)
+        next(reader)
+        reader.seek(virtual_offset)
+        self.assertEqual(reader.tell(), virtual_offset, "Incorrect offset after seek")
+        start = bgzf.block.MAX_DATA_SIZE + 10
+        self.assertEqual(bytes(reader.buffer[len(reader.buffer) - reader.remaining:]), self.data[start:start + reader.remaining], "Incorrect data after seek")
+        reader.remaining = 0
+        self.assertEqual(bytes(next(reader)), self.data[2 * bgzf.block.MAX_DATA_SIZE:3 * bgzf.block.MAX_DATA_SIZE], "Incorrect data after seek")
+
+    def test_buffer_pool(self):
+        pool = BufferPool(16, 1)
+        a, b = pool.acquire(), pool.acquire()
+        pool.release(a)
+        pool.release(b)
+        self.assertEqual(len(pool), 1, "Pool retained more than count buffers")
+        self.assertIs(pool.acquire(), a, "Released buffer not reused")
+        pool.release(bytearray(8))
+        self.assertEqual(len(pool), 0, "Buffer of the wrong size retained")
+        owner = memoryview(a)
+        pool.recycle(owner, a)
+        self.assertEqual(len(pool), 0, "Buffer released while still referenced")
+        del owner
+        self.assertEqual(len(pool), 1, "Buffer not released once unreferenced")
+
+    def test_reader_buffers(self):
+        compressed = bytearray(self.compress(self.data))
+        reader = mt_bgzf.Reader(compressed, threadpool=self.pool, max_queued=2, ring=bgzf.Ring(1))
+        held = bytes(next(reader)[:10])
+        buffer = reader.buffer
+        for _ in range(4):
+            reader.remaining = 0
+            next(reader)
+        self.assertEqual(bytes(buffer[:10]), held, "Buffer recycled while referenced")
+        self.assertGreater(reader.ring.arenas.reused, 0, "Arenas not recycled")
+
+    def test_reader_ring(self):
+        compressed = bytearray(self.compress(self.data))
+        for reader in (bgzf.Reader(compressed), mt_bgzf.Reader(compressed, threadpool=self.pool, ring=bgzf.Ring(2))):
+            data = bytearray()
+            held = []
+            while True:
+                try:
+                    next(reader)
+                except bgzf.EmptyBlock:
+                    continue
+                except StopIteration:
+                    data += bytes(reader.buffer[len(reader.buffer) - reader.remaining:])
+                    break
+                # Leave data unconsumed so that it is carried into the next block
+                held.append((reader.buffer, bytes(reader.buffer)))
+                consumed = reader.remaining - 1000 if reader.remaining > 1000 else reader.remaining
+                data += bytes(reader.buffer[len(reader.buffer) - reader.remaining:len(reader.buffer) - reader.remaining + consumed])
+                reader.remaining -= consumed
+            self.assertEqual(data, self.data, "Incorrect data")
+            self.assertTrue(all(bytes(buffer) == expected for buffer, expected in held), "Buffer overwritten while referenced")
+            self.assertLess(reader.ring.copied, 1000 * len(held), "Remaining data copied every block")
+
+    def test_prefetch(self):
+        prefetch = Prefetch(8, target_latency=0.01)
+        self.assertEqual(prefetch.depth, 1, "Incorrect initial depth")
+        for expected in (2, 4, 8, 8):
+            prefetch.update(0.1, False)
+            self.assertEqual(prefetch.depth, expected, "Window not grown after stall")
+        for _ in range(16):
+            prefetch.update(0, False)
+        self.assertEqual(prefetch.depth, 8, "Window shrunk while workers are not ahead")
+        for _ in range(8):
+            prefetch.update(0, True)
+        self.assertEqual(prefetch.depth, 7, "Window not shrunk once consumer is the bottleneck")
+        self.assertEqual(prefetch.stalls, 4, "Incorrect stall count")
+        prefetch.max_bytes = 100
+        self.assertTrue(prefetch.allow(0, 0, 1000), "First block must always be allowed")
+        self.assertFalse(prefetch.allow(1, 60, 50), "Byte ceiling exceeded")
+        self.assertFalse(prefetch.allow(7, 0, 0), "Depth exceeded")
+
+    def test_reader_prefetch(self):
+        compressed = bytearray(self.compress(self.data))
+        prefetch = Prefetch(8, max_bytes=2 * bgzf.block.MAX_DATA_SIZE)
+        prefetch.depth = 8
+        reader = mt_bgzf.Reader(compressed, threadpool=self.pool, prefetch=prefetch)
+        next(reader)
+        self.assertLessEqual(reader.queued_bytes, 2 * bgzf.block.MAX_DATA_SIZE, "Byte ceiling exceeded")
+        self.assertLessEqual(len(reader.blockqueue), 2, "Byte ceiling exceeded")
+        self.assertEqual(reader.depth, prefetch.depth, "Depth not exposed")
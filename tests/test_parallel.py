@@ -0,0 +1,69 @@
+from unittest import TestCase
+import os
+import tempfile
+import warnings
+
+from bampy import bam, bgzf, parallel
+from bampy.reference import Reference
+from .bam.data import pack_record
+
+
+def record(i, position):
+    return pack_record(i, position, flag=4)
+
+
+def count(record):
+    return 1, record.position
+
+
+def add(a, b):
+    return a[0] + b[0], a[1] + b[1]
+
+
+def positions(record):
+    return [record.position]
+
+
+def concat(a, b):
+    return a + b
+
+
+class TestParallel(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.bam')
+        self.positions = [i * 7 for i in range(20000)]
+        with os.fdopen(fd, 'wb') as output:
+            writer = bgzf.Writer(output, level=1)
+            writer(bam.pack_header(b'', [Reference('chr1', 1 << 20, 0)]))
+            for i, position in enumerate(self.positions):
+                writer(record(i, position))
+            writer.finish_block()
+            output.write(bgzf.EMPTY_BLOCK)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_partition(self):
+        buffer = open(self.path, 'rb').read()
+        offsets = parallel.partition(buffer, 4)
+        self.assertEqual((offsets[0], offsets[-1]), (0, len(buffer)), "Partition does not span the file")
+        self.assertEqual(len(offsets), 5, "Incorrect number of parts")
+        for offset in offsets[1:-1]:
+            self.assertGreater(bgzf.util.block_size(buffer, offset), 0, "Part does not begin on a block")
+
+    def test_scan(self):
+        for workers in (1, 3, 8):
+            self.assertEqual(parallel.scan(self.path, count, add, workers), (len(self.positions), sum(self.positions)), "Incorrect result with {} workers".format(workers))
+        self.assertEqual(parallel.scan(self.path, positions, concat, 5, []), self.positions, "Parts reduced out of order")
+
+    def test_many_workers(self):
+        buffer = open(self.path, 'rb').read()
+        offsets = parallel.partition(buffer, 50)
+        self.assertLess(offsets[-2], len(buffer) - bgzf.SIZEOF_EMPTY_BLOCK, "Part starts at the EOF marker")
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            found, _, first, next_first = parallel.scan_part(self.path, count, add, offsets[-2], offsets[-1])
+            self.assertIsNone(next_first, "End of file not reached")
+            eof = len(buffer) - bgzf.SIZEOF_EMPTY_BLOCK
+            self.assertEqual(parallel.scan_part(self.path, count, add, eof, len(buffer)), (False, None, len(buffer) << 16, None), "EOF marker part read")
+        self.assertEqual(parallel.scan(self.path, count, add, 50), (len(self.positions), sum(self.positions)), "Incorrect result with 50 workers")
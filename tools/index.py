@@ -0,0 +1,106 @@
+"""
+index
+bampy index [-bc] [-m INT] [-@ INT] aln.bam [out.index]
+
+Index a coordinate-sorted BGZIP-compressed BAM file for fast random access.
+This index is needed when region arguments are used to limit bampy view and similar commands to particular regions of interest.
+If an output filename is given, the index file will be written to out.index. Otherwise, the index file will be written to aln.bam.bai (or aln.bam.csi if -c is specified).
+The file is split at BGZF block boundaries and each part is indexed by a separate process. The partial indexes are merged in file order.
+
+OPTIONS:
+
+-b Create a BAI index. This is the default when no format options are used.
+-c Create a CSI index. By default, the minimum interval size for the index is 2^14, which is the same as the fixed value used by the BAI format.
+-m INT Create a CSI index, with a minimum interval size of 2^INT.
+-@ INT Number of processes to index with [number of available cores].
+-? Output long help and exit immediately.
+"""
+
+import getopt, os, sys
+from concurrent.futures import ProcessPoolExecutor
+
+from bampy import bai, csi
+from bampy.parallel import DEFAULT_PROCESSES, partition, resync
+from bampy.reader import BGZFReader
+from bampy.util import open_buffer
+
+
+def index_shard(path, start, end, first=None, min_shift=None):
+    """
+    Index the records that begin in the blocks between start and end.
+    :param path: Path to the BAM file.
+    :param start: Offset of the first block of the shard.
+    :param end: Offset of the first block following the shard.
+    :param first: Virtual offset of the first record of the shard if known, otherwise the first record is searched for.
+    :param min_shift: Build a CSI index with a minimum interval size of 2**min_shift, None to build a BAI index.
+    :return: Tuple of (Indexer, virtual offset of the first record indexed, virtual offset of the first record of the next shard).
+    """
+    buffer = open_buffer(path, os.O_RDONLY)
+    reader = BGZFReader(buffer)
+    if min_shift is None:
+        indexer = bai.Indexer(len(reader.references))
+    else:
+        depth = csi.depth_for(max((ref.length for ref in reader.references), default=0), min_shift)
+        indexer = csi.Indexer(len(reader.references), min_shift, depth)
+    if first is None:
+        # Resync to the first record starting in the shard
+        first = resync(buffer, start, end, len(reader.references))
+
+    reader.seek(first)
+    for record in reader:
+        if record.virtual_offset >> 16 >= end:
+            return indexer, first, record.virtual_offset
+        indexer.add_record(record, record.virtual_offset, reader.tell())
+    return indexer, first, None
+
+
+def index(path, processes=DEFAULT_PROCESSES, min_shift=None):
+    """
+    Build BAI or CSI index data for a BAM file.
+    :param path: Path to the BAM file.
+    :param processes: Number of processes to index with.
+    :param min_shift: Build a CSI index with a minimum interval size of 2**min_shift, None to build a BAI index.
+    :return: Tuple of (bins, intervals, unaligned), see bampy.bai.write(), or the arguments to bampy.csi.write() if min_shift is given.
+    """
+    buffer = open_buffer(path, os.O_RDONLY)
+    reader = BGZFReader(buffer)
+    shards = partition(buffer, processes)
+    first = reader.tell()
+    del reader
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(index_shard, path, start, end, None if i else first, min_shift) for i, (start, end) in enumerate(zip(shards, shards[1:]))]
+        indexer, _, next_first = futures[0].result()
+        for (start, end), future in zip(zip(shards[1:], shards[2:]), futures[1:]):
+            if next_first is None:
+                # Previous shard read to the end of the file
+                break
+            shard_indexer, shard_first, shard_next = future.result()
+            if shard_first != next_first:
+                # Resync did not land where the previous shard ended, redo the shard from there
+                shard_indexer, shard_first, shard_next = index_shard(path, start, end, next_first, min_shift)
+            indexer.update(shard_indexer)
+            next_first = shard_next
+    return indexer.finalize()
+
+
+if __name__ == '__main__':
+    opts, args = getopt.gnu_getopt(sys.argv, 'bcm:?@:')
+    opts = dict(opts)
+
+    if '-?' in opts:
+        print(__doc__)
+        exit(0)
+
+    assert len(args) > 1, "No input file specified"
+    path = args[1]
+    min_shift = None
+    if '-m' in opts:
+        min_shift = int(opts['-m'])
+    elif '-c' in opts:
+        min_shift = csi.DEFAULT_MIN_SHIFT
+    output_path = args[2] if len(args) > 2 else path + ('.bai' if min_shift is None else '.csi')
+
+    processes = int(opts['-@']) if '-@' in opts else DEFAULT_PROCESSES
+    with open(output_path, 'wb') as output:
+        (bai if min_shift is None else csi).write(output, *index(path, max(processes, 1), min_shift))
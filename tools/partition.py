@@ -0,0 +1,55 @@
+"""
+partition
+bampy partition [-n INT] aln.bam [aln.bam.bai]
+
+Split the genome into regions holding roughly equal amounts of compressed alignment data, for distributing per-region jobs between workers.
+Sizes are estimated from the BAI index, the BAM file is only read for its header. If no index is given aln.bam.bai is used.
+Regions are written to standard output in BED format with the number of the partition they belong to in the fourth column.
+Partitions are numbered from 0, a partition may consist of several regions. Unplaced unmapped reads are not included in any partition.
+
+OPTIONS:
+
+-n INT Number of partitions [number of available cores].
+-? Output long help and exit immediately.
+"""
+
+import getopt, os, sys
+
+from bampy import bai
+from bampy.parallel import DEFAULT_PROCESSES
+from bampy.reader import BGZFReader
+from bampy.util import open_buffer
+
+
+def plan(path, parts, index_path=None):
+    """
+    Split the references of a BAM file into parts holding roughly equal amounts of compressed data.
+    :param path: Path to the BAM file.
+    :param parts: Number of parts.
+    :param index_path: Path to the BAI index, None for path + '.bai'.
+    :return: List of lists of (reference name, start, end) regions, zero based and end exclusive. See bampy.bai.partition().
+    """
+    references = BGZFReader(open_buffer(path, os.O_RDONLY)).references
+    index_path = index_path or path + '.bai'
+    if bai.np is not None:
+        bins, intervals, _ = bai.load(index_path)
+    else:
+        with open(index_path, 'rb') as index:
+            bins, intervals, _ = bai.read(index)
+    return [[(references[ref].name, start, end) for ref, start, end in part]
+            for part in bai.partition(bins, intervals, parts, [ref.length for ref in references])]
+
+
+if __name__ == '__main__':
+    opts, args = getopt.gnu_getopt(sys.argv, 'n:?')
+    opts = dict(opts)
+
+    if '-?' in opts:
+        print(__doc__)
+        exit(0)
+
+    assert len(args) > 1, "No input file specified"
+    parts = int(opts['-n']) if '-n' in opts else DEFAULT_PROCESSES
+    for i, part in enumerate(plan(args[1], max(parts, 1), args[2] if len(args) > 2 else None)):
+        for name, start, end in part:
+            print(name, start, end, i, sep='\t')
@@ -71,11 +71,11 @@ from concurrent.futures import ThreadPoolExecutor
 from itertools import count
 
 from bampy.util import open_buffer
-from bampy.mt.bgzf import zlib
+from bampy.bgzf import zlib
 from bampy.itr import filter
 import bampy.mt as bampy
 
-region_re = re.compile('([^:]+)(?::(\d+)(?:-(\d+)))')
+region_re = re.compile('([^:]+)(?::(\d+)(?:-(\d+))?)?')
 
 if __name__ == '__main__':
     opts, args = getopt.gnu_getopt(sys.argv, 'bC1uhHc?o:U:t:T:LM:r:R:q:l:m:f:F:G:x:Bs:@:S')
@@ -90,7 +90,7 @@ if __name__ == '__main__':
     next(arg_itr) # Discard arg[0]
 
     # Open input file/stream
-    path = next(arg_itr)
+    input_path = path = next(arg_itr)
     if path == '-':
         input = sys.stdin.buffer
     else:
@@ -102,12 +102,12 @@ if __name__ == '__main__':
     reader = bampy.Reader(input)
 
     # Parse regions
-    regions = [None]*(len(args)-1)
-    if len(regions):
-        for i, arg in enumerate(arg_itr):
-            match = region_re.fullmatch(arg)
-            if match is not None:
-                regions[i] = (match[1], None if match[2] is None else int(match[2]), None if match[3] is None else int(match[3]))
+    regions = []
+    for arg in arg_itr:
+        match = region_re.fullmatch(arg)
+        if match is not None:
+            # Convert to zero based, end exclusive
+            regions.append((match[1], None if match[2] is None else int(match[2]) - 1, None if match[3] is None else int(match[3])))
 
     # Open output file/stream
     if '-o' in opts:
@@ -142,6 +142,11 @@ if __name__ == '__main__':
         # Header emitted during writer init so just exit here
         exit(0)
 
+    # Restrict to regions using the index
+    if regions:
+        index_path = input_path + '.csi' if os.path.exists(input_path + '.csi') else input_path + '.bai'
+        reader = filter.Regions(reader, regions, index_path)
+
     # Output data
     for record in reader:
         writer(record)
\ No newline at end of file